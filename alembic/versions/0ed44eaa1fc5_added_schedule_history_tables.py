@@ -0,0 +1,61 @@
+"""Added Schedule_Runs and Schedule_Deltas tables
+
+Revision ID: 0ed44eaa1fc5
+Revises: 97edbede08ba
+Create Date: 2026-10-16 14:03:27.541000
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '0ed44eaa1fc5'
+down_revision = '97edbede08ba'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'Schedule_Runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('studio_id', sa.Integer(), nullable=True),
+        sa.Column('scheduled_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['studio_id'], ['Studios.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        op.f('ix_Schedule_Runs_studio_id'), 'Schedule_Runs', ['studio_id'],
+        unique=False
+    )
+    op.create_index(
+        op.f('ix_Schedule_Runs_scheduled_at'), 'Schedule_Runs',
+        ['scheduled_at'], unique=False
+    )
+    op.create_table(
+        'Schedule_Deltas',
+        sa.Column('run_id', sa.Integer(), nullable=False),
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('start_shift', sa.Integer(), nullable=False),
+        sa.Column('end_shift', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['run_id'], ['Schedule_Runs.id'],
+                                ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['task_id'], ['Tasks.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('run_id', 'task_id')
+    )
+    op.create_index(
+        op.f('ix_Schedule_Deltas_task_id'), 'Schedule_Deltas', ['task_id'],
+        unique=False
+    )
+
+
+def downgrade():
+    op.drop_index(op.f('ix_Schedule_Deltas_task_id'),
+                  table_name='Schedule_Deltas')
+    op.drop_table('Schedule_Deltas')
+    op.drop_index(op.f('ix_Schedule_Runs_scheduled_at'),
+                  table_name='Schedule_Runs')
+    op.drop_index(op.f('ix_Schedule_Runs_studio_id'),
+                  table_name='Schedule_Runs')
+    op.drop_table('Schedule_Runs')
@@ -0,0 +1,58 @@
+"""Added Tasks.ancestor_ids and Tasks.depth columns
+
+Revision ID: 3a1c9c2e7d4b
+Revises: 0ed44eaa1fc5
+Create Date: 2026-10-16 16:21:08.213000
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3a1c9c2e7d4b'
+down_revision = '0ed44eaa1fc5'
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+def upgrade():
+    op.add_column(
+        'Tasks',
+        sa.Column('ancestor_ids', postgresql.ARRAY(sa.Integer()),
+                  server_default='{}', nullable=False)
+    )
+    op.add_column(
+        'Tasks',
+        sa.Column('depth', sa.Integer(), server_default='0', nullable=False)
+    )
+
+    # fill the materialized paths of the existing tasks
+    op.execute("""with recursive task_paths(id, ancestor_ids) as (
+    select
+        id,
+        cast('{}' as integer[])
+    from "Tasks"
+    where parent_id is NULL
+union all
+    select
+        "Tasks".id,
+        task_paths.ancestor_ids || task_paths.id
+    from "Tasks"
+    join task_paths on "Tasks".parent_id = task_paths.id
+)
+update "Tasks"
+set ancestor_ids = task_paths.ancestor_ids,
+    depth = cardinality(task_paths.ancestor_ids)
+from task_paths
+where "Tasks".id = task_paths.id""")
+
+    op.create_index(
+        'ix_Tasks_ancestor_ids', 'Tasks', ['ancestor_ids'], unique=False,
+        postgresql_using='gin'
+    )
+
+
+def downgrade():
+    op.drop_index('ix_Tasks_ancestor_ids', table_name='Tasks')
+    op.drop_column('Tasks', 'depth')
+    op.drop_column('Tasks', 'ancestor_ids')
@@ -0,0 +1,25 @@
+"""Added Studios.last_schedule_metrics column
+
+Revision ID: 97edbede08ba
+Revises: 31b1e22b455e
+Create Date: 2026-10-16 10:12:41.215000
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '97edbede08ba'
+down_revision = '31b1e22b455e'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column(
+        'Studios',
+        sa.Column('last_schedule_metrics', sa.PickleType(), nullable=True)
+    )
+
+
+def downgrade():
+    op.drop_column('Studios', 'last_schedule_metrics')
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+# Stalker a Production Asset Management System
+# Copyright (C) 2009-2016 Erkan Ozgur Yilmaz
+#
+# This file is part of Stalker.
+#
+# Stalker is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License.
+#
+# Stalker is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# Lesser GNU General Public License for more details.
+#
+# You should have received a copy of the Lesser GNU General Public License
+# along with Stalker.  If not, see <http://www.gnu.org/licenses/>
+"""Runs the scheduling benchmarks on a synthetic studio and writes the
+results as JSON.
+
+The synthetic studio is generated with :func:`.create_studio` in the given
+database, which should be an empty database, and every benchmark is run
+``--repeat`` times inside a transaction that is rolled back afterwards, so
+each run starts from the same data. The minimum, mean and maximum durations
+of each phase are written in seconds.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+from benchmarks.synthetic_studio import create_studio
+
+
+class Timer(object):
+    """collects the durations of the benchmark phases
+    """
+
+    def __init__(self):
+        self.durations = {}
+
+    def measure(self, phase, callable_, *args, **kwargs):
+        """calls the given callable and records how long it took under the
+        given phase name, returns the result of the callable
+        """
+        start = time.time()
+        result = callable_(*args, **kwargs)
+        self.add(phase, time.time() - start)
+        return result
+
+    def add(self, phase, duration):
+        """records the given duration under the given phase name
+        """
+        self.durations.setdefault(phase, []).append(duration)
+
+    def add_metrics(self, prefix, scheduler):
+        """records the phase durations in the metrics of the given scheduler
+        under the phase names prefixed with the given prefix
+        """
+        for phase, duration in scheduler.metrics['timings'].items():
+            if phase != 'total':
+                self.add('%s_%s' % (prefix, phase), duration)
+
+    def summary(self):
+        """returns the min, mean and max of each phase
+        """
+        return dict(
+            (phase, {
+                'min': min(durations),
+                'mean': sum(durations) / len(durations),
+                'max': max(durations),
+                'runs': len(durations)
+            })
+            for phase, durations in self.durations.items()
+        )
+
+
+def benchmark_taskjuggler(timer, studio):
+    """benchmarks the TaskJugglerScheduler, the durations of its export, tj3
+    solve and csv write-back phases are read from its metrics
+    """
+    from stalker import db, TaskJugglerScheduler
+
+    scheduler = TaskJugglerScheduler(studio=studio, compute_resources=True)
+    try:
+        timer.measure('taskjuggler_schedule', scheduler.schedule)
+        timer.add_metrics('taskjuggler', scheduler)
+    finally:
+        db.DBSession.rollback()
+
+
+def benchmark_native(timer, studio):
+    """benchmarks the NativeScheduler
+    """
+    from stalker import db, NativeScheduler
+
+    scheduler = NativeScheduler(studio=studio, compute_resources=True)
+    try:
+        timer.measure('native_schedule', scheduler.schedule)
+        timer.add_metrics('native', scheduler)
+    finally:
+        db.DBSession.rollback()
+
+
+def benchmark_rollups(timer):
+    """benchmarks the schedule info, percent complete and status propagation
+    calculations
+    """
+    from stalker import db, Project, Task
+
+    # expire everything so the benchmark includes loading the data
+    db.DBSession.expire_all()
+    try:
+        root_tasks = Task.query.filter(Task.parent == None).all()
+
+        def update_schedule_info():
+            for task in root_tasks:
+                task.update_schedule_info()
+
+        timer.measure('update_schedule_info', update_schedule_info)
+
+        def percent_complete():
+            for project in Project.query.all():
+                project.percent_complete
+
+        timer.measure('percent_complete', percent_complete)
+
+        leaves = Task.query.filter(~Task.children.any()).all()
+
+        def status_propagation():
+            for task in leaves:
+                if task.depends:
+                    task.update_status_with_dependent_statuses()
+                task.update_parent_statuses()
+
+        timer.measure('status_propagation', status_propagation)
+    finally:
+        db.DBSession.rollback()
+
+
+def main(argv=None):
+    """parses the command line arguments and runs the benchmarks
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--url', required=True,
+                        help='the database url, the database should be empty')
+    parser.add_argument('--projects', type=int, default=2)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--children', type=int, default=4)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--vacations', type=int, default=1)
+    parser.add_argument('--dependency-density', type=float, default=0.2)
+    parser.add_argument('--alternative-resources', type=int, default=2)
+    parser.add_argument('--time-logs', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-tj3', action='store_true',
+                        help='skip the TaskJugglerScheduler benchmarks')
+    parser.add_argument('--output', default=None,
+                        help='the path of the JSON file, the default is the '
+                             'standard output')
+    args = parser.parse_args(argv)
+
+    from stalker import db, Task, TimeLog, User, Project
+
+    db.setup({'sqlalchemy.url': args.url})
+    db.init()
+
+    parameters = {
+        'projects': args.projects,
+        'depth': args.depth,
+        'children': args.children,
+        'users': args.users,
+        'vacations': args.vacations,
+        'dependency_density': args.dependency_density,
+        'alternative_resources': args.alternative_resources,
+        'time_logs': args.time_logs,
+        'seed': args.seed
+    }
+
+    timer = Timer()
+    studio = timer.measure('create_studio', create_studio, **parameters)
+    studio_id = studio.id
+
+    from stalker import Studio
+    for i in range(args.repeat):
+        studio = Studio.query.get(studio_id)
+        if not args.skip_tj3:
+            benchmark_taskjuggler(timer, studio)
+        studio = Studio.query.get(studio_id)
+        benchmark_native(timer, studio)
+        benchmark_rollups(timer)
+
+    result = {
+        'parameters': parameters,
+        'counts': {
+            'projects': Project.query.count(),
+            'tasks': Task.query.count(),
+            'users': User.query.count(),
+            'time_logs': TimeLog.query.count()
+        },
+        'python': platform.python_version(),
+        'repeat': args.repeat,
+        'phases': timer.summary()
+    }
+
+    output = json.dumps(result, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
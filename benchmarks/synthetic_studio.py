@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+# Stalker a Production Asset Management System
+# Copyright (C) 2009-2016 Erkan Ozgur Yilmaz
+#
+# This file is part of Stalker.
+#
+# Stalker is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License.
+#
+# Stalker is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# Lesser GNU General Public License for more details.
+#
+# You should have received a copy of the Lesser GNU General Public License
+# along with Stalker.  If not, see <http://www.gnu.org/licenses/>
+"""Generates synthetic studios for benchmarking.
+
+The generated data only depends on the given parameters and the random
+seed, so the same studio can be generated again to have repeatable
+benchmarks.
+"""
+
+import datetime
+import random
+
+import pytz
+
+
+def create_studio(projects=2,
+                  depth=3,
+                  children=4,
+                  users=20,
+                  vacations=1,
+                  dependency_density=0.2,
+                  alternative_resources=2,
+                  time_logs=1,
+                  seed=0,
+                  start=None):
+    """creates a synthetic studio and stores it in the database, returns the
+    created Studio instance.
+
+    :param int projects: The number of projects.
+    :param int depth: The depth of the task hierarchy of each project, a depth
+      of 1 means that the projects only have leaf tasks.
+    :param int children: The number of children of each container task and
+      the number of root tasks of each project.
+    :param int users: The number of users.
+    :param int vacations: The number of vacations of each user.
+    :param float dependency_density: The probability of a leaf task to depend
+      to another leaf task of the same project.
+    :param int alternative_resources: The maximum number of alternative
+      resources of a leaf task.
+    :param int time_logs: The number of TimeLogs that are going to be created
+      for each leaf task without any dependency.
+    :param int seed: The random seed.
+    :param start: The start date of the studio, a datetime.datetime instance
+      in UTC, the default is 2016-01-04 (a monday), so the generated data does
+      not depend on the date that it is generated.
+    """
+    from stalker import (db, Studio, Repository, User, Project, Task,
+                         TimeLog, Vacation)
+
+    random_generator = random.Random(seed)
+
+    if start is None:
+        start = datetime.datetime(2016, 1, 4, tzinfo=pytz.utc)
+
+    studio = Studio(
+        name='Synthetic Studio %s' % seed,
+        now=start
+    )
+    studio.start = start
+    studio.end = start + datetime.timedelta(days=365 * 2)
+    db.DBSession.add(studio)
+
+    repository = Repository(
+        name='Synthetic Repository %s' % seed,
+        linux_path='/mnt/S/',
+        windows_path='S:/',
+        osx_path='/Volumes/S/'
+    )
+    db.DBSession.add(repository)
+
+    # users and vacations
+    all_users = []
+    for i in range(users):
+        user = User(
+            name='Synthetic User %s' % i,
+            login='synthetic_user_%s_%s' % (seed, i),
+            email='synthetic_user_%s_%s@stalker.com' % (seed, i),
+            password='synthetic'
+        )
+        all_users.append(user)
+        db.DBSession.add(user)
+
+        for j in range(vacations):
+            vacation_start = start + datetime.timedelta(
+                days=random_generator.randint(7, 300)
+            )
+            vacation = Vacation(
+                user=user,
+                start=vacation_start,
+                end=vacation_start + datetime.timedelta(
+                    days=random_generator.randint(1, 5)
+                )
+            )
+            db.DBSession.add(vacation)
+    db.DBSession.commit()
+
+    # the next free hour of each user for the time logs
+    user_time_log_cursors = dict((user, start) for user in all_users)
+
+    for i in range(projects):
+        project = Project(
+            name='Synthetic Project %s %s' % (seed, i),
+            code='SP%s_%s' % (seed, i),
+            repository=repository
+        )
+        db.DBSession.add(project)
+
+        leaves = []
+        parents = [None]
+        for level in range(depth):
+            is_leaf_level = level == depth - 1
+            new_parents = []
+            for parent in parents:
+                for j in range(children):
+                    kwargs = {
+                        'name': 'Task %s' % j,
+                        'project': project,
+                        'parent': parent
+                    }
+                    if is_leaf_level:
+                        resource = random_generator.choice(all_users)
+                        other_users = [
+                            user for user in all_users if user is not resource
+                        ]
+                        kwargs.update({
+                            'schedule_timing':
+                                random_generator.randint(1, 16),
+                            'schedule_unit': 'h',
+                            'schedule_model': 'effort',
+                            'resources': [resource],
+                            'alternative_resources': random_generator.sample(
+                                other_users,
+                                random_generator.randint(
+                                    0,
+                                    min(alternative_resources,
+                                        len(other_users))
+                                )
+                            )
+                        })
+                    task = Task(**kwargs)
+                    db.DBSession.add(task)
+                    if is_leaf_level:
+                        leaves.append(task)
+                    else:
+                        new_parents.append(task)
+            parents = new_parents
+        db.DBSession.commit()
+
+        # dependencies, only to the previously created leaves to prevent
+        # cycles
+        for j, leaf in enumerate(leaves[1:], 1):
+            if random_generator.random() < dependency_density:
+                leaf.depends = [leaves[random_generator.randrange(j)]]
+        db.DBSession.commit()
+
+        # time logs
+        for leaf in leaves:
+            if leaf.depends:
+                continue
+            resource = leaf.resources[0]
+            for j in range(time_logs):
+                time_log_start = user_time_log_cursors[resource]
+                time_log_end = time_log_start + datetime.timedelta(
+                    hours=random_generator.randint(1, 3)
+                )
+                user_time_log_cursors[resource] = time_log_end
+                db.DBSession.add(
+                    TimeLog(
+                        task=leaf,
+                        resource=resource,
+                        start=time_log_start,
+                        end=time_log_end
+                    )
+                )
+        db.DBSession.commit()
+
+    return studio
@@ -9,7 +9,7 @@ README = open(os.path.join(here, 'README')).read()
 CHANGES = open(os.path.join(here, 'CHANGELOG')).read()
 
 requires = [
-    'sqlalchemy',
+    'sqlalchemy>=1.2',
     'alembic',
     'jinja2',
     'pytz'
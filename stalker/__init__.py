@@ -58,14 +58,15 @@ from stalker.models.project import (Project, ProjectUser, ProjectClient,
 from stalker.models.review import Review, Daily, DailyLink
 from stalker.models.repository import Repository
 from stalker.models.scene import Scene
-from stalker.models.schedulers import SchedulerBase, TaskJugglerScheduler
+from stalker.models.schedulers import (SchedulerBase, TaskJugglerScheduler,
+                                       NativeScheduler, SchedulingJob)
 from stalker.models.sequence import Sequence
 from stalker.models.shot import Shot
 from stalker.models.status import Status, StatusList
 from stalker.models.structure import Structure
 from stalker.models.studio import Studio, WorkingHours, Vacation
 from stalker.models.tag import Tag
-from stalker.models.task import TimeLog, Task, TaskDependency
+from stalker.models.task import TimeLog, Task, TaskDependency, bulk_updates
 from stalker.models.template import FilenameTemplate
 from stalker.models.ticket import Ticket, TicketLog
 from stalker.models.type import Type, EntityType
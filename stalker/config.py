@@ -401,6 +401,12 @@ resource {{department.tjp_id}} "{{department.tjp_id}}" {
         {%- endfor %}
         }
 
+{%- if compute_resources %}
+
+# the tasks with alternative resources
+flags alternatives
+{%- endif %}
+
 # tasks
 {{ tasks_buffer }}
 
@@ -408,11 +414,28 @@ resource {{department.tjp_id}} "{{department.tjp_id}}" {
 taskreport breakdown "{{csv_file_name}}"{
     formats csv
     timeformat "%Y-%m-%d-%H:%M"
-    columns id, start, end {%- if compute_resources %}, resources{% endif %}
-}""",
+    columns id, start, end
+}
+{%- if compute_resources %}
+taskreport alternative_resources "{{csv_file_name}}_resources"{
+    formats csv
+    columns id, resources
+    hidetask ~alternatives
+}
+{%- endif %}""",
 
         tj_command='tj3' if os.name == 'nt' else '/usr/local/bin/tj3',
 
+        # the cache of the TaskJuggler results, see TaskJugglerScheduler
+        tj_cache_path=os.path.expanduser('~/.strc/tj_cache'),
+        tj_cache_size=20,
+
+        # the database lock of Studio.schedule(), the policy is "wait" or
+        # "skip" and the timeout is in seconds (None waits forever)
+        schedule_lock_key=52171,
+        schedule_lock_policy='wait',
+        schedule_lock_timeout=None,
+
         path_template='{{project.code}}/{%- for parent_task in parent_tasks -%}{{parent_task.nice_name}}/{%- endfor -%}',
         filename_template='{{task.entity_type}}_{{task.id}}_{{version.take_name}}_v{{"%03d"|format(version.version_number)}}',
 
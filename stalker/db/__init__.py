@@ -35,7 +35,7 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging_level)
 
 # TODO: Try to get it from the API (it was not working inside a package before)
-alembic_version = '31b1e22b455e'
+alembic_version = '3a1c9c2e7d4b'
 
 
 def setup(settings=None):
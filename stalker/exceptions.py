@@ -80,3 +80,28 @@ class DependencyViolationError(Exception):
 
     def __str__(self):
         return repr(self.value)
+
+
+class SchedulingLockError(Exception):
+    """Raised when the scheduling lock of a Studio can not be acquired in
+    time
+    """
+
+    def __init__(self, value=""):
+        super(SchedulingLockError, self).__init__(value)
+        self.value = value
+
+    def __str__(self):
+        return self.value
+
+
+class SchedulingCancelledError(Exception):
+    """Raised when a schedule is cancelled before it is finished
+    """
+
+    def __init__(self, value=""):
+        super(SchedulingCancelledError, self).__init__(value)
+        self.value = value
+
+    def __str__(self):
+        return self.value
@@ -24,8 +24,8 @@ import pytz
 import functools
 
 from sqlalchemy import (Table, Column, Integer, String, Text, ForeignKey,
-                        DateTime)
-from sqlalchemy.orm import relationship, validates
+                        DateTime, event, inspect)
+from sqlalchemy.orm import relationship, validates, Session
 
 import stalker
 from stalker.db.declarative import Base
@@ -116,7 +116,10 @@ class SimpleEntity(Base):
 
     :param date_updated: The date that this object is updated lastly. For newly
       created entities this is equal to date_created and the date_updated
-      cannot point a date which is before date_created.
+      cannot point a date which is before date_created. It is set to the
+      current date when a change of the object is flushed to the database,
+      unless the date_updated is set explicitly or only the attributes in
+      ``__date_updated_ignored_attrs__`` are changed.
 
     :type date_updated: :class:`datetime.datetime`
 
@@ -133,6 +136,10 @@ class SimpleEntity(Base):
     #       a formatter function
     __name_formatter__ = None
 
+    # the changes of these attributes are not updating the date_updated
+    __date_updated_ignored_attrs__ = ['date_updated', 'updated_by',
+                                      'updated_by_id']
+
     __tablename__ = "SimpleEntities"
     id = Column("id", Integer, primary_key=True)
 
@@ -588,6 +595,34 @@ class SimpleEntity(Base):
         return html_class
 
 
+@event.listens_for(Session, 'before_flush')
+def update_date_updated(session, flush_context, instances):
+    """Sets the date_updated of the modified SimpleEntities to the current
+    date before they are flushed, so the changes can be found by looking at
+    the date_updated values (like the incremental schedules do).
+
+    :param session: The session that is going to be flushed.
+    :param flush_context: not used
+    :param instances: not used
+    """
+    now = datetime.datetime.now(pytz.utc)
+    for entity in session.dirty:
+        if not isinstance(entity, SimpleEntity):
+            continue
+
+        ignored_attrs = entity.__date_updated_ignored_attrs__
+        changed_attrs = [
+            attr.key for attr in inspect(entity).attrs
+            if attr.history.has_changes()
+        ]
+        # do not override a date set by the user
+        if 'date_updated' in changed_attrs:
+            continue
+
+        if any(key not in ignored_attrs for key in changed_attrs):
+            entity.date_updated = now
+
+
 class Entity(SimpleEntity):
     """Another base data class that adds tags and notes to the attributes list.
 
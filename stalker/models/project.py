@@ -464,15 +464,29 @@ class Project(Entity, ReferenceMixin, StatusMixin, DateRangeMixin, CodeMixin):
         """
         return self.active
 
+    def _get_root_tasks_with_rollups(self):
+        """returns the root tasks of this project, if the cached
+        schedule_seconds or total_logged_seconds value of any of them is
+        missing the values of the whole project are recomputed at once
+        instead of walking the hierarchy of each root task
+        """
+        from stalker import Task
+
+        root_tasks = self.root_tasks
+        for task in root_tasks:
+            if task._schedule_seconds is None \
+               or task._total_logged_seconds is None:
+                Task.recompute_rollups(self)
+                break
+        return root_tasks
+
     @property
     def total_logged_seconds(self):
         """returns an integer representing the total TimeLog seconds recorded
         in child tasks.
         """
         total_logged_seconds = 0
-        for task in self.root_tasks:
-            if task.total_logged_seconds is None:
-                task.update_schedule_info()
+        for task in self._get_root_tasks_with_rollups():
             total_logged_seconds += task.total_logged_seconds
 
         logger.debug('project.total_logged_seconds: %s' % total_logged_seconds)
@@ -485,10 +499,8 @@ class Project(Entity, ReferenceMixin, StatusMixin, DateRangeMixin, CodeMixin):
         the in child tasks in seconds
         """
         schedule_seconds = 0
-        for task in self.root_tasks:
-            if task.schedule_seconds is None:
-                task.update_schedule_info()
-            schedule_seconds += task.schedule_seconds
+        for task in self._get_root_tasks_with_rollups():
+            schedule_seconds += task.schedule_seconds or 0
 
         logger.debug('project.schedule_seconds: %s' % schedule_seconds)
 
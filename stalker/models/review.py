@@ -27,7 +27,6 @@ from sqlalchemy.orm import relationship, validates, synonym
 from stalker.db import Base
 from stalker.db.session import DBSession
 from stalker.log import logging_level
-from stalker.models import walk_hierarchy
 from stalker.models.entity import Entity, SimpleEntity
 from stalker.models.link import Link
 from stalker.models.status import Status
@@ -135,7 +134,7 @@ class Review(SimpleEntity, ScheduleMixin, StatusMixin):
 
         # set the status to NEW
         with DBSession.no_autoflush:
-            new = Status.query.filter_by(code='NEW').first()
+            new = Status.get_by_code('NEW')
         self.status = new
 
         # set the review_number
@@ -223,7 +222,7 @@ class Review(SimpleEntity, ScheduleMixin, StatusMixin):
 
         # set self status to RREV
         with DBSession.no_autoflush:
-            rrev = Status.query.filter_by(code='RREV').first()
+            rrev = Status.get_by_code('RREV')
 
             # set self status to RREV
             self.status = rrev
@@ -236,7 +235,7 @@ class Review(SimpleEntity, ScheduleMixin, StatusMixin):
         """
         # set self status to APP
         with DBSession.no_autoflush:
-            app = Status.query.filter_by(code='APP').first()
+            app = Status.get_by_code('APP')
             self.status = app
 
         # call finalize review_set
@@ -246,8 +245,8 @@ class Review(SimpleEntity, ScheduleMixin, StatusMixin):
         """finalizes the current review set Review decisions
         """
         with DBSession.no_autoflush:
-            hrev = Status.query.filter_by(code='HREV').first()
-            cmpl = Status.query.filter_by(code='CMPL').first()
+            hrev = Status.get_by_code('HREV')
+            cmpl = Status.get_by_code('CMPL')
 
         # check if all the reviews are finalized
         if self.is_finalized():
@@ -283,29 +282,19 @@ class Review(SimpleEntity, ScheduleMixin, StatusMixin):
                 self.task.schedule_timing = timing
                 self.task.schedule_unit = unit
 
-            # update task parent statuses
-            self.task.update_parent_statuses()
-
-            from stalker import TaskDependency
-            # update dependent task statuses
-
-            for dep in walk_hierarchy(self.task, 'dependent_of', method=1):
-                logger.debug('current TaskDependency object: %s' % dep)
-                dep.update_status_with_dependent_statuses()
+            # update the statuses of the dependent tasks and the parents all
+            # together
+            from stalker import Task
+            for dep in Task.propagate_statuses([self.task]):
+                logger.debug('updated dependent task: %s' % dep)
                 if dep.status.code in ['HREV', 'PREV', 'DREV', 'OH', 'STOP']:
                     # for tasks that are still be able to continue to work,
                     # change the dependency_target to "onstart" to allow
                     # the two of the tasks to work together and still let the
                     # TJ to be able to schedule the tasks correctly
-                    with DBSession.no_autoflush:
-                        tdeps = TaskDependency.query\
-                            .filter_by(depends_to=dep).all()
-                    for tdep in tdeps:
+                    for tdep in dep.task_dependent_of:
                         tdep.dependency_target = 'onstart'
 
-                # also update the status of parents of dependencies
-                dep.update_parent_statuses()
-
         else:
             logger.debug('not all reviews are finalized yet!')
 
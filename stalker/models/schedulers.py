@@ -17,8 +17,10 @@
 # along with Stalker.  If not, see <http://www.gnu.org/licenses/>
 
 import os
+import re
 import subprocess
 import tempfile
+import threading
 import datetime
 import time
 import csv
@@ -38,11 +40,140 @@ class SchedulerBase(object):
     """This is the base class for schedulers.
 
     All the schedulers should be derived from this class.
+
+    After each schedule the :attr:`.metrics` attribute holds a dictionary
+    with the durations of the scheduling phases in seconds under the
+    ``timings`` key (the phases are listed in :attr:`._metric_phases`, along
+    with the ``total`` duration), the number of exported tasks, bookings,
+    dependencies and the updated rows under the ``counts`` key, the
+    ``updated_row_counts`` (see :meth:`._write_schedule_data`) and the peak
+    memory usage of the process and its child processes (tj3) in bytes under
+    the ``peak_memory`` and ``peak_child_memory`` keys (None if it can not be
+    retrieved in the current platform).
+
+    If the :attr:`.progress_callback` attribute is set to a callable, it is
+    called with the name of the current phase and a message while scheduling
+    (see :meth:`._report_progress`). A running schedule can be cancelled from
+    another thread by calling :meth:`.cancel`, which raises a
+    :class:`.SchedulingCancelledError` in the scheduling thread.
+
+    The shifts of the computed dates of the tasks are recorded in the
+    schedule history of the :attr:`.studio` while the results are written
+    back to the database (see :meth:`._create_schedule_run`). Every schedule
+    is recorded, even if it doesn't move any task, with the
+    :attr:`.Studio.scheduling_started_at` of the studio as its date, which is
+    stored in the :attr:`.scheduled_at` attribute.
     """
 
+    _metric_phases = []
+
     def __init__(self, studio=None):
         self._studio = None
         self.studio = studio
+        self.updated_row_counts = {}
+        self.scheduled_at = None
+        self.metrics = {}
+        self._reset_metrics()
+        self.progress_callback = None
+        self._cancel_event = threading.Event()
+
+    def _report_progress(self, phase, message=''):
+        """calls the :attr:`.progress_callback` with the given phase and
+        message. The callback may be called from more than one thread.
+
+        :param str phase: The name of the phase, one of "export", "load",
+          "solve" or "write_back".
+        :param str message: The message, like a progress line of tj3.
+        """
+        if self.progress_callback:
+            self.progress_callback(phase, message)
+
+    def cancel(self):
+        """cancels the schedule that is running in another thread
+        """
+        self._cancel_event.set()
+
+    @property
+    def is_cancelled(self):
+        """returns True if the schedule is cancelled
+        """
+        return self._cancel_event.is_set()
+
+    def _check_cancelled(self):
+        """raises a SchedulingCancelledError if the schedule is cancelled, the
+        cancel state is reset so the scheduler can be used again
+        """
+        if self._cancel_event.is_set():
+            self._cancel_event.clear()
+            from stalker.exceptions import SchedulingCancelledError
+            raise SchedulingCancelledError(
+                '%s.schedule() is cancelled' % self.__class__.__name__
+            )
+
+    def _reset_metrics(self):
+        """resets the :attr:`.metrics` to its initial state
+        """
+        self.metrics = {
+            'timings': dict((phase, 0.0) for phase in self._metric_phases),
+            'counts': {
+                'tasks': 0,
+                'bookings': 0,
+                'dependencies': 0,
+                'updated_rows': 0
+            },
+            'updated_row_counts': {},
+            'tjp_file_size': 0,
+            'peak_memory': None,
+            'peak_child_memory': None
+        }
+
+    def _add_timing(self, phase, duration):
+        """adds the given duration to the given phase in the
+        :attr:`.metrics`
+
+        :param str phase: The name of the phase.
+        :param float duration: The duration in seconds.
+        """
+        timings = self.metrics['timings']
+        timings[phase] = timings.get(phase, 0.0) + duration
+
+    def _finalize_metrics(self, duration):
+        """fills the remaining values of the :attr:`.metrics` at the end of
+        the schedule
+
+        :param float duration: The total duration of the schedule in seconds.
+        """
+        self.metrics['timings']['total'] = duration
+        self.metrics['updated_row_counts'] = dict(self.updated_row_counts)
+        self.metrics['counts']['updated_rows'] = \
+            sum(self.updated_row_counts.values())
+        self.metrics['peak_memory'] = self._get_peak_memory()
+        self.metrics['peak_child_memory'] = \
+            self._get_peak_memory(children=True)
+        logger.debug('schedule metrics: %s' % self.metrics)
+
+    @classmethod
+    def _get_peak_memory(cls, children=False):
+        """returns the peak resident memory usage of the current process or
+        the largest of its child processes in bytes, returns None if it is
+        not possible to get it in the current platform (Windows)
+
+        :param bool children: If True the memory usage of the child processes
+          is returned.
+        """
+        try:
+            import resource
+        except ImportError:
+            return None
+
+        import sys
+        usage = resource.getrusage(
+            resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+        )
+        if sys.platform == 'darwin':
+            return usage.ru_maxrss
+        # in kilobytes
+        return usage.ru_maxrss * 1024
 
     def _validate_studio(self, studio_in):
         """validates the given studio_in value
@@ -75,6 +206,476 @@ class SchedulerBase(object):
         """
         raise NotImplementedError
 
+    def _get_init_kwargs(self):
+        """returns the arguments that are needed to create a new scheduler
+        with the same settings (except the studio), the derivatives should
+        extend it with their own arguments
+        """
+        return {}
+
+    @property
+    def is_partial(self):
+        """returns True if the scheduler is not scheduling all the active
+        projects of the :attr:`.studio`, so the changes in the other projects
+        are not scheduled. :meth:`.Studio.schedule` doesn't update the
+        :attr:`.Studio.last_scheduled_at` after a partial schedule.
+        """
+        projects = getattr(self, '_projects', None)
+        if not projects or self.studio is None:
+            return False
+
+        project_ids = set(project.id for project in projects)
+        return any(
+            project.id not in project_ids
+            for project in self.studio.active_projects
+        )
+
+    def _create_schedule_run(self, connection):
+        """records a new schedule of the :attr:`.studio` in the schedule
+        history, stores its date in the :attr:`.scheduled_at` attribute and
+        returns its id
+
+        :param connection: The connection of the current transaction.
+        """
+        from stalker.models.studio import Schedule_Runs
+
+        # use the date of the schedule of the studio, so the history lines up
+        # with the Studio.last_scheduled_at
+        self.scheduled_at = None
+        if self.studio is not None:
+            self.scheduled_at = self.studio.scheduling_started_at
+        if self.scheduled_at is None:
+            self.scheduled_at = datetime.datetime.now(pytz.utc)
+        result = connection.execute(
+            Schedule_Runs.insert().values(
+                studio_id=self._get_studio_id(),
+                scheduled_at=self.scheduled_at
+            )
+        )
+        return result.inserted_primary_key[0]
+
+    def _get_studio_id(self):
+        """returns the id of the :attr:`.studio` or None if there is no studio
+        """
+        if self.studio is None:
+            return None
+        return self.studio.id
+
+    def _write_schedule_data(self, update_data, update_user_data=None):
+        """writes the scheduled dates of the tasks and projects and the
+        computed resources of the tasks to the database.
+
+        Only the rows that have a different value than the current one are
+        updated, and the computed resources are updated by inserting and
+        deleting the difference, so the rows of the tasks that are scheduled
+        to the same dates with the same resources are not touched. The shifts
+        of the computed dates of the tasks that have been scheduled before are
+        recorded in the schedule history, which records the schedule even if
+        there is no data to write. Returns a dictionary showing the number of
+        updated tasks, updated projects, inserted and deleted computed
+        resources, which is also stored in the :attr:`.updated_row_counts`
+        attribute.
+
+        :param update_data: A list of dictionaries with "b_id", "start",
+          "end", "computed_start" and "computed_end" keys, where "b_id" is the
+          id of a Task or a Project.
+        :param update_user_data: A list of dictionaries with "task_id" and
+          "resource_id" keys. If it is None the computed resources are not
+          updated. The computed resources of the tasks that are not in
+          ``update_data`` are left untouched.
+        """
+        from sqlalchemy import bindparam, text
+        from stalker import db, Task, Project
+        from stalker.models.studio import Schedule_Deltas
+        from stalker.models.task import Task_Computed_Resources
+
+        write_back_start = time.time()
+        self.updated_row_counts = {
+            'tasks': 0,
+            'projects': 0,
+            'computed_resources_inserted': 0,
+            'computed_resources_deleted': 0
+        }
+
+        connection = db.DBSession.connection()
+        run_id = self._create_schedule_run(connection)
+
+        if not update_data:
+            return self.updated_row_counts
+
+        entity_ids = [data['b_id'] for data in update_data]
+        keys = ['start', 'end', 'computed_start', 'computed_end']
+
+        for table, count_key in [(Task.__table__, 'tasks'),
+                                 (Project.__table__, 'projects')]:
+            # get the current values
+            current_values = dict(
+                (r[0], r[1:])
+                for r in connection.execute(
+                    text(
+                        'select id, start, "end", computed_start, '
+                        'computed_end from "%s" where id = any(:ids)' %
+                        table.name
+                    ),
+                    ids=entity_ids
+                )
+            )
+
+            changed_data = [
+                data for data in update_data
+                if data['b_id'] in current_values and
+                current_values[data['b_id']] !=
+                tuple(data[key] for key in keys)
+            ]
+
+            if changed_data:
+                update_statement = table.update()\
+                    .where(table.c.id == bindparam('b_id'))\
+                    .values(
+                        start=bindparam('start'),
+                        end=bindparam('end'),
+                        computed_start=bindparam('computed_start'),
+                        computed_end=bindparam('computed_end')
+                    )
+                connection.execute(update_statement, changed_data)
+            self.updated_row_counts[count_key] = len(changed_data)
+
+            if table is Task.__table__:
+                # record the shifts of the previously scheduled tasks
+                deltas = []
+                for data in changed_data:
+                    computed_start, computed_end = \
+                        current_values[data['b_id']][2:]
+                    if computed_start is None or computed_end is None:
+                        continue
+                    start_shift = int(
+                        (data['computed_start'] - computed_start)
+                        .total_seconds()
+                    )
+                    end_shift = int(
+                        (data['computed_end'] - computed_end).total_seconds()
+                    )
+                    if start_shift or end_shift:
+                        deltas.append({
+                            'task_id': data['b_id'],
+                            'start_shift': start_shift,
+                            'end_shift': end_shift
+                        })
+                if deltas:
+                    for delta in deltas:
+                        delta['run_id'] = run_id
+                    connection.execute(Schedule_Deltas.insert(), deltas)
+
+        # update computed resources data
+        if update_user_data is not None:
+            current_resources = set(
+                connection.execute(
+                    text(
+                        'select task_id, resource_id '
+                        'from "Task_Computed_Resources" '
+                        'where task_id = any(:ids)'
+                    ),
+                    ids=entity_ids
+                ).fetchall()
+            )
+            new_resources = set(
+                (int(data['task_id']), int(data['resource_id']))
+                for data in update_user_data
+            )
+
+            resources_to_delete = [
+                {'b_task_id': task_id, 'b_resource_id': resource_id}
+                for task_id, resource_id in
+                sorted(current_resources - new_resources)
+            ]
+            resources_to_insert = [
+                {'task_id': task_id, 'resource_id': resource_id}
+                for task_id, resource_id in
+                sorted(new_resources - current_resources)
+            ]
+
+            if resources_to_delete:
+                delete_resources_statement = Task_Computed_Resources.delete()\
+                    .where(
+                        (Task_Computed_Resources.c.task_id ==
+                         bindparam('b_task_id')) &
+                        (Task_Computed_Resources.c.resource_id ==
+                         bindparam('b_resource_id'))
+                    )
+                connection.execute(
+                    delete_resources_statement,
+                    resources_to_delete
+                )
+
+            if resources_to_insert:
+                insert_resources_statement = Task_Computed_Resources.insert()\
+                    .values(
+                        task_id=bindparam('task_id'),
+                        resource_id=bindparam('resource_id')
+                    )
+                connection.execute(
+                    insert_resources_statement,
+                    resources_to_insert
+                )
+
+            self.updated_row_counts['computed_resources_inserted'] = \
+                len(resources_to_insert)
+            self.updated_row_counts['computed_resources_deleted'] = \
+                len(resources_to_delete)
+
+        self._add_timing('db_write_back', time.time() - write_back_start)
+        logger.debug('updated row counts: %s' % self.updated_row_counts)
+        return self.updated_row_counts
+
+    def _validate_projects(self, projects):
+        """validates the given projects value
+        """
+        if projects is None:
+            projects = []
+
+        msg = '%(class)s.projects should be a list of ' \
+            'stalker.models.project.Project instances, not ' \
+            '%(projects_class)s'
+
+        if not isinstance(projects, list):
+            raise TypeError(
+                msg % {
+                    'class': self.__class__.__name__,
+                    'projects_class': projects.__class__.__name__
+                }
+            )
+
+        from stalker import Project
+        for item in projects:
+            if not isinstance(item, Project):
+                raise TypeError(
+                    msg % {
+                        'class': self.__class__.__name__,
+                        'projects_class': item.__class__.__name__
+                    }
+                )
+
+        return projects
+
+    @property
+    def projects(self):
+        """getter for the _project attribute
+        """
+        return self._projects
+
+    @projects.setter
+    def projects(self, projects):
+        """setter for the _project attribute
+        """
+        self._projects = self._validate_projects(projects)
+
+
+class SchedulingJob(object):
+    """Runs :meth:`.Studio.schedule` in a background thread.
+
+    SchedulingJob instances are created and started by
+    :meth:`.Studio.schedule_async`, which returns them as a handle to the
+    running schedule::
+
+      def report(phase, message):
+          print('%s: %s' % (phase, message))
+
+      job = studio.schedule_async(scheduled_by=user, callback=report)
+      # do something else
+      result = job.wait()  # returns the tj3 output or raises the error
+
+    The schedule runs in its own database session. The Studio is marked with
+    :attr:`.Studio.is_scheduling` and :attr:`.Studio.is_scheduling_by` and it
+    is committed before the scheduler starts, so other clients can see that
+    the Studio is being scheduled. The scheduled data is committed when the
+    scheduler finishes successfully, if it fails or is cancelled the changes
+    are rolled back and only the :attr:`.Studio.is_scheduling` and
+    :attr:`.Studio.is_scheduling_by` attributes are reset and committed. The
+    objects in the session of the calling thread are not updated, expire them
+    to see the new data.
+
+    The schedule is done with a new scheduler that is created with the same
+    settings of the scheduler of the Studio (see
+    :meth:`.SchedulerBase._get_init_kwargs`), which is stored in the
+    :attr:`.scheduler` attribute when the worker thread starts. The
+    :attr:`.TaskJugglerScheduler.projects`,
+    :attr:`.TaskJugglerScheduler.departments` and
+    :attr:`.TaskJugglerScheduler.frozen_statuses` of the scheduler are queried
+    again in the session of the worker thread, so they are not shared between
+    the sessions of the threads and the scheduler of the Studio is left
+    untouched and can still be used in the calling thread.
+
+    The callback is called with the phase and a message. The phases of the
+    scheduler are "export", "load", "solve" and "write_back" (the tj3 progress
+    and error lines are reported in the "solve" phase) and the job reports
+    "done", "failed" or "cancelled" (with the error message) at the end. The
+    callback is called from the worker threads.
+
+    :param studio: A :class:`.Studio` instance which is already stored in the
+      database and has a scheduler.
+    :param scheduled_by: A :class:`.User` instance who is doing the
+      scheduling.
+    :param callback: A callable that accepts the phase and message arguments.
+    """
+
+    _entity_attr_names = ['projects', 'departments', 'frozen_statuses']
+
+    def __init__(self, studio, scheduled_by=None, callback=None):
+        self.studio_id = studio.id
+        self.scheduler_class = studio.scheduler.__class__
+        self.scheduler = None
+        self.scheduled_by_id = \
+            scheduled_by.id if scheduled_by is not None else None
+        self.callback = callback
+
+        # the entities of the scheduler belong to the session of the calling
+        # thread, keep their ids to query them again in the worker thread
+        self.scheduler_kwargs = studio.scheduler._get_init_kwargs()
+        self.entity_ids = {}
+        for attr_name in self._entity_attr_names:
+            if attr_name in self.scheduler_kwargs:
+                self.entity_ids[attr_name] = [
+                    entity.id
+                    for entity in self.scheduler_kwargs.pop(attr_name)
+                ]
+
+        self.result = None
+        self.exception = None
+
+        self._cancelled = False
+        self._done_event = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+
+    def start(self):
+        """starts the schedule in a background thread
+        """
+        self._thread.start()
+
+    def _report_progress(self, phase, message=''):
+        """calls the callback with the given phase and message
+        """
+        if self.callback:
+            self.callback(phase, message)
+
+    def _run(self):
+        """runs the schedule, this is the target of the worker thread
+        """
+        from stalker import db, Studio, User
+        from stalker.exceptions import SchedulingCancelledError
+
+        try:
+            studio = Studio.query.get(self.studio_id)
+            scheduled_by = None
+            if self.scheduled_by_id is not None:
+                scheduled_by = User.query.get(self.scheduled_by_id)
+
+            # let the others know that the studio is being scheduled
+            studio.is_scheduling = True
+            studio.is_scheduling_by = scheduled_by
+            db.DBSession.commit()
+
+            if self._cancelled:
+                raise SchedulingCancelledError('the schedule is cancelled')
+
+            self.scheduler = self._create_scheduler()
+            self.scheduler.progress_callback = self._report_progress
+            # the job may be cancelled before the scheduler is created
+            if self._cancelled:
+                raise SchedulingCancelledError('the schedule is cancelled')
+
+            studio.scheduler = self.scheduler
+            self.result = studio.schedule(scheduled_by=scheduled_by)
+
+            # the write back can not be interrupted, so check it once more
+            if self._cancelled:
+                raise SchedulingCancelledError('the schedule is cancelled')
+
+            db.DBSession.commit()
+            self._report_progress('done', self.result or '')
+        except Exception as e:
+            self.exception = e
+            self._roll_back()
+            if isinstance(e, SchedulingCancelledError):
+                self._report_progress('cancelled', str(e))
+            else:
+                self._report_progress('failed', str(e))
+        finally:
+            if self.scheduler is not None:
+                self.scheduler.progress_callback = None
+            db.DBSession.remove()
+            self._done_event.set()
+
+    def _create_scheduler(self):
+        """creates the scheduler of the worker thread, the projects,
+        departments and frozen statuses of the scheduler are queried in the
+        session of the worker thread
+        """
+        from stalker import Project, Department, Status
+        entity_classes = {
+            'projects': Project,
+            'departments': Department,
+            'frozen_statuses': Status
+        }
+        kwargs = dict(self.scheduler_kwargs)
+        for attr_name, ids in self.entity_ids.items():
+            entity_class = entity_classes[attr_name]
+            kwargs[attr_name] = [entity_class.query.get(id_) for id_ in ids]
+        return self.scheduler_class(**kwargs)
+
+    def _roll_back(self):
+        """rolls back the changes of the schedule and resets the scheduling
+        info of the Studio
+        """
+        from stalker import db, Studio
+        try:
+            db.DBSession.rollback()
+            studio = Studio.query.get(self.studio_id)
+            studio.is_scheduling = False
+            studio.is_scheduling_by = None
+            db.DBSession.commit()
+        except Exception as e:
+            logger.error(
+                'could not reset the scheduling info of Studio(%s): %s' %
+                (self.studio_id, e)
+            )
+            db.DBSession.rollback()
+
+    def cancel(self):
+        """cancels the schedule. The running tj3 processes are killed and
+        the changes are rolled back. Use :meth:`.wait` to wait for the job to
+        finish.
+        """
+        self._cancelled = True
+        if self.scheduler is not None:
+            self.scheduler.cancel()
+
+    @property
+    def cancelled(self):
+        """returns True if the job is cancelled
+        """
+        return self._cancelled
+
+    def done(self):
+        """returns True if the job is finished
+        """
+        return self._done_event.is_set()
+
+    def wait(self, timeout=None):
+        """waits the job to finish and returns the result of the schedule or
+        raises the error that has been raised while scheduling. Returns None
+        if the job is not finished in the given timeout.
+
+        :param float timeout: The timeout in seconds. The default is None,
+          which waits until the job is finished.
+        """
+        if not self._done_event.wait(timeout):
+            return None
+
+        if self.exception is not None:
+            raise self.exception
+        return self.result
+
 
 class TaskJugglerScheduler(SchedulerBase):
     """This is the main scheduler for Stalker right now.
@@ -162,24 +763,138 @@ class TaskJugglerScheduler(SchedulerBase):
       | Vacation   | Vacation    |
       +------------+-------------+
 
+    The contiguous TimeLogs of the same resource in the same task are merged
+    in to one interval and all the intervals of a resource are exported with
+    a single booking line per task, which keeps the tjp file small when the
+    TimeLogs are entered in small increments.
+
     :param bool compute_resources: When set to True it will also consider
       :attr:`.Task.alternative_resources` attribute and will fill
-      :attr:`.Task.computed_resources` attribute for each Task. With
-      :class:`.TaskJugglerScheduler` when the total number of Task is around
-      15k it will take around 7 minutes to generate this data, so by default it
-      is False.
+      :attr:`.Task.computed_resources` attribute for each Task. Only the leaf
+      tasks that have alternative resources are flagged in the tjp file and
+      tj3 reports the allocated resources of those tasks only, in a second
+      csv file (see :attr:`.resources_csv_file_full_path`). The computed
+      resources of the other leaf tasks are their :attr:`.Task.resources` and
+      the container tasks have no computed resources. The default is False.
     :param int parsing_method: Choose between SQL (0) or Pure Python (1)
-      parsing. The default is SQL.
+      parsing. The default is SQL. Use COPY (2) for very large studios, in
+      which the csv files are streamed to a temporary table with the
+      PostgreSQL ``COPY`` command and the tasks, projects and computed
+      resources are updated with set based queries. In this mode the changed
+      rows are detected in the database.
+
+    :param bool incremental: When set to True only the projects that have been
+      changed since the :attr:`.Studio.last_scheduled_at` are exported, along
+      with the projects that are connected to them by sharing a resource or by
+      a cross project dependency. The computed values of the other projects
+      are left untouched. The default is False.
+
+    :param int max_workers: The maximum number of tj3 processes that are run
+      concurrently. When it is bigger than 1, the projects are grouped in to
+      sets of projects that are not sharing any resources and don't have any
+      cross project dependencies (including the ones in the ``overrides``),
+      and each group is written to its own tjp
+      file and solved with a separate tj3 process. The default is 1, which
+      exports all the projects to the same tjp file.
+
+    :param bool use_cache: When set to True the csv files that tj3 generates
+      are stored in a cache folder (``defaults.tj_cache_path``) by using the
+      hash of the tjp file content as the key. If the same tjp content is
+      scheduled again, tj3 is not run and the cached csv file is used. Only
+      the last ``defaults.tj_cache_size`` results are kept in the cache. The
+      default is False.
+
+    :param bool dry_run: When set to True the database is not updated, and
+      :meth:`.schedule` returns a dictionary of Task (and Project) ids to
+      ``(computed_start, computed_end, computed_resource_ids)`` tuples, which
+      is also stored in the :attr:`.dry_run_result` attribute. It is useful
+      for "what if" scenarios along with the ``overrides`` argument. The
+      computed resources are always retrieved in a dry run. Dry runs are not
+      writing anything to the database, so more than one scenario can be run
+      concurrently in different threads by using a different scheduler
+      instance and a :class:`.Studio` instance of the current thread's
+      session for each scenario. The default is False.
+
+    :param dict overrides: A dictionary of Task ids (or Task instances) to a
+      dictionary of the values that are going to be used in place of the
+      values in the database while exporting that task. The supported keys
+      are "resources" and "alternative_resources" (a list of User ids or
+      User instances), "depends" (a list of Task ids or Task instances, the
+      dependency target is "onend"), "schedule_timing", "schedule_unit",
+      "schedule_model" and "priority". The database is not changed. The
+      default is None.
+
+    :param bool freeze_other_projects: When set to True and the ``projects``
+      argument is given, the tasks of the other projects are exported as
+      frozen tasks (see below). The default is False, which doesn't export
+      the other projects at all.
+
+    :param departments: A list of :class:`.Department` instances. If given,
+      only the leaf tasks that have a resource from one of these departments
+      are scheduled and the other leaf tasks are frozen. The default is None.
+
+    :param frozen_statuses: A list of :class:`.Status` instances. The leaf
+      tasks with one of these statuses are frozen, so passing the WIP, PREV,
+      HREV, DREV, OH, STOP and CMPL statuses will only schedule the tasks that
+      are not started yet. The default is None.
+
+    **Frozen Tasks**
+
+    A frozen task is exported with its current :attr:`.Task.computed_start`
+    and :attr:`.Task.computed_end` values as fixed dates, with the highest
+    priority and its :attr:`.Task.computed_resources` (or
+    :attr:`.Task.resources` if it has not any computed resources) allocated
+    for the whole period, so the resources are still not available to the
+    other tasks while the frozen tasks are not scheduled again, which makes
+    the scheduling problem much smaller. The dependencies of the frozen tasks
+    are not exported and the data of the frozen tasks is not written back to
+    the database. Tasks that have not been scheduled before (without a
+    computed_start or computed_end value) are never frozen.
+
+    The durations of the sql export, template render, file write, tj3 solve,
+    csv parse and db write back phases, the number of exported tasks,
+    bookings and dependencies, the number of updated rows, the size of the
+    tjp files and the peak memory usage are stored in the :attr:`.metrics`
+    attribute after each schedule.
+
+    .. warning::
+       **Incremental Scheduling**
+
+       The changes are detected by looking at the ``date_created`` and
+       ``date_updated`` attributes of the Projects, Tasks, TimeLogs, Users and
+       Vacations. The ``date_updated`` is updated automatically when a change
+       is flushed with the ORM, along with the ``date_updated`` of the
+       depending task for dependency changes, the task of a deleted TimeLog
+       and the project of a deleted Task. The changes that are done with
+       plain SQL are not detected, so do a full schedule after them.
     """
 
+    _tasks_buffer_placeholder = '__stalker_tasks_buffer__'
+
+    # matches the ids in the resources column, "User_1 (User_1), ..."
+    _resource_id_pattern = re.compile(r'_(\d+)\)')
+
+    _metric_phases = ['sql_export', 'template_render', 'file_write',
+                      'tj3_solve', 'csv_parse', 'db_write_back']
+
     def __init__(self,
                  studio=None,
                  compute_resources=False,
                  parsing_method=0,
-                 projects=None):
+                 projects=None,
+                 incremental=False,
+                 max_workers=1,
+                 use_cache=False,
+                 dry_run=False,
+                 overrides=None,
+                 freeze_other_projects=False,
+                 departments=None,
+                 frozen_statuses=None):
         super(TaskJugglerScheduler, self).__init__(studio)
 
         self.tjp_content = ''
+        self.tjp_content_hash = None
+        self.num_of_records = 0
 
         self.temp_file_full_path = None
         self.temp_file_path = None
@@ -189,6 +904,7 @@ class TaskJugglerScheduler(SchedulerBase):
         self.tjp_file = None
 
         self.csv_file_full_path = None
+        self.resources_csv_file_full_path = None
         self.csv_file = None
 
         self.compute_resources = compute_resources
@@ -197,6 +913,53 @@ class TaskJugglerScheduler(SchedulerBase):
         self._projects = []
         self.projects = projects
 
+        self.incremental = incremental
+
+        self._max_workers = 1
+        self.max_workers = max_workers
+
+        self.use_cache = use_cache
+
+        self.dry_run = dry_run
+        self.dry_run_result = {}
+        self._overrides = {}
+        self.overrides = overrides
+
+        self.freeze_other_projects = freeze_other_projects
+        self._departments = []
+        self.departments = departments
+        self._frozen_statuses = []
+        self.frozen_statuses = frozen_statuses
+        self.frozen_task_ids = set()
+
+        # the computed resources are read from tj3 only for the tasks with
+        # alternative resources
+        self.alternative_task_ids = set()
+        self.task_resource_ids = {}
+
+        self._jobs = []
+        self._process = None
+
+    def _get_init_kwargs(self):
+        """returns the arguments that are needed to create a new scheduler
+        with the same settings
+        """
+        kwargs = super(TaskJugglerScheduler, self)._get_init_kwargs()
+        kwargs.update({
+            'compute_resources': self.compute_resources,
+            'parsing_method': self.parsing_method,
+            'projects': self.projects,
+            'incremental': self.incremental,
+            'max_workers': self.max_workers,
+            'use_cache': self.use_cache,
+            'dry_run': self.dry_run,
+            'overrides': self.overrides,
+            'freeze_other_projects': self.freeze_other_projects,
+            'departments': self.departments,
+            'frozen_statuses': self.frozen_statuses
+        })
+        return kwargs
+
     def _create_tjp_file(self):
         """creates the tjp file
         """
@@ -205,29 +968,285 @@ class TaskJugglerScheduler(SchedulerBase):
         self.temp_file_name = os.path.basename(self.temp_file_full_path)
         self.tjp_file_full_path = self.temp_file_full_path + ".tjp"
         self.csv_file_full_path = self.temp_file_full_path + ".csv"
+        self.resources_csv_file_full_path = \
+            self._get_resources_csv_file_path(self.csv_file_full_path)
+
+    @classmethod
+    def _get_resources_csv_file_path(cls, csv_file_full_path):
+        """returns the path of the csv file that contains the computed
+        resources of the tasks with alternative resources for the given csv
+        file path
+        """
+        return '%s_resources.csv' % os.path.splitext(csv_file_full_path)[0]
 
-    def _create_tjp_file_content(self):
-        """creates the tjp file content
+    def _get_project_ids(self):
+        """returns the ids of the projects that are going to be exported to
+        the tjp file
         """
-        from jinja2 import Template
+        from stalker import db
 
-        start = time.time()
+        if not self.projects or self.freeze_other_projects:
+            # the other projects are exported as frozen
+            project_ids = [
+                r[0] for r in db.DBSession.connection().execute(
+                    'select id from "Projects" order by id'
+                ).fetchall()
+            ]
+        else:
+            project_ids = [project.id for project in self.projects]
+
+        if self.incremental and self.studio \
+           and self.studio.last_scheduled_at:
+            changed_project_ids = \
+                self._get_changed_project_ids(self.studio.last_scheduled_at)
+            connected_project_ids = \
+                self._get_connected_project_ids(changed_project_ids)
+            project_ids = [
+                p_id for p_id in project_ids
+                if p_id in connected_project_ids
+            ]
+            logger.debug(
+                'incremental scheduling, exporting projects: %s' % project_ids
+            )
 
-        # use new way of doing it, it will just work with PostgreSQL
-        import json
+        return project_ids
+
+    def _get_changed_project_ids(self, since):
+        """returns the ids of the projects that have a Task, TimeLog or a
+        resource changed after the given datetime
+
+        :param since: A datetime.datetime instance.
+        """
+        from sqlalchemy import text
         from stalker import db
 
+        sql_query = """with changed_entities as (
+    select id
+    from "SimpleEntities"
+    where date_updated > :since or date_created > :since
+),
+changed_tasks as (
+    select "Tasks".id, "Tasks".project_id
+    from "Tasks"
+    join changed_entities on "Tasks".id = changed_entities.id
+),
+changed_resources as (
+    select "Users".id
+    from "Users"
+    join changed_entities on "Users".id = changed_entities.id
+    union
+    select "Vacations".user_id
+    from "Vacations"
+    join changed_entities on "Vacations".id = changed_entities.id
+    where "Vacations".user_id is not NULL
+)
+-- updated projects
+select "Projects".id
+from "Projects"
+join changed_entities on "Projects".id = changed_entities.id
+union
+-- projects with new or updated tasks
+select project_id from changed_tasks
+union
+-- projects with new or updated time logs
+select "Tasks".project_id
+from "TimeLogs"
+join changed_entities on "TimeLogs".id = changed_entities.id
+join "Tasks" on "TimeLogs".task_id = "Tasks".id
+union
+-- projects depending to the changed tasks
+select "Tasks".project_id
+from "Task_Dependencies"
+join changed_tasks on "Task_Dependencies".depends_to_id = changed_tasks.id
+join "Tasks" on "Task_Dependencies".task_id = "Tasks".id
+union
+-- projects using the changed resources
+select "Tasks".project_id
+from (
+    select task_id, resource_id from "Task_Resources"
+    union
+    select task_id, resource_id from "Task_Alternative_Resources"
+) as task_resources
+join changed_resources on task_resources.resource_id = changed_resources.id
+join "Tasks" on task_resources.task_id = "Tasks".id"""
+
+        # a change in the studio or a studio wide vacation effects all the
+        # projects
+        studio_query = """select exists (
+    select 1
+    from "SimpleEntities"
+    left outer join "Vacations" on "SimpleEntities".id = "Vacations".id
+    where ("SimpleEntities".date_updated > :since
+           or "SimpleEntities".date_created > :since)
+        and (
+            "SimpleEntities".entity_type = 'Studio'
+            or ("Vacations".id is not NULL and "Vacations".user_id is NULL)
+        )
+)"""
         conn = db.DBSession.connection()
-        engine = conn.engine
+        if conn.execute(text(studio_query), since=since).scalar():
+            return set(
+                r[0] for r in
+                conn.execute('select id from "Projects"').fetchall()
+            )
+
+        return set(
+            r[0] for r in
+            conn.execute(text(sql_query), since=since).fetchall()
+        )
+
+    def _get_project_links(self):
+        """returns a dictionary where the keys are project ids and the values
+        are sets of project ids which are sharing a resource or has a
+        dependency relation with the key project, the resources and
+        dependencies in the :attr:`.overrides` are also considered
+        """
+        from stalker import db
+
+        sql_query = """with project_resources as (
+    select distinct "Tasks".project_id, task_resources.resource_id
+    from (
+        select task_id, resource_id from "Task_Resources"
+        union
+        select task_id, resource_id from "Task_Alternative_Resources"\
+%(override_resources)s
+    ) as task_resources
+    join "Tasks" on task_resources.task_id = "Tasks".id
+)
+-- projects sharing the same resources
+select distinct pr1.project_id, pr2.project_id
+from project_resources as pr1
+join project_resources as pr2 on pr1.resource_id = pr2.resource_id
+where pr1.project_id != pr2.project_id
+union
+-- projects having cross project dependencies
+select distinct "Tasks".project_id, "Depends_To_Tasks".project_id
+from (
+    select task_id, depends_to_id from "Task_Dependencies"\
+%(override_depends)s
+) as task_dependencies
+join "Tasks" on task_dependencies.task_id = "Tasks".id
+join "Tasks" as "Depends_To_Tasks"
+    on task_dependencies.depends_to_id = "Depends_To_Tasks".id
+where "Tasks".project_id != "Depends_To_Tasks".project_id"""
+
+        # the overridden resources and dependencies are linking the projects
+        # in the same way with the ones in the database
+        override_resources = []
+        override_depends = []
+        for task_id, values in self.overrides.items():
+            for key in ['resources', 'alternative_resources']:
+                override_resources.extend(
+                    '(%s, %s)' % (task_id, resource_id)
+                    for resource_id in values.get(key, [])
+                )
+            override_depends.extend(
+                '(%s, %s)' % (task_id, depends_to_id)
+                for depends_to_id in values.get('depends', [])
+            )
+
+        sql_query = sql_query % {
+            'override_resources':
+                '\n        union\n        values %s' %
+                ', '.join(override_resources) if override_resources else '',
+            'override_depends':
+                '\n    union\n    values %s' %
+                ', '.join(override_depends) if override_depends else ''
+        }
+
+        links = {}
+        for p1_id, p2_id in \
+                db.DBSession.connection().execute(sql_query).fetchall():
+            links.setdefault(p1_id, set()).add(p2_id)
+            links.setdefault(p2_id, set()).add(p1_id)
+        return links
+
+    def _get_connected_project_ids(self, project_ids):
+        """returns the given project ids along with the ids of all the
+        projects that are connected to them directly or indirectly by sharing a
+        resource or by a dependency relation
+
+        :param project_ids: A list of integers showing the project ids.
+        """
+        links = self._get_project_links()
+
+        connected_project_ids = set()
+        project_ids_to_visit = list(project_ids)
+        while project_ids_to_visit:
+            p_id = project_ids_to_visit.pop()
+            if p_id in connected_project_ids:
+                continue
+            connected_project_ids.add(p_id)
+            project_ids_to_visit.extend(links.get(p_id, []))
+
+        return connected_project_ids
+
+    def _get_project_components(self, project_ids):
+        """returns the given project ids grouped in lists of projects that
+        can be scheduled independently, so the projects in different groups
+        are not sharing any resources and has no dependency relation with
+        each other
+
+        :param project_ids: A list of integers showing the project ids.
+        """
+        links = self._get_project_links()
+        project_ids_set = set(project_ids)
+
+        components = []
+        visited_project_ids = set()
+        for project_id in project_ids:
+            if project_id in visited_project_ids:
+                continue
+
+            component = set()
+            project_ids_to_visit = [project_id]
+            while project_ids_to_visit:
+                p_id = project_ids_to_visit.pop()
+                if p_id in component:
+                    continue
+                component.add(p_id)
+                project_ids_to_visit.extend(
+                    links.get(p_id, set()) & project_ids_set
+                )
+
+            visited_project_ids.update(component)
+            # keep the original order of the projects
+            components.append(
+                [p_id for p_id in project_ids if p_id in component]
+            )
+
+        return components
+
+    def _render_tjp_header_and_footer(self):
+        """renders the main tjp template and returns the parts before and after
+        the tasks as two strings
+        """
+        from jinja2 import Template
 
         template = Template(defaults.tjp_main_template2)
+        rendered_template = template.render({
+            'stalker': stalker,
+            'studio': self.studio,
+            'csv_file_name': self.temp_file_name,
+            'csv_file_full_path': self.temp_file_full_path,
+            'compute_resources': self.compute_resources or self.dry_run,
+            'tasks_buffer': self._tasks_buffer_placeholder
+        })
 
-        if not self.projects:
-            project_ids = db.DBSession.connection().execute(
-                'select id, code from "Projects"'
-            ).fetchall()
-        else:
-            project_ids = [[project.id] for project in self.projects]
+        header, footer = \
+            rendered_template.split(self._tasks_buffer_placeholder)
+        return header, footer
+
+    def _generate_tjp_task_lines(self, project_ids):
+        """yields the tjp lines of the tasks of the given projects one by one.
+
+        The data is retrieved with a server side cursor, so the rows are not
+        kept in memory.
+
+        :param project_ids: The ids of the projects to export.
+        """
+        # use new way of doing it, it will just work with PostgreSQL
+        from stalker import db
 
         sql_query = """select
     "Tasks".id,
@@ -242,46 +1261,39 @@ class TaskJugglerScheduler(SchedulerBase):
     "Tasks".allocation_strategy,
     "Tasks".persistent_allocation,
     tasks.depth,
+    tasks.project_id,
     task_resources.resource_ids,
     task_alternative_resources.resource_ids as alternative_resource_ids,
-    time_logs.time_log_array,
-    task_dependencies.dependency_info,
+    time_logs.resources as time_log_resources,
+    time_logs.intervals as time_log_intervals,
+    time_logs.interval_count as time_log_interval_count,
+    task_dependencies.tjp_abs_ids as dependency_tjp_abs_ids,
+    task_dependencies.targets as dependency_targets,
     not exists (
        select 1
         from "Tasks" as "Child_Tasks"
         where "Child_Tasks".parent_id = "Tasks".id
-    ) as is_leaf
+    ) as is_leaf,
+    task_computed_resources.resource_ids as computed_resource_ids,
+    to_char("Tasks".computed_start, 'YYYY-MM-DD-HH24:MI') as computed_start,
+    to_char("Tasks".computed_end, 'YYYY-MM-DD-HH24:MI') as computed_end,
+    %(is_frozen)s as is_frozen
 from "Tasks"
 join (
-    with recursive recursive_task(id, parent_id, path_as_text, path, depth) as (
-        select
-            id,
-            parent_id,
-            id::text as path_as_text,
-            array[project_id] as path,
-            0
-        from "Tasks"
-        where parent_id is NULL and project_id = %(id)s
-    union all
-        select
-            task.id,
-            task.parent_id,
-            (parent.path_as_text || '-' || task.id) as path_as_text,
-            (parent.path || task.parent_id) as path,
-            parent.depth + 1 as depth
-        from "Tasks" as task
-        join recursive_task as parent on task.parent_id = parent.id
-    ) select
-        recursive_task.id,
-        recursive_task.parent_id,
-        recursive_task.path_as_text,
-        recursive_task.path,
+    select
+        "Tasks".id,
+        "Tasks".parent_id,
+        "Tasks".project_id,
+        project_order.ordinal,
+        array_to_string("Tasks".ancestor_ids || "Tasks".id, '-') as path_as_text,
+        array["Tasks".project_id] || "Tasks".ancestor_ids as path,
         "SimpleEntities".name as name,
         "SimpleEntities".entity_type,
-        recursive_task.depth
-    from recursive_task
-    join "SimpleEntities" on recursive_task.id = "SimpleEntities".id
-    --order by path_as_text
+        "Tasks".depth
+    from "Tasks"
+    join "SimpleEntities" on "Tasks".id = "SimpleEntities".id
+    join (values %(ordinals)s) as project_order(ordinal, id)
+        on "Tasks".project_id = project_order.id
 ) as tasks on "Tasks".id = tasks.id
 
 -- resources
@@ -302,12 +1314,67 @@ left outer join (
     group by task_id
 ) as task_alternative_resources on "Tasks".id = task_alternative_resources.task_id
 
--- time logs
+-- computed resources
+left outer join (
+    select
+        task_id,
+        array_agg(resource_id order by resource_id) as resource_ids
+    from "Task_Computed_Resources"
+    group by task_id
+) as task_computed_resources on "Tasks".id = task_computed_resources.task_id
+
+-- time logs, the contiguous or overlapping time logs of the same resource
+-- are merged and all the intervals of a resource are exported as one booking
 left outer join (
     select
-        "TimeLogs".task_id,
-        array_agg(('User_' || "TimeLogs".resource_id, to_char("TimeLogs".start, 'YYYY-MM-DD-HH24:MI:00'), to_char("TimeLogs".end, 'YYYY-MM-DD-HH24:MI:00'))) as time_log_array
-    from "TimeLogs"
+        task_id,
+        array_agg('User_' || resource_id order by resource_id) as resources,
+        array_agg(intervals order by resource_id) as intervals,
+        sum(interval_count) as interval_count
+    from (
+        select
+            task_id,
+            resource_id,
+            string_agg(
+                to_char(start, 'YYYY-MM-DD-HH24:MI:00') || ' - ' ||
+                to_char("end", 'YYYY-MM-DD-HH24:MI:00'),
+                ', ' order by start
+            ) as intervals,
+            count(*) as interval_count
+        from (
+            select
+                task_id,
+                resource_id,
+                min(start) as start,
+                max("end") as "end"
+            from (
+                select
+                    task_id,
+                    resource_id,
+                    start,
+                    "end",
+                    sum(is_new_interval) over (
+                        partition by task_id, resource_id
+                        order by start, "end"
+                    ) as interval_id
+                from (
+                    select
+                        task_id,
+                        resource_id,
+                        start,
+                        "end",
+                        case when start <= max("end") over (
+                            partition by task_id, resource_id
+                            order by start, "end"
+                            rows between unbounded preceding and 1 preceding
+                        ) then 0 else 1 end as is_new_interval
+                    from "TimeLogs"
+                ) as time_logs
+            ) as time_logs
+            group by task_id, resource_id, interval_id
+        ) as merged_time_logs
+        group by task_id, resource_id
+    ) as resource_time_logs
     group by task_id
 ) as time_logs on "Tasks".id = time_logs.task_id
 
@@ -315,204 +1382,296 @@ left outer join (
 left outer join (
     select
         task_id,
-        array_agg((tasks.alt_path, dependency_target, gap_timing, gap_unit, gap_model)) dependency_info
+        array_agg(
+            'Project_' || tasks.project_id || '.Task_' ||
+            array_to_string(tasks.ancestor_ids || tasks.id, '.Task_')
+            order by depends_to_id
+        ) as tjp_abs_ids,
+        array_agg(dependency_target order by depends_to_id) as targets
     from "Task_Dependencies"
-    join (
-        with recursive recursive_task(id, parent_id, alt_path) as (
-            select
-                id,
-                parent_id,
-                project_id::text as alt_path
-            from "Tasks"
-            where parent_id is NULL
-        union all
-            select
-                task.id,
-                task.parent_id,
-                (parent.alt_path || '-' || task.parent_id) as alt_path
-            from "Tasks" as task
-            join recursive_task as parent on task.parent_id = parent.id
-        ) select
-            recursive_task.id,
-            recursive_task.parent_id,
-            recursive_task.alt_path || '-' || recursive_task.id as alt_path
-        from recursive_task
-        join "SimpleEntities" on recursive_task.id = "SimpleEntities".id
-    ) as tasks on "Task_Dependencies".depends_to_id = tasks.id
+    join "Tasks" as tasks on "Task_Dependencies".depends_to_id = tasks.id
     group by task_id
 ) as task_dependencies on "Tasks".id = task_dependencies.task_id
 
---order by "Tasks".id
-order by path_as_text"""
-
-        result_buffer = []
-        num_of_records = 0
-
-        # run it per project
-        for pr in project_ids:
-            p_id = pr[0]
-            #p_code = pr[1]
-
-            sql_query_pp = sql_query % {'id': p_id}
-            result = db.DBSession.connection().execute(sql_query_pp)
-
-            # start by adding the project first
-            result_buffer.append('task Project_%s "Project_%s" {' % (p_id, p_id))
-
-            # now start jumping around
-            previous_level = 0
-            for r in result.fetchall():
-                # start by appending task tjp id first
-                task_id = r[0]
-                # path = r[1]
-                # parent_id = r[2]
-                # entity_type = r[3]
-                #name = r[4]
-                priority = r[5]
-                schedule_timing = r[6]
-                schedule_unit = r[7]
-                schedule_model = r[8]
-                allocation_strategy = r[9]
-                persistent_allocation = r[10]
-                depth = r[11] + 1
-                resource_ids = r[12]
-                alternative_resource_ids = r[13]
-                time_log_array = r[14]
-                dependency_info = r[15]
-                is_leaf = r[16]
-
-                tab = '  ' * depth
-
-                # close the previous level if necessary
-                for i in range(previous_level - depth + 1):
-                    i_tab = '  ' * (previous_level - i)
-                    result_buffer.append('%s}' % i_tab)
-
-                result_buffer.append(
-                    """%(tab)stask Task_%(id)s "Task_%(id)s" {""" % {
-                        'tab': tab,
-                        'id': task_id
-                    }
-                )
+order by tasks.ordinal, tasks.path_as_text"""
 
-                # append priority if it is different then 500
-                if priority != 500:
-                    result_buffer.append(
-                        '%s  priority %s' % (tab, priority))
-
-                # append dependency information
-                if dependency_info:
-                    dep_buffer = ['%s  depends ' % tab]
-
-                    json_data = json.loads(
-                        dependency_info.replace('{', '[')
-                        .replace('}', ']')
-                        .replace('(', '')
-                        .replace(')', '')
-                    )  # it is an array of string
-
-                    for i, dep in enumerate(json_data):
-                        if i > 0:
-                            dep_buffer.append(', ')
-
-                        dep_full_ids, \
-                            dependency_target, \
-                            gap_timing, \
-                            gap_unit, \
-                            gap_model = dep.split(',')
-
-                        dep_full_path = '.'.join(
-                            map(lambda x: 'Task_%s' % x,
-                                dep_full_ids.split('-'))
+        self.num_of_records = 0
+        self.frozen_task_ids = set()
+        self.alternative_task_ids = set()
+        self.task_resource_ids = {}
+        flag_alternatives = self.compute_resources or self.dry_run
+        counts = self.metrics['counts']
+        counts['tasks'] = 0
+        counts['bookings'] = 0
+        counts['dependencies'] = 0
+
+        if not project_ids:
+            return
+
+        # export all the projects in one pass
+        sql_query = sql_query % {
+            'ids': ', '.join(map(str, project_ids)),
+            'is_frozen': self._get_frozen_condition(),
+            'ordinals': ', '.join(
+                '(%s, %s)' % (i, p_id) for i, p_id in enumerate(project_ids)
+            )
+        }
+        # the dependencies in the overrides
+        overrides = self.overrides
+        override_tjp_abs_ids = self._get_tjp_abs_ids(
+            set(
+                task_id
+                for values in overrides.values()
+                for task_id in values.get('depends', [])
+            ),
+            project_ids
+        )
+
+        result = db.DBSession.connection()\
+            .execution_options(stream_results=True)\
+            .execute(sql_query)
+
+        # the rows are ordered with the given project ids, so projects
+        # without any tasks are exported while iterating over the ids
+        project_ids_iter = iter(project_ids)
+        current_project_id = None
+        previous_level = 0
+        for r in result:
+            project_id = r[12]
+            if project_id != current_project_id:
+                if current_project_id is not None:
+                    # close the brackets of the previous project
+                    for line in self._close_tjp_task_brackets(previous_level):
+                        yield line
+
+                for p_id in project_ids_iter:
+                    # start by adding the project first
+                    yield 'task Project_%s "Project_%s" {' % (p_id, p_id)
+                    if p_id == project_id:
+                        break
+                    # this project has no tasks
+                    yield '}'
+
+                current_project_id = project_id
+                previous_level = 0
+
+            # start by appending task tjp id first
+            task_id = r[0]
+            # path = r[1]
+            # parent_id = r[2]
+            # entity_type = r[3]
+            #name = r[4]
+            priority = r[5]
+            schedule_timing = r[6]
+            schedule_unit = r[7]
+            schedule_model = r[8]
+            allocation_strategy = r[9]
+            persistent_allocation = r[10]
+            depth = r[11] + 1
+            # project_id = r[12]
+            resource_ids = r[13]
+            alternative_resource_ids = r[14]
+            time_log_resources = r[15]
+            time_log_intervals = r[16]
+            time_log_interval_count = r[17]
+            dependency_tjp_abs_ids = r[18]
+            dependency_targets = r[19]
+            is_leaf = r[20]
+            computed_resource_ids = r[21]
+            computed_start = r[22]
+            computed_end = r[23]
+            is_frozen = is_leaf and r[24]
+
+            # use the overridden values for "what if" scenarios
+            override = overrides.get(task_id)
+            if override is not None:
+                priority = override.get('priority', priority)
+                schedule_timing = \
+                    override.get('schedule_timing', schedule_timing)
+                schedule_unit = override.get('schedule_unit', schedule_unit)
+                schedule_model = \
+                    override.get('schedule_model', schedule_model)
+                resource_ids = override.get('resources', resource_ids)
+                alternative_resource_ids = override.get(
+                    'alternative_resources', alternative_resource_ids
+                )
+                if 'depends' in override:
+                    missing_ids = [
+                        depends_to_id
+                        for depends_to_id in override['depends']
+                        if depends_to_id not in override_tjp_abs_ids
+                    ]
+                    if missing_ids:
+                        raise ValueError(
+                            '%s.overrides depends of Task %s should be '
+                            'Tasks of the scheduled projects, not %s' %
+                            (self.__class__.__name__, task_id, missing_ids)
                         )
-                        # fix for Project id
-                        dep_full_path = 'Project_%s' % dep_full_path[5:]
+                    dependency_tjp_abs_ids = [
+                        override_tjp_abs_ids[depends_to_id]
+                        for depends_to_id in override['depends']
+                    ]
+                    dependency_targets = \
+                        ['onend'] * len(dependency_tjp_abs_ids)
 
-                        dep_string = '%s {%s}' % (
-                            dep_full_path, dependency_target)
+            tab = '  ' * depth
 
-                        dep_buffer.append(dep_string)
+            # close the previous level if necessary
+            for i in range(previous_level - depth + 1):
+                i_tab = '  ' * (previous_level - i)
+                yield '%s}' % i_tab
 
-                    result_buffer.append(''.join(dep_buffer))
+            yield (
+                """%(tab)stask Task_%(id)s "Task_%(id)s" {""" % {
+                    'tab': tab,
+                    'id': task_id
+                }
+            )
 
-                # append schedule model and timing information
-                # if this is a leaf task and has resources
-                if is_leaf and resource_ids:
-                    result_buffer.append(
-                        '%s  %s %s%s' % (
-                            tab, schedule_model, schedule_timing,
-                            schedule_unit
+            if is_frozen:
+                # export it with its current dates and resources
+                self.frozen_task_ids.add(task_id)
+                yield '%s  priority 1000' % tab
+                yield '%s  start %s' % (tab, computed_start)
+                yield '%s  end %s' % (tab, computed_end)
+                frozen_resource_ids = computed_resource_ids or resource_ids
+                if frozen_resource_ids:
+                    yield '%s  allocate %s' % (
+                        tab,
+                        ', '.join(
+                            'User_%s' % resource_id
+                            for resource_id in frozen_resource_ids
+                        )
+                    )
+                previous_level = depth
+                self.num_of_records += 1
+                counts['tasks'] += 1
+                continue
+
+            # append priority if it is different then 500
+            if priority != 500:
+                yield '%s  priority %s' % (tab, priority)
+
+            # append dependency information
+            if dependency_tjp_abs_ids:
+                counts['dependencies'] += len(dependency_tjp_abs_ids)
+                yield '%s  depends %s' % (
+                    tab,
+                    ', '.join(
+                        '%s {%s}' % (dep_tjp_abs_id, dependency_target)
+                        for dep_tjp_abs_id, dependency_target in zip(
+                            dependency_tjp_abs_ids, dependency_targets
                         )
                     )
+                )
+
+            if is_leaf and flag_alternatives:
+                if resource_ids and alternative_resource_ids:
+                    # only these tasks are reported with their resources
+                    self.alternative_task_ids.add(task_id)
+                    yield '%s  flags alternatives' % tab
+                else:
+                    self.task_resource_ids[task_id] = resource_ids or []
+
+            # append schedule model and timing information
+            # if this is a leaf task and has resources
+            if is_leaf and resource_ids:
+                yield (
+                    '%s  %s %s%s' % (
+                        tab, schedule_model, schedule_timing,
+                        schedule_unit
+                    )
+                )
 
-                    resource_buffer = ['%s  allocate ' % tab]
-                    for i, resource_id in enumerate(resource_ids):
-                        if i > 0:
-                            resource_buffer.append(', ')
-                        resource_buffer.append('User_%s' % resource_id)
-
-                        # now go through alternatives
-                        if alternative_resource_ids:
-                            resource_buffer.append(' { alternative ')
-                            for j, alt_resource_id in \
-                                    enumerate(alternative_resource_ids):
-                                if j > 0:
-                                    resource_buffer.append(', ')
-                                resource_buffer.append(
-                                    'User_%s' % alt_resource_id)
-
-                            # set the allocation strategy
+                resource_buffer = ['%s  allocate ' % tab]
+                for i, resource_id in enumerate(resource_ids):
+                    if i > 0:
+                        resource_buffer.append(', ')
+                    resource_buffer.append('User_%s' % resource_id)
+
+                    # now go through alternatives
+                    if alternative_resource_ids:
+                        resource_buffer.append(' { alternative ')
+                        for j, alt_resource_id in \
+                                enumerate(alternative_resource_ids):
+                            if j > 0:
+                                resource_buffer.append(', ')
                             resource_buffer.append(
-                                ' select %s' % allocation_strategy)
-
-                            # is is persistent
-                            if persistent_allocation:
-                                resource_buffer.append(' persistent')
-                            resource_buffer.append(' }')
-
-                    result_buffer.append(''.join(resource_buffer))
-
-                    # append any time log information
-                    print('time_log_array: %s' % time_log_array)
-                    if time_log_array:
-                        json_data = json.loads(
-                            time_log_array.replace('{', '[')
-                            .replace('}', ']')
-                            .replace('(', '')
-                            .replace(')', '')
-                        )  # it is an array of string
-
-                        for tlog in json_data:
-                            user_id, t_start, t_end = tlog.split(',')
-                            result_buffer.append(
-                                '%s  booking %s %s - %s { overtime 2 }' % (
-                                    tab, user_id, t_start, t_end
-                                )
-                            )
+                                'User_%s' % alt_resource_id)
+
+                        # set the allocation strategy
+                        resource_buffer.append(
+                            ' select %s' % allocation_strategy)
+
+                        # is is persistent
+                        if persistent_allocation:
+                            resource_buffer.append(' persistent')
+                        resource_buffer.append(' }')
+
+                yield ''.join(resource_buffer)
+
+                # append any time log information, one booking per
+                # resource with all the merged intervals
+                if time_log_resources:
+                    counts['bookings'] += int(time_log_interval_count)
+                    for user_id, intervals in zip(time_log_resources,
+                                                  time_log_intervals):
+                        yield '%s  booking %s %s { overtime 2 }' % (
+                            tab, user_id, intervals
+                        )
 
-                previous_level = depth
-                num_of_records += 1
+            previous_level = depth
+            self.num_of_records += 1
+            counts['tasks'] += 1
 
-            # and close the brackets per project
-            depth = 0  # current depth is 0 (Project)
-            # previous_level is the last task
-            for i in range(previous_level - depth + 1):
-                i_tab = '  ' * (previous_level - i)
-                result_buffer.append('%s}' % i_tab)
+        if current_project_id is not None:
+            for line in self._close_tjp_task_brackets(previous_level):
+                yield line
 
-        tasks_buffer = '\n'.join(result_buffer)
+        # and the remaining projects without any tasks
+        for p_id in project_ids_iter:
+            yield 'task Project_%s "Project_%s" {' % (p_id, p_id)
+            yield '}'
 
-        self.tjp_content = template.render({
-            'stalker': stalker,
-            'studio': self.studio,
-            'csv_file_name': self.temp_file_name,
-            'csv_file_full_path': self.temp_file_full_path,
-            'compute_resources': self.compute_resources,
-            'tasks_buffer': tasks_buffer
-        })
+    @classmethod
+    def _close_tjp_task_brackets(cls, previous_level):
+        """yields the closing brackets of the tasks starting from the given
+        level down to the project level
+
+        :param previous_level: The level of the last task.
+        """
+        depth = 0  # current depth is 0 (Project)
+        for i in range(previous_level - depth + 1):
+            i_tab = '  ' * (previous_level - i)
+            yield '%s}' % i_tab
+
+    def _create_tjp_file_content(self, project_ids=None):
+        """creates the tjp file content and stores it in the
+        :attr:`.tjp_content` attribute. Use :meth:`._write_tjp_file` to write
+        the content directly to the tjp file without keeping it in memory.
+
+        :param project_ids: The ids of the projects to export. If skipped the
+          ids are going to be retrieved with :meth:`._get_project_ids`.
+        """
+        start = time.time()
+
+        if project_ids is None:
+            project_ids = self._get_project_ids()
+
+        render_start = time.time()
+        header, footer = self._render_tjp_header_and_footer()
+        self._add_timing('template_render', time.time() - render_start)
+
+        export_start = time.time()
+        self.tjp_content = '%s%s%s' % (
+            header,
+            '\n'.join(self._generate_tjp_task_lines(project_ids)),
+            footer
+        )
+        self._add_timing('sql_export', time.time() - export_start)
 
         logger.debug(
-            'total number of records: %s' % num_of_records
+            'total number of records: %s' % self.num_of_records
         )
 
         end = time.time()
@@ -520,6 +1679,68 @@ order by path_as_text"""
             'rendering the whole tjp file took : %s seconds' % (end - start)
         )
 
+    def _write_tjp_file(self, project_ids=None):
+        """writes the tjp file content directly to the tjp file, the task
+        lines are written as they are generated, so the memory usage doesn't
+        depend on the number of tasks.
+
+        The sha1 hash of the content is stored in the
+        :attr:`.tjp_content_hash` attribute.
+
+        :param project_ids: The ids of the projects to export. If skipped the
+          ids are going to be retrieved with :meth:`._get_project_ids`.
+        """
+        start = time.time()
+
+        if project_ids is None:
+            project_ids = self._get_project_ids()
+
+        import hashlib
+        content_hash = hashlib.sha1()
+
+        render_start = time.time()
+        header, footer = self._render_tjp_header_and_footer()
+        self._add_timing('template_render', time.time() - render_start)
+
+        # the lines are generated while they are written, so measure the
+        # writing time and count the rest as the sql export time
+        export_start = time.time()
+        write_duration = 0.0
+        with open(self.tjp_file_full_path, 'w+') as self.tjp_file:
+            self.tjp_file.write(header)
+            content_hash.update(header.encode('utf-8'))
+            for i, line in \
+                    enumerate(self._generate_tjp_task_lines(project_ids)):
+                write_start = time.time()
+                if i > 0:
+                    line = '\n%s' % line
+                self.tjp_file.write(line)
+                content_hash.update(line.encode('utf-8'))
+                write_duration += time.time() - write_start
+            self.tjp_file.write(footer)
+        self._add_timing(
+            'sql_export', time.time() - export_start - write_duration
+        )
+        self._add_timing('file_write', write_duration)
+        self.metrics['tjp_file_size'] += \
+            os.path.getsize(self.tjp_file_full_path)
+
+        # the csv file name is random, skip it to have the same hash for the
+        # same content
+        content_hash.update(
+            footer.replace(self.temp_file_name, '').encode('utf-8')
+        )
+        self.tjp_content_hash = content_hash.hexdigest()
+
+        logger.debug(
+            'total number of records: %s' % self.num_of_records
+        )
+
+        end = time.time()
+        logger.debug(
+            'writing the whole tjp file took : %s seconds' % (end - start)
+        )
+
     def _fill_tjp_file(self):
         """fills the tjp file with content
         """
@@ -535,12 +1756,14 @@ order by path_as_text"""
             pass
 
     def _delete_csv_file(self):
-        """deletes the temp csv file
+        """deletes the temp csv files
         """
-        try:
-            os.remove(self.csv_file_full_path)
-        except OSError:
-            pass
+        for csv_file_full_path in [self.csv_file_full_path,
+                                   self.resources_csv_file_full_path]:
+            try:
+                os.remove(csv_file_full_path)
+            except (OSError, TypeError):
+                pass
 
     def _clean_up(self):
         """removes the temp files
@@ -548,37 +1771,77 @@ order by path_as_text"""
         self._delete_tjp_file()
         self._delete_csv_file()
 
-    def _parse_csv_file(self):
+    def _parse_csv_file(self, csv_file_full_paths=None):
         """parses back the csv file and fills the tasks with computes_start and
         computed_end values
+
+        :param csv_file_full_paths: A list of csv file paths to parse. The
+          data of all the files are written back to the database together. If
+          skipped the :attr:`.csv_file_full_path` is used.
         """
         parsing_start = time.time()
 
-        logger.debug('csv_file_full_path : %s' % self.csv_file_full_path)
-        if not os.path.exists(self.csv_file_full_path):
-            logger.debug('could not find CSV file, '
+        if csv_file_full_paths is None:
+            csv_file_full_paths = [self.csv_file_full_path]
+
+        existing_csv_file_full_paths = []
+        for csv_file_full_path in csv_file_full_paths:
+            logger.debug('csv_file_full_path : %s' % csv_file_full_path)
+            if not os.path.exists(csv_file_full_path):
+                logger.debug('could not find CSV file: %s' %
+                             csv_file_full_path)
+            else:
+                existing_csv_file_full_paths.append(csv_file_full_path)
+
+        if not existing_csv_file_full_paths:
+            logger.debug('could not find any CSV file, '
                          'returning without updating db!')
             return
 
-        from stalker import db, Task, Project
-        from stalker.models.task import Task_Computed_Resources
+        if self.parsing_method == 2 and not self.dry_run:
+            # the timings are measured in _copy_csv_files
+            self._copy_csv_files(existing_csv_file_full_paths)
+            parsing_end = time.time()
+            logger.debug(
+                'completed parsing csv file in (COPY): %s seconds' %
+                (parsing_end - parsing_start)
+            )
+            return
 
         entity_ids = []
         update_data = []
         update_user_data = []
-
-        with open(self.csv_file_full_path, 'r') as self.csv_file:
-            csv_content = csv.reader(self.csv_file, delimiter=';')
-
-            lines = [line for line in csv_content]
-            lines.pop(0)
+        compute_resources = self.compute_resources or self.dry_run
+
+        lines = []
+        for csv_file_full_path in existing_csv_file_full_paths:
+            with open(csv_file_full_path, 'r') as self.csv_file:
+                csv_content = csv.reader(self.csv_file, delimiter=';')
+
+                csv_lines = [line for line in csv_content]
+                csv_lines.pop(0)
+                lines.extend(csv_lines)
+
+        # the resources of the tasks with alternative resources
+        computed_resource_ids = {}
+        if compute_resources:
+            computed_resource_ids.update(self.task_resource_ids)
+            for data in self._read_resources_csv_files(
+                    existing_csv_file_full_paths):
+                entity_id = int(data[0].split('_')[-1])
+                if entity_id in self.alternative_task_ids:
+                    computed_resource_ids[entity_id] = [
+                        int(rid)
+                        for rid in self._resource_id_pattern.findall(data[1])
+                    ]
 
         for data in lines:
             id_line = data[0]
 
             entity_id = int(id_line.split('.')[-1].split('_')[-1])
 
-            if entity_id:
+            # do not touch the frozen tasks
+            if entity_id and entity_id not in self.frozen_task_ids:
                 entity_ids.append(entity_id)
                 start_date = datetime.datetime.strptime(
                     data[1], "%Y-%m-%d-%H:%M"
@@ -593,17 +1856,11 @@ order by path_as_text"""
                 end_date = end_date.replace(tzinfo=pytz.utc)
 
                 # computed_resources
-                if self.compute_resources:
-                    if data[3] != '':
-                        resources_data = map(
-                            lambda x: x.split('_')[-1].split(')')[0],
-                            data[3].split(',')
-                        )
-                        for rid in resources_data:
-                            update_user_data.append({
-                                'task_id': entity_id,
-                                'resource_id': rid
-                            })
+                for rid in computed_resource_ids.get(entity_id, []):
+                    update_user_data.append({
+                        'task_id': entity_id,
+                        'resource_id': rid
+                    })
 
                 update_data.append({
                     'b_id': entity_id,
@@ -613,61 +1870,260 @@ order by path_as_text"""
                     'computed_end': end_date
                 })
 
-        from sqlalchemy import bindparam
+        self._add_timing('csv_parse', time.time() - parsing_start)
 
-        # update date values
-        update_statement = Task.__table__.update()\
-            .where(Task.__table__.c.id == bindparam('b_id'))\
-            .values(
-                start=bindparam('start'),
-                end=bindparam('end'),
-                computed_start=bindparam('computed_start'),
-                computed_end=bindparam('computed_end')
+        if self.dry_run:
+            # do not touch the database
+            self.dry_run_result = dict(
+                (data['b_id'],
+                 (data['start'], data['end'],
+                  sorted(computed_resource_ids.get(data['b_id'], []))))
+                for data in update_data
             )
-        db.DBSession.connection().execute(
-            update_statement,
-            update_data
+            return
+
+        self._write_schedule_data(
+            update_data,
+            update_user_data if self.compute_resources else None
         )
 
-        # update project dates
-        update_project_statement = Project.__table__.update()\
-            .where(Project.__table__.c.id == bindparam('b_id'))\
-            .values(
-                start=bindparam('start'),
-                end=bindparam('end'),
-                computed_start=bindparam('computed_start'),
-                computed_end=bindparam('computed_end')
-            )
-        db.DBSession.connection().execute(
-            update_project_statement,
-            update_data
+        parsing_end = time.time()
+        logger.debug(
+            'completed parsing csv file in (SQL): %s seconds' %
+            (parsing_end - parsing_start)
         )
 
-        # update computed resources data
-        # first delete everything
-        if self.compute_resources:
-            delete_resources_statement = Task_Computed_Resources.delete()
+    def _read_resources_csv_files(self, csv_file_full_paths):
+        """yields the rows of the resources csv files of the given csv files
+        without the header lines
+
+        :param csv_file_full_paths: A list of csv file paths.
+        """
+        for csv_file_full_path in csv_file_full_paths:
+            resources_csv_file_full_path = \
+                self._get_resources_csv_file_path(csv_file_full_path)
+            if not os.path.exists(resources_csv_file_full_path):
+                continue
+
+            with open(resources_csv_file_full_path, 'r') as resources_file:
+                csv_content = csv.reader(resources_file, delimiter=';')
+                next(csv_content, None)
+                for data in csv_content:
+                    yield data
+
+    def _copy_csv_files(self, csv_file_full_paths):
+        """copies the given csv files to a temporary table with the PostgreSQL
+        COPY command and updates the tasks, projects and the computed
+        resources with set based queries. Only the rows that have changed are
+        updated and the number of touched rows are stored in the
+        :attr:`.updated_row_counts` attribute. The shifts of the computed
+        dates of the tasks are recorded in the schedule history.
+
+        :param csv_file_full_paths: A list of csv file paths.
+        """
+        from stalker import db
 
-            update_resources_statement = Task_Computed_Resources.insert()\
-                .values(
-                    task_id=bindparam('task_id'),
-                    resource_id=bindparam('resource_id')
+        copy_start = time.time()
+        self.updated_row_counts = {
+            'tasks': 0,
+            'projects': 0,
+            'computed_resources_inserted': 0,
+            'computed_resources_deleted': 0
+        }
+
+        # use the DBAPI cursor of the current transaction
+        cursor = db.DBSession.connection().connection.cursor()
+
+        cursor.execute(
+            'create temp table if not exists "Schedule_Results" ('
+            '    id_line text,'
+            '    start_text text,'
+            '    end_text text,'
+            '    id integer,'
+            '    start timestamp with time zone,'
+            '    "end" timestamp with time zone'
+            ') on commit drop'
+        )
+        cursor.execute('truncate "Schedule_Results"')
+
+        for csv_file_full_path in csv_file_full_paths:
+            with open(csv_file_full_path, 'r') as self.csv_file:
+                cursor.copy_expert(
+                    'copy "Schedule_Results" (id_line, start_text, end_text) '
+                    'from stdin with csv header delimiter \';\'',
+                    self.csv_file
                 )
 
-            db.DBSession.connection().execute(delete_resources_statement)
-            db.DBSession.connection().execute(
-                update_resources_statement,
-                update_user_data
+        # the dates are in UTC and to_timestamp() parses them in the time
+        # zone of the session, so set it to UTC for this transaction and
+        # restore it after the dates are parsed
+        cursor.execute("select current_setting('TimeZone')")
+        time_zone = cursor.fetchone()[0]
+        cursor.execute("select set_config('TimeZone', 'UTC', true)")
+        cursor.execute(
+            'update "Schedule_Results" set '
+            '    id = substring(id_line from \'_(\\d+)$\')::integer, '
+            '    start = to_timestamp(start_text, \'YYYY-MM-DD-HH24:MI\'), '
+            '    "end" = to_timestamp(end_text, \'YYYY-MM-DD-HH24:MI\')'
+        )
+        cursor.execute(
+            "select set_config('TimeZone', %(time_zone)s, true)",
+            {'time_zone': time_zone}
+        )
+        # do not touch the frozen tasks
+        if self.frozen_task_ids:
+            cursor.execute(
+                'delete from "Schedule_Results" where id = any(%(ids)s)',
+                {'ids': sorted(self.frozen_task_ids)}
             )
-
-        parsing_end = time.time()
-        logger.debug(
-            'completed parsing csv file in (SQL): %s seconds' %
-            (parsing_end - parsing_start)
+        self._add_timing('csv_parse', time.time() - copy_start)
+
+        write_back_start = time.time()
+
+        # record the shifts of the previously scheduled tasks
+        run_id = self._create_schedule_run(db.DBSession.connection())
+        cursor.execute(
+            'insert into "Schedule_Deltas" '
+            '(run_id, task_id, start_shift, end_shift) '
+            'select %(run_id)s, "Tasks".id, '
+            '    extract(epoch from results.start - '
+            '        "Tasks".computed_start)::integer, '
+            '    extract(epoch from results."end" - '
+            '        "Tasks".computed_end)::integer '
+            'from "Schedule_Results" as results '
+            'join "Tasks" on "Tasks".id = results.id '
+            'where "Tasks".computed_start is not null '
+            'and "Tasks".computed_end is not null '
+            'and ("Tasks".computed_start != results.start '
+            '     or "Tasks".computed_end != results."end")',
+            {'run_id': run_id}
         )
 
+        for table_name, count_key in [('Tasks', 'tasks'),
+                                      ('Projects', 'projects')]:
+            cursor.execute(
+                'update "%(table)s" set '
+                '    start = results.start, '
+                '    "end" = results."end", '
+                '    computed_start = results.start, '
+                '    computed_end = results."end" '
+                'from "Schedule_Results" as results '
+                'where "%(table)s".id = results.id and ('
+                '    "%(table)s".start is distinct from results.start or '
+                '    "%(table)s"."end" is distinct from results."end" or '
+                '    "%(table)s".computed_start is distinct from '
+                '        results.start or '
+                '    "%(table)s".computed_end is distinct from results."end"'
+                ')' % {'table': table_name}
+            )
+            self.updated_row_counts[count_key] = cursor.rowcount
+
+        if self.compute_resources:
+            cursor.execute(
+                'create temp table if not exists '
+                '"Schedule_Results_Resources" ('
+                '    task_id integer,'
+                '    resource_id integer'
+                ') on commit drop'
+            )
+            cursor.execute('truncate "Schedule_Results_Resources"')
+
+            # tj3 only reports the resources of the tasks with alternatives
+            cursor.execute(
+                'create temp table if not exists '
+                '"Schedule_Results_Alternatives" ('
+                '    id_line text,'
+                '    resources text'
+                ') on commit drop'
+            )
+            cursor.execute('truncate "Schedule_Results_Alternatives"')
+            for csv_file_full_path in csv_file_full_paths:
+                resources_csv_file_full_path = \
+                    self._get_resources_csv_file_path(csv_file_full_path)
+                if not os.path.exists(resources_csv_file_full_path):
+                    continue
+                with open(resources_csv_file_full_path, 'r') as \
+                        resources_file:
+                    cursor.copy_expert(
+                        'copy "Schedule_Results_Alternatives" '
+                        '(id_line, resources) '
+                        'from stdin with csv header delimiter \';\'',
+                        resources_file
+                    )
+
+            cursor.execute(
+                'insert into "Schedule_Results_Resources" '
+                'select distinct alternatives.id, resource_ids.resource_id '
+                'from ('
+                '    select substring(id_line from \'_(\\d+)$\')::integer '
+                '        as id, resources '
+                '    from "Schedule_Results_Alternatives"'
+                ') as alternatives '
+                'join "Schedule_Results" as results '
+                '    on alternatives.id = results.id '
+                'cross join lateral ('
+                '    select (regexp_matches('
+                '        alternatives.resources, \'_(\\d+)\\)\', \'g\''
+                '    ))[1]::integer as resource_id'
+                ') as resource_ids '
+                'where alternatives.id = any(%(ids)s)',
+                {'ids': sorted(self.alternative_task_ids)}
+            )
+
+            # and the other tasks are using their own resources
+            task_ids = []
+            resource_ids = []
+            for task_id, task_resource_ids in \
+                    self.task_resource_ids.items():
+                for resource_id in task_resource_ids:
+                    task_ids.append(task_id)
+                    resource_ids.append(resource_id)
+            cursor.execute(
+                'insert into "Schedule_Results_Resources" '
+                'select resources.task_id, resources.resource_id '
+                'from unnest(%(task_ids)s::integer[], '
+                '            %(resource_ids)s::integer[]) '
+                '    as resources (task_id, resource_id) '
+                'join "Schedule_Results" as results '
+                '    on resources.task_id = results.id',
+                {'task_ids': task_ids, 'resource_ids': resource_ids}
+            )
+
+            cursor.execute(
+                'delete from "Task_Computed_Resources" '
+                'where task_id in (select id from "Schedule_Results") '
+                'and not exists ('
+                '    select 1 '
+                '    from "Schedule_Results_Resources" as new_resources '
+                '    where new_resources.task_id = '
+                '        "Task_Computed_Resources".task_id '
+                '    and new_resources.resource_id = '
+                '        "Task_Computed_Resources".resource_id'
+                ')'
+            )
+            self.updated_row_counts['computed_resources_deleted'] = \
+                cursor.rowcount
+
+            cursor.execute(
+                'insert into "Task_Computed_Resources" (task_id, resource_id) '
+                'select new_resources.task_id, new_resources.resource_id '
+                'from "Schedule_Results_Resources" as new_resources '
+                'where not exists ('
+                '    select 1 from "Task_Computed_Resources" as tcr '
+                '    where tcr.task_id = new_resources.task_id '
+                '    and tcr.resource_id = new_resources.resource_id'
+                ')'
+            )
+            self.updated_row_counts['computed_resources_inserted'] = \
+                cursor.rowcount
+
+        cursor.close()
+        self._add_timing('db_write_back', time.time() - write_back_start)
+        logger.debug('updated row counts: %s' % self.updated_row_counts)
+
     def schedule(self):
-        """Does the scheduling.
+        """Does the scheduling. Returns the stderr output of tj3 or the
+        :attr:`.dry_run_result` if :attr:`.dry_run` is True.
         """
         # check the studio attribute
         from stalker import Studio
@@ -679,18 +2135,149 @@ order by path_as_text"""
                 (self.__class__.__name__, self.studio.__class__.__name__)
             )
 
-        # create a tjp file
-        self._create_tjp_file()
+        schedule_start = time.time()
+        self._reset_metrics()
+        self.updated_row_counts = {}
+        self.dry_run_result = {}
+
+        project_ids = self._get_project_ids()
+        if self.incremental and not project_ids:
+            logger.debug('nothing has changed, skipping scheduling!')
+            self._finalize_metrics(time.time() - schedule_start)
+            return self.dry_run_result if self.dry_run else ''
+
+        # split the projects into independently schedulable groups if more
+        # than one tj3 process is allowed
+        if self.max_workers > 1:
+            components = self._get_project_components(project_ids)
+        else:
+            components = [project_ids]
+
+        # create one tjp file per group and stream the content to it
+        self._report_progress('export')
+        from stalker.exceptions import SchedulingCancelledError
+        jobs = self._jobs = []
+        try:
+            for component in components:
+                if len(components) == 1:
+                    job = self
+                else:
+                    job = self.__class__(
+                        studio=self.studio,
+                        compute_resources=self.compute_resources,
+                        parsing_method=self.parsing_method,
+                        dry_run=self.dry_run,
+                        overrides=self.overrides,
+                        projects=self.projects,
+                        freeze_other_projects=self.freeze_other_projects,
+                        departments=self.departments,
+                        frozen_statuses=self.frozen_statuses
+                    )
+                    # share the cancel state and the progress callback
+                    job._cancel_event = self._cancel_event
+                    job.progress_callback = self.progress_callback
+                job._create_tjp_file()
+                jobs.append(job)
+                job._write_tjp_file(component)
+                logger.debug(
+                    'tjp_file_full_path: %s' % job.tjp_file_full_path
+                )
+                if job is not self:
+                    self._merge_export_metrics(job)
+                self._check_cancelled()
+
+            stderr_buffer = self._solve_and_parse(jobs)
+        except SchedulingCancelledError:
+            for job in jobs:
+                job._clean_up()
+            raise
+        finally:
+            self._jobs = []
+
+        # remove the tjp files
+        for job in jobs:
+            job._clean_up()
+
+        self._finalize_metrics(time.time() - schedule_start)
+        if self.dry_run:
+            return self.dry_run_result
+        return stderr_buffer
+
+    def _solve_and_parse(self, jobs):
+        """solves the tjp files of the given jobs with tj3 and writes the
+        results back to the database, returns the stderr output of tj3
+
+        :param jobs: A list of :class:`.TaskJugglerScheduler` instances with
+          their tjp files written.
+        """
+        # use the cached results if possible
+        jobs_to_run = jobs
+        if self.use_cache:
+            jobs_to_run = [
+                job for job in jobs if not self._restore_from_cache(job)
+            ]
+
+        # pass them to tj3
+        self._report_progress('solve')
+        solve_start = time.time()
+        if len(jobs_to_run) == 1:
+            results = [jobs_to_run[0]._run_tj3()]
+        elif jobs_to_run:
+            from multiprocessing.pool import ThreadPool
+            pool = ThreadPool(min(self.max_workers, len(jobs_to_run)))
+            try:
+                results = pool.map(lambda j: j._run_tj3(), jobs_to_run)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = []
+        self._add_timing('tj3_solve', time.time() - solve_start)
+
+        # tj3 is killed if the schedule is cancelled
+        self._check_cancelled()
+
+        stderr_buffer = '\n'.join(
+            [job_stderr_buffer for _, job_stderr_buffer in results]
+        )
+        for returncode, job_stderr_buffer in results:
+            if returncode:
+                # there is an error
+                raise RuntimeError(job_stderr_buffer)
+
+        if self.use_cache:
+            for job in jobs_to_run:
+                self._store_in_cache(job)
+
+        # read back the csv files
+        self._report_progress('write_back')
+        self._parse_csv_file([job.csv_file_full_path for job in jobs])
 
-        # create tjp file content
-        self._create_tjp_file_content()
+        return stderr_buffer
+
+    def _merge_export_metrics(self, job):
+        """adds the export metrics of the given job to the metrics of this
+        scheduler
+
+        :param job: A :class:`.TaskJugglerScheduler` instance that has
+          exported a group of projects.
+        """
+        for phase in ['sql_export', 'template_render', 'file_write']:
+            self._add_timing(phase, job.metrics['timings'][phase])
+
+        for key in ['tasks', 'bookings', 'dependencies']:
+            self.metrics['counts'][key] += job.metrics['counts'][key]
 
-        # fill it with data
-        self._fill_tjp_file()
+        self.frozen_task_ids.update(job.frozen_task_ids)
+        self.alternative_task_ids.update(job.alternative_task_ids)
+        self.task_resource_ids.update(job.task_resource_ids)
 
-        logger.debug('tjp_file_full_path: %s' % self.tjp_file_full_path)
+        self.metrics['tjp_file_size'] += job.metrics['tjp_file_size']
 
-        # pass it to tj3
+    def _run_tj3(self):
+        """runs tj3 for the tjp file and returns the return code and the
+        stderr output of tj3
+        """
         if os.name == 'nt':
             command = '%s %s -o %s' % (
                 defaults.tj_command,
@@ -702,84 +2289,1144 @@ order by path_as_text"""
             returncode = os.system(command)
             stderr_buffer = ''
         else:
+            # tj3 writes the progress to stdout, read it only if somebody is
+            # interested in it
             process = subprocess.Popen(
                 [defaults.tj_command,
                  self.tjp_file_full_path,
                  '-o',
                  self.temp_file_path],
+                stdout=subprocess.PIPE if self.progress_callback else None,
                 stderr=subprocess.PIPE
             )
+            self._process = process
+            if self.is_cancelled:
+                self._kill_tj3()
+
+            progress_thread = None
+            if self.progress_callback:
+                progress_thread = threading.Thread(
+                    target=self._read_tj3_progress,
+                    args=(process.stdout,)
+                )
+                progress_thread.daemon = True
+                progress_thread.start()
 
-            # loop until process finishes and capture stderr output
+            # capture the stderr output until the process finishes, readline
+            # blocks until there is a line or the stream is closed
             stderr_buffer = []
-            while True:
-                stderr = process.stderr.readline()
-
-                if stderr == b'' and process.poll() is not None:
-                    break
-
-                if stderr != b'':
-                    stderr = stderr.strip()
+            for stderr in iter(process.stderr.readline, b''):
+                stderr = stderr.decode('utf-8', 'replace').strip()
+                if stderr:
                     stderr_buffer.append(stderr)
-                    logger.debug(stderr.strip())
+                    logger.debug(stderr)
+                    self._report_progress('solve', stderr)
+            process.stderr.close()
+
+            returncode = process.wait()
+            if progress_thread:
+                progress_thread.join()
+            self._process = None
 
             # flatten the buffer
             stderr_buffer = '\n'.join(stderr_buffer)
 
-            returncode = process.returncode
+        logger.debug('tj3 return code: %s' % returncode)
+        return returncode, stderr_buffer
 
-        if returncode:
-            # there is an error
-            raise RuntimeError(stderr_buffer)
+    _tj3_progress_splitter = re.compile(r'[\r\n]+')
 
-        # read back the csv file
-        self._parse_csv_file()
+    def _read_tj3_progress(self, stream):
+        """reads the progress output of tj3 from the given stream and reports
+        each progress line. The progress bar of tj3 is updated by using
+        carriage returns, so the stream is split from them too.
 
-        logger.debug('tj3 return code: %s' % returncode)
+        :param stream: The stdout of the tj3 process.
+        """
+        buffer_ = ''
+        last_message = None
+        while True:
+            data = os.read(stream.fileno(), 4096)
+            if not data:
+                break
+            buffer_ += data.decode('utf-8', 'replace')
+            parts = self._tj3_progress_splitter.split(buffer_)
+            # the last part may not be complete yet
+            buffer_ = parts.pop()
+            for part in parts:
+                message = part.strip()
+                if message and message != last_message:
+                    last_message = message
+                    self._report_progress('solve', message)
+        message = buffer_.strip()
+        if message and message != last_message:
+            self._report_progress('solve', message)
+        stream.close()
+
+    def _kill_tj3(self):
+        """kills the running tj3 process if there is any
+        """
+        process = self._process
+        if process is not None and process.poll() is None:
+            try:
+                process.kill()
+            except OSError:
+                # already finished
+                pass
+
+    def cancel(self):
+        """cancels the running schedule and kills the running tj3 processes
+        """
+        super(TaskJugglerScheduler, self).cancel()
+        self._kill_tj3()
+        for job in list(self._jobs):
+            job._kill_tj3()
+
+    @classmethod
+    def _get_cached_csv_file_path(cls, content_hash):
+        """returns the path of the cached csv file for the given tjp content
+        hash
+        """
+        return os.path.join(defaults.tj_cache_path, '%s.csv' % content_hash)
 
-        # remove the tjp file
-        self._clean_up()
+    def _restore_from_cache(self, job):
+        """copies the cached csv files of the given job to its csv file paths,
+        returns True if there is a cached csv file for the job and False
+        otherwise
 
-        return stderr_buffer
+        :param job: A TaskJugglerScheduler instance with a tjp file.
+        """
+        import shutil
 
-    def _validate_projects(self, projects):
-        """validates the given projects value
+        cached_csv_file_path = \
+            self._get_cached_csv_file_path(job.tjp_content_hash)
+        if not os.path.exists(cached_csv_file_path):
+            return False
+
+        logger.debug('using the cached csv file: %s' % cached_csv_file_path)
+        cached_resources_csv_file_path = \
+            self._get_resources_csv_file_path(cached_csv_file_path)
+        try:
+            shutil.copy(cached_csv_file_path, job.csv_file_full_path)
+            if os.path.exists(cached_resources_csv_file_path):
+                shutil.copy(cached_resources_csv_file_path,
+                            job.resources_csv_file_full_path)
+            # update the access time for the LRU eviction
+            os.utime(cached_csv_file_path, None)
+        except (IOError, OSError):
+            return False
+        return True
+
+    def _store_in_cache(self, job):
+        """stores the csv files of the given job in the cache and removes the
+        least recently used ones if there are more than
+        ``defaults.tj_cache_size`` files in the cache
+
+        :param job: A TaskJugglerScheduler instance which has been scheduled.
         """
-        if projects is None:
-            projects = []
+        import shutil
 
-        msg = '%(class)s.projects should be a list of ' \
-            'stalker.models.project.Project instances, not ' \
-            '%(projects_class)s'
+        if not os.path.exists(job.csv_file_full_path):
+            return
 
-        if not isinstance(projects, list):
+        try:
+            if not os.path.exists(defaults.tj_cache_path):
+                os.makedirs(defaults.tj_cache_path)
+            cached_csv_file_path = \
+                self._get_cached_csv_file_path(job.tjp_content_hash)
+            shutil.copy(job.csv_file_full_path, cached_csv_file_path)
+            if os.path.exists(job.resources_csv_file_full_path):
+                shutil.copy(
+                    job.resources_csv_file_full_path,
+                    self._get_resources_csv_file_path(cached_csv_file_path)
+                )
+
+            cached_files = [
+                os.path.join(defaults.tj_cache_path, file_name)
+                for file_name in os.listdir(defaults.tj_cache_path)
+                if file_name.endswith('.csv') and
+                not file_name.endswith('_resources.csv')
+            ]
+            cached_files.sort(key=os.path.getmtime, reverse=True)
+            for file_path in cached_files[defaults.tj_cache_size:]:
+                os.remove(file_path)
+                resources_file_path = \
+                    self._get_resources_csv_file_path(file_path)
+                if os.path.exists(resources_file_path):
+                    os.remove(resources_file_path)
+        except (IOError, OSError) as e:
+            # the cache is not essential
+            logger.debug('could not update the tj cache: %s' % e)
+
+    def _validate_max_workers(self, max_workers):
+        """validates the given max_workers value
+        """
+        if max_workers is None:
+            max_workers = 1
+
+        if not isinstance(max_workers, int):
             raise TypeError(
-                msg % {
-                    'class': self.__class__.__name__,
-                    'projects_class': projects.__class__.__name__
-                }
+                '%s.max_workers should be an integer, not %s' %
+                (self.__class__.__name__, max_workers.__class__.__name__)
             )
 
-        from stalker import Project
-        for item in projects:
-            if not isinstance(item, Project):
+        if max_workers < 1:
+            raise ValueError(
+                '%s.max_workers should be a positive integer, not %s' %
+                (self.__class__.__name__, max_workers)
+            )
+
+        return max_workers
+
+    @property
+    def max_workers(self):
+        """the maximum number of tj3 processes that are run concurrently. If
+        it is bigger than 1 the projects are grouped in to sets of projects
+        that are not sharing any resources and have no dependency relation
+        with each other, and each group is scheduled with its own tj3 process.
+        """
+        return self._max_workers
+
+    @max_workers.setter
+    def max_workers(self, max_workers):
+        """setter for the _max_workers attribute
+        """
+        self._max_workers = self._validate_max_workers(max_workers)
+
+    _override_keys = ['resources', 'alternative_resources', 'depends',
+                      'schedule_timing', 'schedule_unit', 'schedule_model',
+                      'priority']
+
+    def _validate_overrides(self, overrides):
+        """validates the given overrides value, converts the Task and User
+        instances to ids
+        """
+        if overrides is None:
+            overrides = {}
+
+        if not isinstance(overrides, dict):
+            raise TypeError(
+                '%s.overrides should be a dictionary, not %s' %
+                (self.__class__.__name__, overrides.__class__.__name__)
+            )
+
+        validated_overrides = {}
+        for task, values in overrides.items():
+            if not isinstance(values, dict):
                 raise TypeError(
-                    msg % {
-                        'class': self.__class__.__name__,
-                        'projects_class': item.__class__.__name__
-                    }
+                    '%s.overrides values should be dictionaries, not %s' %
+                    (self.__class__.__name__, values.__class__.__name__)
                 )
 
-        return projects
+            for key in values:
+                if key not in self._override_keys:
+                    raise ValueError(
+                        '%s.overrides keys should be one of %s, not %s' %
+                        (self.__class__.__name__, self._override_keys, key)
+                    )
+
+            # these values are written to the tjp file as they are
+            if 'schedule_timing' in values and \
+                    not isinstance(values['schedule_timing'], (int, float)):
+                raise TypeError(
+                    '%s.overrides schedule_timing should be an integer or '
+                    'float number, not %s' % (
+                        self.__class__.__name__,
+                        values['schedule_timing'].__class__.__name__
+                    )
+                )
+
+            if 'schedule_unit' in values and \
+                    values['schedule_unit'] not in defaults.datetime_units:
+                raise ValueError(
+                    '%s.overrides schedule_unit should be one of %s, not %s' %
+                    (self.__class__.__name__, defaults.datetime_units,
+                     values['schedule_unit'])
+                )
+
+            if 'schedule_model' in values and \
+                    values['schedule_model'] not in \
+                    defaults.task_schedule_models:
+                raise ValueError(
+                    '%s.overrides schedule_model should be one of %s, not %s'
+                    % (self.__class__.__name__,
+                       defaults.task_schedule_models,
+                       values['schedule_model'])
+                )
+
+            if 'priority' in values and \
+                    not isinstance(values['priority'], int):
+                raise TypeError(
+                    '%s.overrides priority should be an integer, not %s' %
+                    (self.__class__.__name__,
+                     values['priority'].__class__.__name__)
+                )
+
+            values = dict(values)
+            for key in ['resources', 'alternative_resources', 'depends']:
+                if key in values:
+                    values[key] = sorted(
+                        getattr(item, 'id', item) for item in values[key]
+                    )
+
+            validated_overrides[getattr(task, 'id', task)] = values
+
+        return validated_overrides
 
     @property
-    def projects(self):
-        """getter for the _project attribute
+    def overrides(self):
+        """the values that are used in place of the values of the tasks in
+        the database while exporting them
         """
-        return self._projects
+        return self._overrides
 
-    @projects.setter
-    def projects(self, projects):
-        """setter for the _project attribute
+    @overrides.setter
+    def overrides(self, overrides):
+        """setter for the _overrides attribute
         """
-        self._projects = self._validate_projects(projects)
+        self._overrides = self._validate_overrides(overrides)
+
+    def _validate_entity_list(self, attr_name, items, entity_class):
+        """validates the given list of entities
+
+        :param str attr_name: The name of the attribute for error messages.
+        :param items: The value to validate.
+        :param entity_class: The class of the entities.
+        """
+        if items is None:
+            items = []
+
+        msg = '%(class)s.%(attr)s should be a list of %(module)s.%(entity)s ' \
+            'instances, not %(items_class)s'
+        msg_data = {
+            'class': self.__class__.__name__,
+            'attr': attr_name,
+            'module': entity_class.__module__,
+            'entity': entity_class.__name__,
+        }
+
+        if not isinstance(items, list):
+            msg_data['items_class'] = items.__class__.__name__
+            raise TypeError(msg % msg_data)
+
+        for item in items:
+            if not isinstance(item, entity_class):
+                msg_data['items_class'] = item.__class__.__name__
+                raise TypeError(msg % msg_data)
+
+        return items
+
+    @property
+    def departments(self):
+        """the departments whose tasks are scheduled, the other leaf tasks
+        are frozen
+        """
+        return self._departments
+
+    @departments.setter
+    def departments(self, departments):
+        """setter for the _departments attribute
+        """
+        from stalker import Department
+        self._departments = \
+            self._validate_entity_list('departments', departments, Department)
+
+    @property
+    def frozen_statuses(self):
+        """the leaf tasks with these statuses are frozen
+        """
+        return self._frozen_statuses
+
+    @frozen_statuses.setter
+    def frozen_statuses(self, frozen_statuses):
+        """setter for the _frozen_statuses attribute
+        """
+        from stalker import Status
+        self._frozen_statuses = self._validate_entity_list(
+            'frozen_statuses', frozen_statuses, Status
+        )
+
+    @property
+    def is_partial(self):
+        """returns True if not all the active projects are scheduled (see
+        :attr:`.SchedulerBase.is_partial`) or only some of their tasks are
+        scheduled by using the ``departments``, ``frozen_statuses`` or
+        ``overrides`` arguments
+        """
+        return super(TaskJugglerScheduler, self).is_partial \
+            or bool(self.departments) \
+            or bool(self.frozen_statuses) \
+            or bool(self.overrides)
+
+    def _get_frozen_condition(self):
+        """returns the sql condition for the frozen tasks in the export query
+        """
+        conditions = []
+        if self.freeze_other_projects and self.projects:
+            conditions.append(
+                'tasks.project_id not in (%s)' %
+                ', '.join(str(project.id) for project in self.projects)
+            )
+
+        if self.frozen_statuses:
+            conditions.append(
+                '"Tasks".status_id in (%s)' %
+                ', '.join(str(status.id) for status in self.frozen_statuses)
+            )
+
+        if self.departments:
+            conditions.append(
+                """not exists (
+        select 1
+        from "Task_Resources"
+        join "Department_Users"
+            on "Task_Resources".resource_id = "Department_Users".uid
+        where "Task_Resources".task_id = "Tasks".id
+            and "Department_Users".did in (%s)
+    )""" % ', '.join(str(department.id) for department in self.departments)
+            )
+
+        if not conditions:
+            return 'false'
+
+        # the tasks that are not scheduled before can not be frozen
+        return '(%s) and "Tasks".computed_start is not null ' \
+            'and "Tasks".computed_end is not null' % ' or '.join(conditions)
+
+    def _get_tjp_abs_ids(self, task_ids, project_ids):
+        """returns a dictionary of the given task ids to their absolute tjp
+        ids, tasks that are not in the given projects are skipped
+
+        :param task_ids: A list of Task ids.
+        :param project_ids: A list of Project ids.
+        """
+        from sqlalchemy import text
+        from stalker import db
+
+        if not task_ids:
+            return {}
+
+        sql_query = """select
+    id,
+    'Project_' || project_id || '.Task_' ||
+        array_to_string(ancestor_ids || id, '.Task_') as tjp_abs_id
+from "Tasks"
+where id = any(:ids) and project_id = any(:project_ids)"""
+
+        return dict(
+            db.DBSession.connection().execute(
+                text(sql_query), ids=list(task_ids),
+                project_ids=list(project_ids)
+            ).fetchall()
+        )
+
+
+class _NativeTask(object):
+    """holds the scheduling data of a task for the :class:`.NativeScheduler`
+    """
+
+    __slots__ = ('id', 'parent_id', 'project_id', 'priority', 'seconds',
+                 'model', 'allocation_strategy', 'persistent_allocation',
+                 'resource_ids', 'alternative_resource_ids', 'dependencies',
+                 'children', 'bookings', 'order', 'start', 'end',
+                 'computed_resource_ids')
+
+    def __init__(self, id, parent_id, project_id, priority, seconds, model,
+                 allocation_strategy, persistent_allocation):
+        self.id = id
+        self.parent_id = parent_id
+        self.project_id = project_id
+        self.priority = priority
+        self.seconds = seconds
+        self.model = model
+        self.allocation_strategy = allocation_strategy
+        self.persistent_allocation = persistent_allocation
+        self.resource_ids = []
+        self.alternative_resource_ids = []
+        self.dependencies = []
+        self.children = []
+        self.bookings = []
+        self.order = 0
+        self.start = None
+        self.end = None
+        self.computed_resource_ids = set()
+
+
+class NativeScheduler(SchedulerBase):
+    """Schedules the tasks without using any external tool.
+
+    NativeScheduler solves the scheduling problem in the current process by
+    using a priority based list scheduling heuristic. The time between the
+    :attr:`.Studio.start` and :attr:`.Studio.end` is split in to slots of
+    :attr:`.Studio.timing_resolution` and the leaf tasks are scheduled one by
+    one, as soon as all the tasks that they depend on are scheduled. If more
+    than one task is ready to be scheduled the one with the higher
+    :attr:`.Task.priority` is scheduled first and for tasks with the same
+    priority the hierarchy order is used, just like in the tjp file that the
+    :class:`.TaskJugglerScheduler` creates. It is a single pass heuristic, so
+    although it is much faster than TaskJuggler the results may differ.
+
+    The following data is considered:
+
+      * ``effort``, ``length`` and ``duration`` schedule models,
+      * :attr:`.TaskDependency.dependency_target` and the gap values of the
+        dependencies, the dependencies of the parent tasks and dependencies to
+        container tasks,
+      * :attr:`.Task.priority`,
+      * :attr:`.Task.resources` and :attr:`.Task.alternative_resources` with
+        the :attr:`.Task.allocation_strategy` and
+        :attr:`.Task.persistent_allocation` values,
+      * :attr:`.User.efficiency`,
+      * :attr:`.Studio.working_hours`, the studio wide and the user
+        :class:`.Vacation` s,
+      * :class:`.TimeLog` s, a resource is not allocated in a booked time
+        slot and the effort booked for a task is deducted from the effort of
+        that task and the rest of the effort is scheduled after the last
+        booking.
+
+    The schedule constraints are not considered, which is the same with the
+    :class:`.TaskJugglerScheduler`. The results differ from the
+    :class:`.TaskJugglerScheduler` in these cases:
+
+      * Leaf tasks without any resources are scheduled as ``length`` tasks
+        with their :attr:`.Task.schedule_timing`, where the
+        :class:`.TaskJugglerScheduler` exports them without any timing
+        information and tj3 does not give them a duration.
+      * The :attr:`.Studio.working_hours` are applied in UTC, where tj3
+        applies them in the time zone of the tj3 process (the ``TZ``
+        environment variable), so the results are the same only if tj3 runs
+        in UTC.
+      * The :attr:`.TaskDependency.gap_timing`,
+        :attr:`.TaskDependency.gap_unit` and :attr:`.TaskDependency.gap_model`
+        values are honored, where the :class:`.TaskJugglerScheduler` exports
+        the dependencies only with their dependency target (``depends <task>
+        {onend}``) and tj3 schedules the dependent task right after the
+        dependency without any gap.
+
+    The computed dates and resources are written back to the database in the
+    same way with :class:`.TaskJugglerScheduler`.
+
+    :param bool compute_resources: When set to True the
+      :attr:`.Task.computed_resources` attribute is filled for each Task. The
+      default is False.
+
+    :param projects: A list of :class:`.Project` instances to schedule. If
+      skipped all the projects are scheduled.
+
+    The durations of the data load, solve and db write back phases are
+    stored in the :attr:`.metrics` attribute after each schedule.
+    """
+
+    _metric_phases = ['data_load', 'solve', 'db_write_back']
+
+    def __init__(self, studio=None, compute_resources=False, projects=None):
+        super(NativeScheduler, self).__init__(studio)
+        self.compute_resources = compute_resources
+
+        self._projects = []
+        self.projects = projects
+
+        self.slot_seconds = None
+        self.origin = None
+        self.number_of_slots = 0
+        self.working_slots = None
+
+        self.tasks = {}
+        self.efficiencies = {}
+        self.availabilities = {}
+        self.loads = {}
+
+    def _get_init_kwargs(self):
+        """returns the arguments that are needed to create a new scheduler
+        with the same settings
+        """
+        kwargs = super(NativeScheduler, self)._get_init_kwargs()
+        kwargs.update({
+            'compute_resources': self.compute_resources,
+            'projects': self.projects
+        })
+        return kwargs
+
+    def _get_project_ids(self):
+        """returns the ids of the projects that are going to be scheduled
+        """
+        from stalker import db
+
+        if self.projects:
+            return [project.id for project in self.projects]
+
+        return [
+            r[0] for r in db.DBSession.connection().execute(
+                'select id from "Projects" order by id'
+            ).fetchall()
+        ]
+
+    def _to_slot(self, date, round_up=False):
+        """returns the index of the slot for the given datetime
+
+        :param date: A datetime.datetime instance.
+        :param bool round_up: Returns the index of the next slot if the given
+          date is not at the start of a slot.
+        """
+        seconds = (date - self.origin).total_seconds()
+        slot, remainder = divmod(seconds, self.slot_seconds)
+        slot = int(slot)
+        if round_up and remainder:
+            slot += 1
+        return max(0, min(slot, self.number_of_slots))
+
+    def _to_datetime(self, slot):
+        """returns the datetime of the start of the given slot
+        """
+        return self.origin + \
+            datetime.timedelta(seconds=slot * self.slot_seconds)
+
+    def _create_calendar(self):
+        """creates the working slots of the studio
+        """
+        resolution = self.studio.timing_resolution
+        self.slot_seconds = \
+            resolution.days * 86400 + resolution.seconds
+
+        # TaskJuggler uses the dates of the studio start and end values
+        self.origin = datetime.datetime.combine(
+            self.studio.start.date(), datetime.time(0)
+        ).replace(tzinfo=pytz.utc)
+        end = datetime.datetime.combine(
+            self.studio.end.date(), datetime.time(0)
+        ).replace(tzinfo=pytz.utc)
+
+        self.number_of_slots = \
+            int((end - self.origin).total_seconds() // self.slot_seconds)
+
+        slot_minutes = self.slot_seconds / 60.0
+        working_hours = self.studio.working_hours
+        self.working_slots = bytearray(self.number_of_slots)
+        for i in range(self.number_of_slots):
+            date = self._to_datetime(i)
+            minute = date.hour * 60 + date.minute
+            for wh_start, wh_end in working_hours[date.weekday()]:
+                if wh_start <= minute and minute + slot_minutes <= wh_end:
+                    self.working_slots[i] = 1
+                    break
+
+    def _mark_unavailable(self, slots, start, end):
+        """marks the slots between the given start and end dates as
+        unavailable
+
+        :param slots: A bytearray.
+        :param start: A datetime.datetime instance.
+        :param end: A datetime.datetime instance.
+        """
+        start_slot = self._to_slot(start)
+        end_slot = self._to_slot(end, round_up=True)
+        if end_slot > start_slot:
+            slots[start_slot:end_slot] = bytearray(end_slot - start_slot)
+
+    def _load_data(self, project_ids):
+        """loads the tasks, resources, vacations and time logs from the
+        database
+
+        :param project_ids: The ids of the projects to schedule.
+        """
+        from stalker import db
+        from stalker.models.mixins import ScheduleMixin
+
+        connection = db.DBSession.connection()
+        project_ids_sql = ', '.join(map(str, project_ids))
+
+        # resources
+        self.efficiencies = {}
+        self.availabilities = {}
+        self.loads = {}
+        for user_id, efficiency in connection.execute(
+                'select id, efficiency from "Users"'):
+            self.efficiencies[user_id] = \
+                efficiency if efficiency is not None else 1.0
+            self.availabilities[user_id] = bytearray(self.working_slots)
+            self.loads[user_id] = 0
+
+        # vacations
+        for user_id, start, end in connection.execute(
+                'select user_id, start, "end" from "Vacations"'):
+            if user_id is None:
+                # a studio vacation
+                self._mark_unavailable(self.working_slots, start, end)
+                for availability in self.availabilities.values():
+                    self._mark_unavailable(availability, start, end)
+            elif user_id in self.availabilities:
+                self._mark_unavailable(
+                    self.availabilities[user_id], start, end
+                )
+
+        # tasks
+        self.tasks = {}
+        for r in connection.execute(
+                'select id, parent_id, project_id, priority, schedule_timing, '
+                'schedule_unit, schedule_model, allocation_strategy, '
+                'persistent_allocation from "Tasks" '
+                'where project_id in (%s) order by id' % project_ids_sql):
+            self.tasks[r[0]] = _NativeTask(
+                id=r[0],
+                parent_id=r[1],
+                project_id=r[2],
+                priority=r[3],
+                seconds=ScheduleMixin.to_seconds(r[4], r[5], r[6]) or 0,
+                model=r[6],
+                allocation_strategy=r[7],
+                persistent_allocation=r[8]
+            )
+
+        for task in self.tasks.values():
+            if task.parent_id in self.tasks:
+                self.tasks[task.parent_id].children.append(task)
+
+        # resources and alternative resources
+        for table_name, attr_name in [
+                ('Task_Resources', 'resource_ids'),
+                ('Task_Alternative_Resources', 'alternative_resource_ids')]:
+            for task_id, resource_id in connection.execute(
+                    'select task_id, resource_id from "%s" '
+                    'where task_id in ('
+                    '    select id from "Tasks" where project_id in (%s)'
+                    ') order by resource_id' % (table_name, project_ids_sql)):
+                getattr(self.tasks[task_id], attr_name).append(resource_id)
+
+        # dependencies
+        for task_id, depends_to_id, target, gap_timing, gap_unit, gap_model \
+                in connection.execute(
+                    'select task_id, depends_to_id, dependency_target, '
+                    'gap_timing, gap_unit, gap_model '
+                    'from "Task_Dependencies" '
+                    'where task_id in ('
+                    '    select id from "Tasks" where project_id in (%s)'
+                    ') order by depends_to_id' % project_ids_sql):
+            if depends_to_id not in self.tasks:
+                # depends to a task in a project that is not scheduled
+                continue
+            gap_seconds = \
+                ScheduleMixin.to_seconds(gap_timing, gap_unit, gap_model) or 0
+            self.tasks[task_id].dependencies.append(
+                (depends_to_id, target, gap_seconds, gap_model)
+            )
+
+        # time logs, all of them are considered to block the resources
+        for task_id, resource_id, start, end in connection.execute(
+                'select task_id, resource_id, start, "end" from "TimeLogs"'):
+            if resource_id in self.availabilities:
+                self._mark_unavailable(
+                    self.availabilities[resource_id], start, end
+                )
+            if task_id in self.tasks:
+                self.tasks[task_id].bookings.append((resource_id, start, end))
+
+    def _get_leaves(self, task, leaves_cache):
+        """returns the leaf tasks under the given task, or the task itself if
+        it is a leaf task
+        """
+        if task.id in leaves_cache:
+            return leaves_cache[task.id]
+
+        if not task.children:
+            leaves = [task]
+        else:
+            leaves = []
+            for child in task.children:
+                leaves.extend(self._get_leaves(child, leaves_cache))
+
+        leaves_cache[task.id] = leaves
+        return leaves
+
+    def _add_working_slots(self, slot, count):
+        """returns the slot index after the given number of working slots
+        starting from the given slot
+        """
+        while count > 0 and slot < self.number_of_slots:
+            if self.working_slots[slot]:
+                count -= 1
+            slot += 1
+        return slot
+
+    def _get_earliest_start(self, task, dependencies, leaves_cache):
+        """returns the earliest start slot of the given leaf task by looking
+        at its dependencies
+        """
+        earliest_start = 0
+        for depends_to_id, target, gap_seconds, gap_model in dependencies:
+            leaves = [
+                leaf
+                for leaf in self._get_leaves(self.tasks[depends_to_id],
+                                             leaves_cache)
+                if leaf is not task
+            ]
+            if not leaves:
+                continue
+
+            if target == 'onstart':
+                slot = min(leaf.start for leaf in leaves)
+            else:
+                slot = max(leaf.end for leaf in leaves)
+
+            if gap_seconds:
+                gap_slots = int(-(-gap_seconds // self.slot_seconds))
+                if gap_model == 'duration':
+                    slot += gap_slots
+                else:
+                    slot = self._add_working_slots(slot, gap_slots)
+
+            earliest_start = max(earliest_start, slot)
+        return earliest_start
+
+    def _select_resource(self, candidates, slot, strategy, random_generator):
+        """selects one of the available resources in the given slot with the
+        given allocation strategy
+
+        :param candidates: A list of resource ids.
+        :param int slot: The slot index.
+        :param str strategy: One of the
+          :attr:`stalker.config.Config.allocation_strategy` values.
+        :param random_generator: A random.Random instance.
+        """
+        available = [
+            r_id for r_id in candidates
+            if r_id in self.availabilities and self.availabilities[r_id][slot]
+        ]
+        if not available:
+            return None
+
+        if len(available) == 1 or strategy == 'order':
+            return available[0]
+        elif strategy == 'random':
+            return random_generator.choice(available)
+        elif strategy == 'maxloaded':
+            return max(available, key=lambda r_id: self.loads[r_id])
+        # the load of a resource is the number of allocated slots, so
+        # minallocated and minloaded are the same
+        return min(available, key=lambda r_id: self.loads[r_id])
+
+    def _schedule_leaf_task(self, task, earliest_start, random_generator):
+        """schedules the given leaf task starting from the given slot
+        """
+        allocations = [
+            [r_id] + [alt_id for alt_id in task.alternative_resource_ids
+                      if alt_id != r_id]
+            for r_id in task.resource_ids
+        ]
+        selected = [None] * len(allocations)
+
+        remaining_seconds = task.seconds
+        first_slot = None
+        last_slot = None
+        booking_start = None
+        booking_end = None
+        for resource_id, start, end in task.bookings:
+            task.computed_resource_ids.add(resource_id)
+            if task.model == 'effort':
+                remaining_seconds -= \
+                    (end - start).total_seconds() * \
+                    self.efficiencies.get(resource_id, 1.0)
+            booking_start = self._to_slot(start) if booking_start is None \
+                else min(booking_start, self._to_slot(start))
+            booking_end = self._to_slot(end, round_up=True) \
+                if booking_end is None \
+                else max(booking_end, self._to_slot(end, round_up=True))
+
+        model = task.model
+        if model == 'effort' and not allocations:
+            model = 'length'
+
+        slot = earliest_start
+        if model == 'effort':
+            if booking_end is not None:
+                # continue after the last booking
+                slot = max(slot, booking_end)
+
+            all_candidates = set()
+            for candidates in allocations:
+                all_candidates.update(candidates)
+            all_candidates = [
+                self.availabilities[r_id] for r_id in all_candidates
+                if r_id in self.availabilities
+            ]
+
+            while remaining_seconds > 0:
+                # jump to the first slot that any of the resources is
+                # available
+                free_slots = [
+                    availability.find(b'\x01', slot)
+                    for availability in all_candidates
+                ]
+                free_slots = [f for f in free_slots if f != -1]
+                if not free_slots:
+                    raise RuntimeError(
+                        'Task_%s can not be scheduled before the end of the '
+                        'Studio (%s)' % (task.id, self.studio.end)
+                    )
+                slot = min(free_slots)
+
+                for i, candidates in enumerate(allocations):
+                    if task.persistent_allocation and \
+                       selected[i] is not None:
+                        candidates = [selected[i]]
+                    resource_id = self._select_resource(
+                        candidates, slot, task.allocation_strategy,
+                        random_generator
+                    )
+                    if resource_id is None:
+                        continue
+
+                    selected[i] = resource_id
+                    self.availabilities[resource_id][slot] = 0
+                    self.loads[resource_id] += 1
+                    task.computed_resource_ids.add(resource_id)
+                    remaining_seconds -= \
+                        self.slot_seconds * self.efficiencies[resource_id]
+
+                    if first_slot is None:
+                        first_slot = slot
+                    last_slot = slot
+
+                    if remaining_seconds <= 0:
+                        break
+                slot += 1
+        else:
+            slot_count = int(-(-remaining_seconds // self.slot_seconds))
+            if model == 'length':
+                # start from the next working slot
+                while slot < self.number_of_slots and \
+                        not self.working_slots[slot]:
+                    slot += 1
+                end_slot = self._add_working_slots(slot, slot_count)
+            else:
+                end_slot = slot + slot_count
+
+            if end_slot > self.number_of_slots:
+                raise RuntimeError(
+                    'Task_%s can not be scheduled before the end of the '
+                    'Studio (%s)' % (task.id, self.studio.end)
+                )
+
+            if slot_count:
+                first_slot = slot
+                last_slot = end_slot - 1
+
+            # allocate the resources whenever they are available
+            for s in range(slot, end_slot):
+                for i, candidates in enumerate(allocations):
+                    if task.persistent_allocation and \
+                       selected[i] is not None:
+                        candidates = [selected[i]]
+                    resource_id = self._select_resource(
+                        candidates, s, task.allocation_strategy,
+                        random_generator
+                    )
+                    if resource_id is None:
+                        continue
+                    selected[i] = resource_id
+                    self.availabilities[resource_id][s] = 0
+                    self.loads[resource_id] += 1
+                    task.computed_resource_ids.add(resource_id)
+
+        if first_slot is None:
+            # nothing to schedule, it is a milestone or it is fully booked
+            task.start = slot
+            task.end = slot
+        else:
+            task.start = first_slot
+            task.end = last_slot + 1
+
+        if booking_start is not None:
+            task.start = min(task.start, booking_start)
+            task.end = max(task.end, booking_end)
+
+    def _schedule_tasks(self):
+        """schedules all the loaded tasks
+        """
+        import heapq
+        import random
+
+        random_generator = random.Random(0)
+        leaves_cache = {}
+
+        # order the tasks in hierarchy order
+        root_tasks = sorted(
+            [task for task in self.tasks.values()
+             if task.parent_id not in self.tasks],
+            key=lambda x: (x.project_id, x.id)
+        )
+        order = 0
+        tasks_to_visit = list(reversed(root_tasks))
+        while tasks_to_visit:
+            task = tasks_to_visit.pop()
+            task.order = order
+            order += 1
+            tasks_to_visit.extend(
+                sorted(task.children, key=lambda x: x.id, reverse=True)
+            )
+
+        # collect the dependencies of the leaf tasks including the
+        # dependencies of their parents
+        leaf_dependencies = {}
+        for task in self.tasks.values():
+            if task.children:
+                continue
+            dependencies = list(task.dependencies)
+            parent = self.tasks.get(task.parent_id)
+            while parent:
+                dependencies.extend(parent.dependencies)
+                parent = self.tasks.get(parent.parent_id)
+            leaf_dependencies[task.id] = dependencies
+
+        # count the leaf tasks each leaf task is waiting for
+        waiting_counts = {}
+        dependent_leaves = {}
+        for task_id, dependencies in leaf_dependencies.items():
+            prerequisite_ids = set()
+            for dependency in dependencies:
+                for leaf in self._get_leaves(self.tasks[dependency[0]],
+                                             leaves_cache):
+                    prerequisite_ids.add(leaf.id)
+            prerequisite_ids.discard(task_id)
+            waiting_counts[task_id] = len(prerequisite_ids)
+            for prerequisite_id in prerequisite_ids:
+                dependent_leaves.setdefault(prerequisite_id, []).append(
+                    task_id
+                )
+
+        ready_tasks = [
+            (-self.tasks[task_id].priority, self.tasks[task_id].order,
+             task_id)
+            for task_id, count in waiting_counts.items() if count == 0
+        ]
+        heapq.heapify(ready_tasks)
+
+        scheduled_count = 0
+        while ready_tasks:
+            _, _, task_id = heapq.heappop(ready_tasks)
+            task = self.tasks[task_id]
+            earliest_start = self._get_earliest_start(
+                task, leaf_dependencies[task_id], leaves_cache
+            )
+            self._schedule_leaf_task(task, earliest_start, random_generator)
+            scheduled_count += 1
+
+            for dependent_id in dependent_leaves.get(task_id, []):
+                waiting_counts[dependent_id] -= 1
+                if waiting_counts[dependent_id] == 0:
+                    dependent = self.tasks[dependent_id]
+                    heapq.heappush(
+                        ready_tasks,
+                        (-dependent.priority, dependent.order, dependent_id)
+                    )
+
+        if scheduled_count != len(waiting_counts):
+            raise RuntimeError(
+                'Tasks can not be scheduled because of circular '
+                'dependencies: %s' % ', '.join(
+                    'Task_%s' % task_id
+                    for task_id, count in sorted(waiting_counts.items())
+                    if count
+                )
+            )
+
+        # update the parent tasks
+        for task in sorted(self.tasks.values(), key=lambda x: -x.order):
+            if task.children:
+                task.start = min(child.start for child in task.children)
+                task.end = max(child.end for child in task.children)
+
+    def schedule(self):
+        """Does the scheduling.
+        """
+        # check the studio attribute
+        from stalker import Studio
+
+        if not isinstance(self.studio, Studio):
+            raise TypeError(
+                '%s.studio should be an instance of '
+                'stalker.models.studio.Studio, not %s' %
+                (self.__class__.__name__, self.studio.__class__.__name__)
+            )
+
+        start = time.time()
+        self._reset_metrics()
+        self.updated_row_counts = {}
+
+        project_ids = self._get_project_ids()
+        if not project_ids:
+            self._finalize_metrics(time.time() - start)
+            return ''
+
+        self._report_progress('load')
+        self._create_calendar()
+        self._load_data(project_ids)
+        self._add_timing('data_load', time.time() - start)
+        self._check_cancelled()
+
+        counts = self.metrics['counts']
+        for task in self.tasks.values():
+            counts['tasks'] += 1
+            counts['bookings'] += len(task.bookings)
+            counts['dependencies'] += len(task.dependencies)
+
+        self._report_progress('solve')
+        solve_start = time.time()
+        self._schedule_tasks()
+        self._add_timing('solve', time.time() - solve_start)
+        self._check_cancelled()
+
+        # write the data back
+        update_data = []
+        update_user_data = []
+        project_dates = {}
+        for task in self.tasks.values():
+            start_date = self._to_datetime(task.start)
+            end_date = self._to_datetime(task.end)
+            update_data.append({
+                'b_id': task.id,
+                'start': start_date,
+                'end': end_date,
+                'computed_start': start_date,
+                'computed_end': end_date
+            })
+
+            if task.parent_id not in self.tasks:
+                dates = project_dates.get(task.project_id)
+                if dates is None:
+                    project_dates[task.project_id] = [task.start, task.end]
+                else:
+                    dates[0] = min(dates[0], task.start)
+                    dates[1] = max(dates[1], task.end)
+
+            if not task.children:
+                for resource_id in sorted(task.computed_resource_ids):
+                    update_user_data.append({
+                        'task_id': task.id,
+                        'resource_id': resource_id
+                    })
+
+        for project_id, (start_slot, end_slot) in project_dates.items():
+            start_date = self._to_datetime(start_slot)
+            end_date = self._to_datetime(end_slot)
+            update_data.append({
+                'b_id': project_id,
+                'start': start_date,
+                'end': end_date,
+                'computed_start': start_date,
+                'computed_end': end_date
+            })
+
+        self._report_progress('write_back')
+        self._write_schedule_data(
+            update_data,
+            update_user_data if self.compute_resources else None
+        )
+
+        end = time.time()
+        logger.debug(
+            'native scheduling of %s tasks took: %s seconds' %
+            (len(self.tasks), end - start)
+        )
+        self._finalize_metrics(end - start)
+
+        return ''
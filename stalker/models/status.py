@@ -16,8 +16,8 @@
 # You should have received a copy of the Lesser GNU General Public License
 # along with Stalker.  If not, see <http://www.gnu.org/licenses/>
 
-from sqlalchemy import Table, Column, Integer, ForeignKey
-from sqlalchemy.orm import relationship, validates
+from sqlalchemy import Table, Column, Integer, ForeignKey, event
+from sqlalchemy.orm import relationship, validates, Session
 
 from stalker.db.session import DBSession
 from stalker.db.declarative import Base
@@ -31,6 +31,13 @@ import logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging_level)
 
+# the key of the status registry in the Session.info dictionary
+STATUS_REGISTRY_KEY = 'stalker_status_registry'
+
+# incremented whenever a Status is changed in this process, so the status
+# registries and the StatusList indices that are older are rebuilt
+_status_generation = [0]
+
 
 class Status(Entity, CodeMixin):
     """Defines object statutes.
@@ -57,6 +64,19 @@ class Status(Entity, CodeMixin):
 
     :param code: The code of this Status, its generally the short version of
       the name attribute.
+
+    **Status Registry**
+
+    Use :meth:`.get_by_code` to get a Status with its code. All the Statuses
+    are retrieved with a single query the first time it is called in a
+    session and kept in a registry stored in the ``info`` dictionary of that
+    session, so the workflow methods are not querying the statuses over and
+    over again. The registry is kept until the end of the current transaction
+    of the session, so the Statuses changed in other processes are retrieved
+    in the next transaction, and it is rebuilt when a Status is created,
+    changed or deleted in this process or when a Status in the registry is
+    not in the session anymore (after a ``Session.expunge_all()`` call for
+    example).
     """
     __auto_name__ = False
     __tablename__ = "Statuses"
@@ -94,6 +114,78 @@ class Status(Entity, CodeMixin):
         """
         return super(Status, self).__hash__()
 
+    @classmethod
+    def get_by_code(cls, code):
+        """returns the Status with the given code from the status registry of
+        the current session, or None if there is no Status with that code
+
+        :param str code: The code of the Status, like "WIP".
+        """
+        session = DBSession()
+        generation, registry = \
+            session.info.get(STATUS_REGISTRY_KEY, (None, None))
+        if generation != _status_generation[0]:
+            registry = cls._build_status_registry(session)
+
+        status = registry.get(code)
+        if status is not None and status not in session:
+            # the status is expunged from the session
+            registry = cls._build_status_registry(session)
+            status = registry.get(code)
+
+        if status is None:
+            # might be created later or in another process
+            status = session.query(cls).filter_by(code=code).first()
+            if status is not None:
+                registry[code] = status
+        return status
+
+    @classmethod
+    def _build_status_registry(cls, session):
+        """retrieves all the Statuses with a single query and stores them in
+        the status registry of the given session, returns the registry
+
+        :param session: A SQLAlchemy session.
+        """
+        registry = {}
+        with session.no_autoflush:
+            for status in session.query(cls).order_by(cls.id).all():
+                registry.setdefault(status.code, status)
+        session.info[STATUS_REGISTRY_KEY] = (_status_generation[0], registry)
+        return registry
+
+
+def _invalidate_status_registry(*args):
+    """invalidates the status registries and the StatusList indices
+    """
+    _status_generation[0] += 1
+
+
+for _event_name in ['after_insert', 'after_update', 'after_delete']:
+    event.listen(Status, _event_name, _invalidate_status_registry)
+
+for _attribute in [Status.name, Status.code]:
+    event.listen(_attribute, 'set', _invalidate_status_registry)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _clear_status_registry(session, transaction):
+    """clears the status registry of the session when its transaction is
+    committed, rolled back or closed (which also happens when the session is
+    closed), the registry may contain statuses that are rolled back, detached
+    or changed by other processes after that
+    """
+    if transaction.parent is None:
+        session.info.pop(STATUS_REGISTRY_KEY, None)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _clear_status_registry_on_soft_rollback(session, previous_transaction):
+    """clears the status registry of the session when an inner transaction is
+    rolled back
+    """
+    session.info.pop(STATUS_REGISTRY_KEY, None)
+
 
 class StatusList(Entity, TargetEntityTypeMixin):
     """Type specific list of :class:`.Status` instances.
@@ -190,6 +282,7 @@ class StatusList(Entity, TargetEntityTypeMixin):
         if statuses is None:
             statuses = []
         self.statuses = statuses
+        self._status_index = None
 
     @validates("statuses")
     def _validate_statuses(self, key, status):
@@ -216,6 +309,21 @@ class StatusList(Entity, TargetEntityTypeMixin):
         """
         return super(StatusList, self).__hash__()
 
+    def _get_status_index(self):
+        """returns a dictionary of the lower case names and codes of the
+        statuses to the statuses, the later statuses are overriding the
+        earlier ones with the same name or code
+        """
+        generation, index = \
+            getattr(self, '_status_index', None) or (None, None)
+        if generation != _status_generation[0]:
+            index = {}
+            for status in self.statuses:
+                index[status.name.lower()] = status
+                index[status.code.lower()] = status
+            self._status_index = (_status_generation[0], index)
+        return index
+
     def __getitem__(self, key):
         """the indexing attributes for getting item
         """
@@ -223,9 +331,7 @@ class StatusList(Entity, TargetEntityTypeMixin):
             return_item = None
             from stalker import __string_types__
             if isinstance(key, __string_types__):
-                for item in self.statuses:
-                    if item == key:
-                        return_item = item
+                return_item = self._get_status_index().get(key.lower())
             else:
                 return_item = self.statuses[key]
 
@@ -247,6 +353,19 @@ class StatusList(Entity, TargetEntityTypeMixin):
         return len(self.statuses)
 
 
+def _reset_status_index(target, *args):
+    """resets the status index of the given StatusList
+    """
+    target._status_index = None
+
+
+for _event_name in ['append', 'remove']:
+    event.listen(StatusList.statuses, _event_name, _reset_status_index)
+
+for _event_name in ['load', 'refresh', 'expire']:
+    event.listen(StatusList, _event_name, _reset_status_index)
+
+
 # StatusList_Statuses Table
 StatusList_Statuses = Table(
     "StatusList_Statuses", Base.metadata,
@@ -22,14 +22,15 @@ import time
 import datetime
 from math import ceil
 
-from sqlalchemy import (Column, Integer, ForeignKey, Interval, Boolean,
+from sqlalchemy import (Table, Column, Integer, ForeignKey, Interval, Boolean,
                         DateTime, PickleType)
 from sqlalchemy.orm import validates, relationship, synonym, reconstructor
 
 from stalker import db, defaults, log
+from stalker.db.declarative import Base
 from stalker.models.entity import SimpleEntity, Entity
 from stalker.models.mixins import DateRangeMixin, WorkingHoursMixin
-from stalker.models.schedulers import SchedulerBase
+from stalker.models.schedulers import SchedulerBase, SchedulingJob
 
 logger = logging.getLogger(__name__)
 logger.setLevel(log.logging_level)
@@ -82,6 +83,18 @@ class Studio(Entity, DateRangeMixin, WorkingHoursMixin):
       :attr:`.last_scheduled_at`
       :attr:`.last_scheduled_by`
       :attr:`.last_schedule_message`
+      :attr:`.last_schedule_metrics`
+
+    **Schedule History**
+
+    Every successful schedule of the Studio is recorded in the
+    ``Schedule_Runs`` table with the :attr:`.scheduling_started_at` value of
+    the schedule, which is also the :attr:`.last_scheduled_at` value of the
+    full schedules. Only the tasks that are moved in a schedule are stored in
+    the ``Schedule_Deltas`` table, as the shift of their ``computed_start``
+    and ``computed_end`` values in seconds against the previous schedule, so
+    the history stays small even with daily schedules. Use
+    :meth:`.get_task_slips` and :meth:`.get_moved_tasks` to query it.
 
     :param int daily_working_hours: An integer specifying the daily working
       hours for the studio. It is another critical value attribute which
@@ -106,6 +119,13 @@ class Studio(Entity, DateRangeMixin, WorkingHoursMixin):
     """
     __auto_name__ = False
     __tablename__ = 'Studios'
+    __date_updated_ignored_attrs__ = \
+        SimpleEntity.__date_updated_ignored_attrs__ + [
+            'is_scheduling', 'is_scheduling_by', 'is_scheduling_by_id',
+            'scheduling_started_at', 'last_scheduled_at', 'last_scheduled_by',
+            'last_scheduled_by_id', 'last_schedule_message',
+            'last_schedule_metrics'
+        ]
     __mapper_args__ = {'polymorphic_identity': 'Studio'}
 
     studio_id = Column(
@@ -137,7 +157,9 @@ class Studio(Entity, DateRangeMixin, WorkingHoursMixin):
     )
     last_scheduled_at = Column(
         DateTime(timezone=True),
-        doc='Stores the last schedule date'
+        doc='Stores the start date of the last successful schedule that has '
+            'scheduled all the active projects. The incremental schedules '
+            'are exporting the projects that are changed after this date'
     )
     last_scheduled_by_id = Column(
         Integer,
@@ -154,6 +176,13 @@ class Studio(Entity, DateRangeMixin, WorkingHoursMixin):
         doc='Holds the last schedule message, generally coming generated by '
         'TaskJuggler'
     )
+    last_schedule_metrics = Column(
+        PickleType,
+        doc='Holds the metrics of the last schedule, which is a dictionary '
+            'with the durations of the scheduling phases, the number of '
+            'exported and updated rows, the tjp file size and the peak '
+            'memory usage. See :attr:`.SchedulerBase.metrics`'
+    )
 
     def __init__(self,
                  daily_working_hours=None,
@@ -393,24 +422,90 @@ class Studio(Entity, DateRangeMixin, WorkingHoursMixin):
         """
         return Vacation.query.filter(Vacation.user==None).all()
 
-    def schedule(self, scheduled_by=None):
+    def schedule(self, scheduled_by=None, lock_policy=None,
+                 lock_timeout=None):
         """Schedules all the active projects in the studio. Needs a Scheduler,
         so before calling it set a scheduler by using the :attr:`.scheduler`
         attribute.
 
+        If the scheduler is doing a dry run (like
+        ``TaskJugglerScheduler(dry_run=True)``) the schedule info of the
+        Studio is not changed and the result of the dry run is returned.
+
+        The :attr:`.last_scheduled_at` is only updated after a successful
+        schedule that has scheduled all the active projects (see
+        :attr:`.SchedulerBase.is_partial`), so the next incremental schedule
+        still exports the changes that are not scheduled by a failed or
+        partial schedule.
+
+        The schedule is guarded with a PostgreSQL advisory lock which is
+        released when the current transaction is committed or rolled back, so
+        only one schedule can run at a time even if it is started from
+        different app servers. If the lock is held by another schedule, the
+        "wait" policy waits the other schedule to be committed and returns its
+        result instead of scheduling again (if a schedule, partial or not, is
+        recorded in the schedule history while waiting), and the "skip" policy
+        returns None without scheduling.
+
         :param scheduled_by: A User instance who is doing the scheduling.
+        :param str lock_policy: Either "wait" or "skip". The default is
+          ``defaults.schedule_lock_policy``.
+        :param lock_timeout: The maximum time to wait the lock in seconds with
+          the "wait" policy, a :class:`.SchedulingLockError` is raised if the
+          lock can not be acquired in time. The default is
+          ``defaults.schedule_lock_timeout``, None waits forever.
         """
         # check the scheduler first
-        if self.scheduler is None or \
-                not isinstance(self.scheduler, SchedulerBase):
-            raise RuntimeError(
-                'There is no scheduler for this %(class)s, please assign a '
-                'scheduler to the %(class)s.scheduler attribute, before '
-                'calling %(class)s.schedule()' %
-                {
-                    'class': self.__class__.__name__
-                }
+        self._check_scheduler('schedule')
+
+        if getattr(self.scheduler, 'dry_run', False):
+            self.scheduler.studio = self
+            return self.scheduler.schedule()
+
+        if lock_policy is None:
+            lock_policy = defaults.schedule_lock_policy
+
+        if lock_policy not in ['wait', 'skip']:
+            raise ValueError(
+                '%s.schedule() lock_policy should be one of "wait" or "skip", '
+                'not %s' % (self.__class__.__name__, lock_policy)
+            )
+
+        if lock_timeout is None:
+            lock_timeout = defaults.schedule_lock_timeout
+
+        if self.id is not None:
+            # every committed schedule (including the partial ones which are
+            # not updating the last_scheduled_at) is recorded in the schedule
+            # history, so the last run shows if another schedule is committed
+            from sqlalchemy import text
+            last_run_query = text(
+                'select max(id) from "Schedule_Runs" where studio_id = :id'
             )
+            last_run_id = db.DBSession.connection().execute(
+                last_run_query, id=self.id
+            ).scalar()
+            waited = self._acquire_schedule_lock(lock_policy, lock_timeout)
+            if waited is None:
+                logger.debug('the studio is being scheduled, skipping')
+                return None
+
+            if waited:
+                # another schedule may have been committed while waiting, read
+                # it without refreshing this instance, so the pending changes
+                # of the Studio are kept
+                other_run_id = db.DBSession.connection().execute(
+                    last_run_query, id=self.id
+                ).scalar()
+                if other_run_id != last_run_id:
+                    other_schedule_message = \
+                        db.DBSession.connection().execute(
+                            text('select last_schedule_message '
+                                 'from "Studios" where id = :id'),
+                            id=self.id
+                        ).scalar()
+                    logger.debug('using the result of the other schedule')
+                    return other_schedule_message
 
         import pytz
         with db.DBSession.no_autoflush:
@@ -424,6 +519,7 @@ class Studio(Entity, DateRangeMixin, WorkingHoursMixin):
         #DBSession.commit()
 
         result = None
+        self.scheduler.scheduled_at = None
         try:
             result = self.scheduler.schedule()
         finally:
@@ -435,9 +531,7 @@ class Studio(Entity, DateRangeMixin, WorkingHoursMixin):
                 # also store the result
                 # if result:
                 self.last_schedule_message = result
-
-                # And the date the schedule is completed
-                self.last_scheduled_at = datetime.datetime.now(pytz.utc)
+                self.last_schedule_metrics = dict(self.scheduler.metrics)
 
                 # and who has done the scheduling
                 if scheduled_by:
@@ -446,10 +540,236 @@ class Studio(Entity, DateRangeMixin, WorkingHoursMixin):
                     )
                     self.last_scheduled_by = scheduled_by
 
+        # record the schedules that has nothing written back (like an
+        # incremental schedule without any change) in the history too
+        if self.scheduler.scheduled_at is None and self.id is not None:
+            self.scheduler._create_schedule_run(db.DBSession.connection())
+
+        # And the date the schedule is started, the changes after it are not
+        # in the exported data, so the incremental schedules are using it to
+        # find the changed projects. The changes that are not scheduled by a
+        # partial schedule should still be found by the next incremental
+        # schedule, so it is only updated after a full schedule.
+        if not self.scheduler.is_partial:
+            with db.DBSession.no_autoflush:
+                self.last_scheduled_at = self.scheduling_started_at
+
         end = time.time()
         logger.debug('scheduling took %s seconds' % (end - start))
         return result
 
+    def _acquire_schedule_lock(self, lock_policy, lock_timeout):
+        """acquires the transaction level advisory lock of this studio,
+        returns False if the lock is acquired immediately, True if it is
+        acquired after waiting another schedule and None if it is skipped
+
+        :param str lock_policy: Either "wait" or "skip".
+        :param lock_timeout: The maximum time to wait in seconds, None waits
+          forever.
+        """
+        from sqlalchemy import text
+
+        connection = db.DBSession.connection()
+        lock_query = text('select pg_try_advisory_xact_lock(:key, :id)')
+        params = {'key': defaults.schedule_lock_key, 'id': self.id}
+
+        if connection.execute(lock_query, **params).scalar():
+            return False
+
+        if lock_policy == 'skip':
+            return None
+
+        # wait the lock in the server, the lock_timeout is set in a savepoint
+        # so the transaction is still usable when the timeout is reached
+        from sqlalchemy.exc import OperationalError
+        connection.execute('savepoint schedule_lock')
+        try:
+            if lock_timeout is not None:
+                previous_lock_timeout = connection.execute(
+                    "select current_setting('lock_timeout')"
+                ).scalar()
+                connection.execute(
+                    text("select set_config('lock_timeout', :value, true)"),
+                    value='%sms' % max(1, int(lock_timeout * 1000))
+                )
+            connection.execute(
+                text('select pg_advisory_xact_lock(:key, :id)'), **params
+            )
+        except OperationalError as e:
+            connection.execute('rollback to savepoint schedule_lock')
+            if getattr(e.orig, 'pgcode', None) != '55P03':
+                raise
+            from stalker.exceptions import SchedulingLockError
+            raise SchedulingLockError(
+                'Could not acquire the scheduling lock of %s in %s seconds' %
+                (self.name, lock_timeout)
+            )
+
+        # the lock is kept until the end of the transaction
+        if lock_timeout is not None:
+            connection.execute(
+                text("select set_config('lock_timeout', :value, true)"),
+                value=previous_lock_timeout
+            )
+        connection.execute('release savepoint schedule_lock')
+        return True
+
+    def schedule_async(self, scheduled_by=None, callback=None):
+        """Schedules all the active projects in the studio in a background
+        thread and returns a :class:`.SchedulingJob` instance to follow,
+        wait or cancel the schedule. The Studio should be stored in the
+        database before calling this method, the schedule is done and
+        committed in a separate database session. See
+        :class:`.SchedulingJob` for details.
+
+        :param scheduled_by: A User instance who is doing the scheduling.
+        :param callback: A callable that accepts two arguments, the phase and
+          a message, which is called with the progress of the schedule.
+        """
+        self._check_scheduler('schedule_async')
+
+        if self.id is None:
+            raise RuntimeError(
+                'The %(class)s should be stored in the database before '
+                'calling %(class)s.schedule_async()' %
+                {
+                    'class': self.__class__.__name__
+                }
+            )
+
+        job = SchedulingJob(self, scheduled_by=scheduled_by, callback=callback)
+        job.start()
+        return job
+
+    def get_task_slips(self, task, runs=10):
+        """returns the shifts of the computed_start and computed_end values of
+        the given task in the last recorded schedules of this studio as a list
+        of ``(scheduled_at, start_shift, end_shift)`` tuples, from the oldest
+        to the newest schedule. The shifts are datetime.timedelta instances
+        and they are zero for the schedules that has not moved the task, so
+        the total slip is the sum of them.
+
+        :param task: A :class:`.Task` instance.
+        :param int runs: The number of the last schedules. The default is 10.
+        """
+        from sqlalchemy import text
+        from stalker.models.task import Task
+
+        if not isinstance(task, Task):
+            raise TypeError(
+                '%s.get_task_slips() task should be an instance of '
+                'stalker.models.task.Task, not %s' %
+                (self.__class__.__name__, task.__class__.__name__)
+            )
+
+        if not isinstance(runs, int) or runs < 1:
+            raise ValueError(
+                '%s.get_task_slips() runs should be a positive integer, not '
+                '%s' % (self.__class__.__name__, runs)
+            )
+
+        result = db.DBSession.connection().execute(
+            text(
+                'select runs.scheduled_at, '
+                '    coalesce(deltas.start_shift, 0), '
+                '    coalesce(deltas.end_shift, 0) '
+                'from ('
+                '    select id, scheduled_at from "Schedule_Runs" '
+                '    where studio_id = :studio_id '
+                '    order by id desc limit :runs'
+                ') as runs '
+                'left outer join "Schedule_Deltas" as deltas '
+                '    on deltas.run_id = runs.id and deltas.task_id = :task_id '
+                'order by runs.id'
+            ),
+            runs=runs,
+            studio_id=self.id,
+            task_id=task.id
+        )
+        return [
+            (r[0],
+             datetime.timedelta(seconds=r[1]),
+             datetime.timedelta(seconds=r[2]))
+            for r in result
+        ]
+
+    def get_moved_tasks(self, days, scheduled_at=None):
+        """returns the tasks that are moved more than the given number of days
+        in a schedule as a list of ``(task, start_shift, end_shift)`` tuples,
+        ordered by the shift of their end dates, where the shifts are
+        datetime.timedelta instances.
+
+        :param days: The number of days. A task is moved more than that if
+          the shift of its computed_start or computed_end value is bigger than
+          the given days in either direction.
+        :param scheduled_at: A datetime.datetime instance showing the date of
+          a recorded schedule of this studio. The default is the last recorded
+          schedule.
+        """
+        from sqlalchemy import text
+        from stalker.models.task import Task
+
+        if not isinstance(days, (int, float)):
+            raise TypeError(
+                '%s.get_moved_tasks() days should be an int or float, not %s'
+                % (self.__class__.__name__, days.__class__.__name__)
+            )
+
+        if scheduled_at is None:
+            run_condition = 'runs.id = (' \
+                'select max(id) from "Schedule_Runs" ' \
+                'where studio_id = :studio_id)'
+        else:
+            run_condition = 'runs.studio_id = :studio_id ' \
+                'and runs.scheduled_at = :scheduled_at'
+
+        result = db.DBSession.connection().execute(
+            text(
+                'select deltas.task_id, deltas.start_shift, deltas.end_shift '
+                'from "Schedule_Deltas" as deltas '
+                'join "Schedule_Runs" as runs on deltas.run_id = runs.id '
+                'where %s '
+                'and (abs(deltas.start_shift) > :seconds '
+                '     or abs(deltas.end_shift) > :seconds) '
+                'order by abs(deltas.end_shift) desc, deltas.task_id'
+                % run_condition
+            ),
+            studio_id=self.id,
+            scheduled_at=scheduled_at,
+            seconds=days * 86400
+        ).fetchall()
+
+        if not result:
+            return []
+
+        tasks = dict(
+            (task.id, task)
+            for task in Task.query.filter(Task.id.in_([r[0] for r in result]))
+        )
+        return [
+            (tasks[r[0]],
+             datetime.timedelta(seconds=r[1]),
+             datetime.timedelta(seconds=r[2]))
+            for r in result
+        ]
+
+    def _check_scheduler(self, method_name):
+        """raises a RuntimeError if there is no scheduler
+
+        :param str method_name: The name of the calling method.
+        """
+        if self.scheduler is None or \
+                not isinstance(self.scheduler, SchedulerBase):
+            raise RuntimeError(
+                'There is no scheduler for this %(class)s, please assign a '
+                'scheduler to the %(class)s.scheduler attribute, before '
+                'calling %(class)s.%(method)s()' %
+                {
+                    'class': self.__class__.__name__,
+                    'method': method_name
+                }
+            )
+
     @property
     def weekly_working_hours(self):
         """returns the WorkingHours.weekly_working_hours
@@ -524,6 +844,29 @@ class Studio(Entity, DateRangeMixin, WorkingHoursMixin):
         return timing_resolution
 
 
+# SCHEDULE HISTORY
+Schedule_Runs = Table(
+    "Schedule_Runs", Base.metadata,
+    Column("id", Integer, primary_key=True),
+    Column("studio_id", Integer,
+           ForeignKey("Studios.id", ondelete="CASCADE"), index=True),
+    Column("scheduled_at", DateTime(timezone=True), nullable=False,
+           index=True)
+)
+
+Schedule_Deltas = Table(
+    "Schedule_Deltas", Base.metadata,
+    Column("run_id", Integer,
+           ForeignKey("Schedule_Runs.id", ondelete="CASCADE"),
+           primary_key=True),
+    Column("task_id", Integer,
+           ForeignKey("Tasks.id", ondelete="CASCADE"),
+           primary_key=True, index=True),
+    Column("start_shift", Integer, nullable=False),
+    Column("end_shift", Integer, nullable=False)
+)
+
+
 class WorkingHours(object):
     """A helper class to manage Studio working hours.
 
@@ -16,15 +16,19 @@
 # You should have received a copy of the Lesser GNU General Public License
 # along with Stalker.  If not, see <http://www.gnu.org/licenses/>
 
+import contextlib
 import datetime
 import logging
 import os
+import threading
 
 from sqlalchemy import (Table, Column, Integer, ForeignKey, Boolean, Enum,
-                        DateTime, Float, event, CheckConstraint)
+                        DateTime, Float, event, CheckConstraint, Index)
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy.ext.associationproxy import association_proxy
-from sqlalchemy.orm import relationship, validates, synonym, reconstructor
+from sqlalchemy.orm import (relationship, validates, synonym, reconstructor,
+                            Session, query_expression)
 
 from stalker import defaults
 from stalker.db.session import DBSession
@@ -156,15 +160,15 @@ class TimeLog(Entity, DateRangeMixin):
         # check status
         logger.debug('checking task status!')
         with DBSession.no_autoflush:
-            WFD = Status.query.filter_by(code='WFD').first()
-            RTS = Status.query.filter_by(code='RTS').first()
-            WIP = Status.query.filter_by(code='WIP').first()
-            PREV = Status.query.filter_by(code='PREV').first()
-            HREV = Status.query.filter_by(code='HREV').first()
-            DREV = Status.query.filter_by(code='DREV').first()
-            OH = Status.query.filter_by(code='OH').first()
-            STOP = Status.query.filter_by(code='STOP').first()
-            CMPL = Status.query.filter_by(code='CMPL').first()
+            WFD = Status.get_by_code('WFD')
+            RTS = Status.get_by_code('RTS')
+            WIP = Status.get_by_code('WIP')
+            PREV = Status.get_by_code('PREV')
+            HREV = Status.get_by_code('HREV')
+            DREV = Status.get_by_code('DREV')
+            OH = Status.get_by_code('OH')
+            STOP = Status.get_by_code('STOP')
+            CMPL = Status.get_by_code('CMPL')
 
             if task.status in [WFD, OH, STOP, CMPL]:
                 raise StatusError(
@@ -863,6 +867,9 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
     __auto_name__ = False
     __tablename__ = "Tasks"
     __mapper_args__ = {'polymorphic_identity': "Task"}
+    __table_args__ = (
+        Index('ix_Tasks_ancestor_ids', 'ancestor_ids', postgresql_using='gin'),
+    )
     task_id = Column(
         "id", Integer, ForeignKey('Entities.id'), primary_key=True,
         doc="""The ``primary_key`` attribute for the ``Tasks`` table used by
@@ -894,6 +901,35 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
         """
     )
 
+    ancestor_ids = Column(
+        ARRAY(Integer),
+        nullable=False,
+        server_default='{}',
+        doc="""The materialized path of this Task, the ids of the parents of
+        this Task starting from the root. It is updated when the Task is
+        reparented and is finalized in the flush as the parent ids are not
+        known before that. Use it to query the ancestors or the descendants
+        of a Task without walking the hierarchy::
+
+          from sqlalchemy import any_
+          ancestors = Task.query.filter(Task.id == any_(task.ancestor_ids))
+          descendants = Task.query.filter(
+              Task.ancestor_ids.contains([task.id])
+          )
+        """
+    )
+
+    depth = Column(
+        Integer,
+        nullable=False,
+        server_default='0',
+        doc="""The number of parents of this Task, it is 0 for root tasks.
+        """
+    )
+
+    # True until the materialized path of a reparented Task is finalized
+    _hierarchy_changed = False
+
     is_milestone = Column(
         Boolean,
         doc="""Specifies if this Task is a milestone.
@@ -1057,6 +1093,9 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
         doc='cache column for total_logged_seconds'
     )
 
+    # the sum of the time logs of a leaf task loaded by load_subtree()
+    _time_log_seconds = query_expression()
+
     reviews = relationship(
         "Review",
         primaryjoin="Reviews.c.task_id==Tasks.c.id",
@@ -1140,7 +1179,7 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
 
         # update the status
         with DBSession.no_autoflush:
-            wfd = Status.query.filter_by(code='WFD').first()
+            wfd = Status.get_by_code('WFD')
         self.status = wfd
 
         if depends is None:
@@ -1218,11 +1257,14 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
                 )
             )
 
+        _forget_time_log_seconds(self)
+
         # TODO: convert this to an event
         # update parents total_logged_second attribute
         with DBSession.no_autoflush:
-            if self.parent:
-                self.parent.total_logged_seconds += time_log.total_seconds
+            _update_parent_rollups(
+                self, total_logged_seconds=time_log.total_seconds
+            )
 
         return time_log
 
@@ -1254,15 +1296,15 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
 
         # check the status of the current task
         with DBSession.no_autoflush:
-            wfd = Status.query.filter_by(code='WFD').first()
-            rts = Status.query.filter_by(code='RTS').first()
-            wip = Status.query.filter_by(code='WIP').first()
-            prev = Status.query.filter_by(code='PREV').first()
-            hrev = Status.query.filter_by(code='HREV').first()
-            drev = Status.query.filter_by(code='DREV').first()
-            oh = Status.query.filter_by(code='OH').first()
-            stop = Status.query.filter_by(code='STOP').first()
-            cmpl = Status.query.filter_by(code='CMPL').first()
+            wfd = Status.get_by_code('WFD')
+            rts = Status.get_by_code('RTS')
+            wip = Status.get_by_code('WIP')
+            prev = Status.get_by_code('PREV')
+            hrev = Status.get_by_code('HREV')
+            drev = Status.get_by_code('DREV')
+            oh = Status.get_by_code('OH')
+            stop = Status.get_by_code('STOP')
+            cmpl = Status.get_by_code('CMPL')
 
             if self.status in [wip, prev, hrev, drev, oh, stop, cmpl]:
                 raise StatusError(
@@ -1442,8 +1484,55 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
                 new_parent.schedule_seconds += self.schedule_seconds
                 new_parent.total_logged_seconds += self.total_logged_seconds
 
+        # update the materialized path, it is finalized in the flush for
+        # this task and its descendants
+        if new_parent is None:
+            self.ancestor_ids = []
+            self.depth = 0
+        elif new_parent._has_materialized_path:
+            self.ancestor_ids = list(new_parent.ancestor_ids) + [new_parent.id]
+            self.depth = new_parent.depth + 1
+        self._hierarchy_changed = True
+
         return parent
 
+    @property
+    def _has_materialized_path(self):
+        """returns True if the ancestor_ids and depth values of this task are
+        in sync with its parents
+        """
+        from sqlalchemy import inspect
+        if self._hierarchy_changed \
+           or self.ancestor_ids is None \
+           or not inspect(self).has_identity:
+            return False
+
+        # a reparented ancestor which is not flushed yet makes the path stale,
+        # the ancestors that are not in the session are not changed
+        return not any(
+            ancestor._hierarchy_changed
+            for ancestor in self._get_loaded_ancestors()
+            if ancestor is not None
+        )
+
+    def _get_loaded_ancestors(self):
+        """returns the ancestors of this task in the order of the
+        ancestor_ids from the identity map of its session without querying
+        the database, the ancestors that are not loaded yet are None
+        """
+        from sqlalchemy.orm import object_session
+        from sqlalchemy.orm.util import identity_key
+
+        session = object_session(self)
+        if session is None:
+            return [None] * len(self.ancestor_ids)
+
+        identity_map = session.identity_map
+        return [
+            identity_map.get(identity_key(Task, ancestor_id))
+            for ancestor_id in self.ancestor_ids
+        ]
+
     @validates('_project')
     def _validates_project(self, key, project):
         """validates the given project instance
@@ -1830,6 +1919,13 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
     def tjp_abs_id(self):
         """returns the calculated absolute id of this task
         """
+        if self._has_materialized_path:
+            return '.'.join(
+                [self.project.tjp_id] +
+                [parent.tjp_id for parent in self.parents] +
+                [self.tjp_id]
+            )
+
         if self.parent:
             abs_id = self.parent.tjp_abs_id
         else:
@@ -1852,6 +1948,9 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
         be useless when Stalker has its own implementation of a proper Gantt
         Chart. Write now it is used by the jQueryGantt.
         """
+        if self._has_materialized_path:
+            return self.depth + 1
+
         i = 0
         current = self
         while current:
@@ -1859,6 +1958,132 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
             current = current.parent
         return i
 
+    @property
+    def parents(self):
+        """Returns all of the parents of this Task starting from the root.
+
+        The parents that are not loaded yet are retrieved with one query by
+        using the materialized path of this Task.
+        """
+        if not self._has_materialized_path:
+            return super(Task, self).parents
+
+        parents = self._get_loaded_ancestors()
+        missing_ids = [
+            ancestor_id
+            for ancestor_id, parent in zip(self.ancestor_ids, parents)
+            if parent is None
+        ]
+        if missing_ids:
+            from sqlalchemy import any_
+            with DBSession.no_autoflush:
+                loaded_parents = dict(
+                    (parent.id, parent)
+                    for parent in Task.query
+                    .filter(Task.id == any_(missing_ids))
+                )
+            parents = [
+                parent if parent is not None
+                else loaded_parents.get(ancestor_id)
+                for ancestor_id, parent in zip(self.ancestor_ids, parents)
+            ]
+
+        return [parent for parent in parents if parent is not None]
+
+    @classmethod
+    def load_subtree(cls, root, eager=None):
+        """Loads all the descendants of the given task with a single query and
+        fills the :attr:`.children` and :attr:`.parent` attributes of the
+        loaded tasks, so walking over the hierarchy of the given task (with
+        :meth:`.walk_hierarchy` for example) doesn't query the database again.
+
+        Returns the descendants of the given task, the parents are always
+        placed before their children.
+
+        The descendants are queried from the database, so the pending changes
+        of the other tasks are flushed by the autoflush of the query as in
+        any other query. A new root task, which doesn't have an id yet, is
+        added to the session and flushed first.
+
+        :param root: A :class:`.Task` instance.
+        :param eager: A list of relationship names of :class:`.Task`, like
+          ``['resources', 'status', 'time_logs']``, to be loaded along with
+          the descendants. Add ``'total_logged_seconds'`` to the list to load
+          the sum of the time logs of the leaf tasks in the same query without
+          loading the time logs themselves, which is then used by the
+          :attr:`.total_logged_seconds` of the leaf tasks until they are
+          expired or their time logs are changed. The default is None.
+        """
+        from sqlalchemy import cast, func, inspect, select
+        from sqlalchemy.orm import selectinload, with_expression
+        from sqlalchemy.orm.attributes import set_committed_value
+
+        if not isinstance(root, Task):
+            raise TypeError(
+                '%s.load_subtree() root should be an instance of '
+                'stalker.models.task.Task, not %s' %
+                (cls.__name__, root.__class__.__name__)
+            )
+
+        if eager is None:
+            eager = []
+
+        if not inspect(root).has_identity:
+            # the id of the root and the materialized paths of its children
+            # are set in the flush
+            DBSession.add(root)
+            DBSession.flush()
+
+        options = [
+            selectinload(getattr(Task, attr))
+            for attr in eager if attr != 'total_logged_seconds'
+        ]
+        if 'total_logged_seconds' in eager:
+            time_log_seconds = select([
+                cast(
+                    func.coalesce(
+                        func.sum(
+                            func.floor(
+                                func.extract(
+                                    'epoch', TimeLog._end - TimeLog._start
+                                )
+                            )
+                        ),
+                        0
+                    ),
+                    Integer
+                )
+            ]).where(TimeLog.task_id == Task.task_id).as_scalar()
+            options.append(
+                with_expression(Task._time_log_seconds, time_log_seconds)
+            )
+
+        descendants = Task.query\
+            .filter(Task.ancestor_ids.contains([root.id]))\
+            .options(*options)\
+            .order_by(Task.depth, Task.id)\
+            .all()
+
+        tasks_by_id = {root.id: root}
+        children = {root.id: []}
+        for task in descendants:
+            tasks_by_id[task.id] = task
+            children[task.id] = []
+            children[task.parent_id].append(task)
+
+        # do not override the relations that are already loaded, they may have
+        # changes that are not flushed yet
+        for task_id, task_children in children.items():
+            task = tasks_by_id[task_id]
+            if 'children' not in task.__dict__:
+                set_committed_value(task, 'children', task_children)
+
+        for task in descendants:
+            if 'parent' not in task.__dict__:
+                set_committed_value(task, 'parent', tasks_by_id[task.parent_id])
+
+        return descendants
+
     @property
     def is_scheduled(self):
         """A predicate which returns True if this task has both a
@@ -1876,6 +2101,13 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
         seconds = 0
         with DBSession.no_autoflush:
             if self.is_leaf:
+                # use the sum loaded by load_subtree() if the time logs are
+                # not loaded
+                time_log_seconds = self.__dict__.get('_time_log_seconds')
+                if time_log_seconds is not None \
+                   and 'time_logs' not in self.__dict__:
+                    return time_log_seconds
+
                 for time_log in self.time_logs:
                     seconds += time_log.total_seconds
             else:
@@ -1975,6 +2207,113 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
             self._schedule_seconds = self.schedule_seconds
             self._total_logged_seconds = self.total_logged_seconds
 
+    @classmethod
+    def recompute_rollups(cls, project):
+        """recomputes the cached schedule_seconds and total_logged_seconds
+        values of all the tasks of the given project with a single query
+        instead of walking the hierarchy of every container task.
+
+        The values of the leaf tasks are calculated from their schedule values
+        and time logs and a container task gets the sum of its leaf
+        descendants, which are found by using the materialized paths of the
+        tasks. The pending changes in the session are flushed first.
+
+        :param project: A :class:`.Project` instance.
+        """
+        from sqlalchemy import text
+        from sqlalchemy.orm.attributes import set_committed_value
+        from sqlalchemy.orm.util import identity_key
+        from stalker.models.project import Project
+
+        if not isinstance(project, Project):
+            raise TypeError(
+                '%s.recompute_rollups() project should be an instance of '
+                'stalker.models.project.Project, not %s' %
+                (cls.__name__, project.__class__.__name__)
+            )
+
+        DBSession.flush()
+
+        # the working time and calendar time equivalents of the units
+        units = ', '.join(
+            "('%s', %s, %s)" % (
+                unit,
+                cls.to_seconds(1, unit, 'duration'),
+                cls.to_seconds(1, unit, 'effort')
+            )
+            for unit in defaults.datetime_units
+        )
+
+        sql_query = """with leaf_tasks as (
+    select
+        "Tasks".id,
+        "Tasks".ancestor_ids,
+        coalesce(
+            "Tasks".schedule_timing * case
+                when "Tasks".schedule_model in ('effort', 'length')
+                then units.working_seconds
+                else units.calendar_seconds
+            end,
+            0
+        ) as schedule_seconds,
+        coalesce(time_logs.seconds, 0) as total_logged_seconds
+    from "Tasks"
+    left outer join (values %(units)s) as units(
+        unit, calendar_seconds, working_seconds
+    ) on cast("Tasks".schedule_unit as text) = units.unit
+    left outer join (
+        select
+            "TimeLogs".task_id,
+            sum(
+                floor(extract(epoch from "TimeLogs"."end" - "TimeLogs".start))
+            ) as seconds
+        from "TimeLogs"
+        join "Tasks" on "TimeLogs".task_id = "Tasks".id
+        where "Tasks".project_id = :project_id
+        group by "TimeLogs".task_id
+    ) as time_logs on "Tasks".id = time_logs.task_id
+    where "Tasks".project_id = :project_id
+        and not exists (
+            select 1
+            from "Tasks" as "Child_Tasks"
+            where "Child_Tasks".parent_id = "Tasks".id
+        )
+), rollups as (
+    select
+        id,
+        schedule_seconds,
+        total_logged_seconds
+    from leaf_tasks
+union all
+    select
+        ancestor.id,
+        sum(leaf_tasks.schedule_seconds),
+        sum(leaf_tasks.total_logged_seconds)
+    from leaf_tasks, unnest(leaf_tasks.ancestor_ids) as ancestor(id)
+    group by ancestor.id
+)
+update "Tasks"
+set schedule_seconds = rollups.schedule_seconds,
+    total_logged_seconds = rollups.total_logged_seconds
+from rollups
+where "Tasks".id = rollups.id
+returning "Tasks".id, "Tasks".schedule_seconds, "Tasks".total_logged_seconds
+""" % {'units': units}
+
+        result = DBSession.connection().execute(
+            text(sql_query), project_id=project.id
+        )
+
+        # update the tasks in the session without marking them dirty
+        identity_map = DBSession.identity_map
+        for task_id, schedule_seconds, total_logged_seconds in result:
+            task = identity_map.get(identity_key(Task, task_id))
+            if task is not None:
+                set_committed_value(task, '_schedule_seconds', schedule_seconds)
+                set_committed_value(
+                    task, '_total_logged_seconds', total_logged_seconds
+                )
+
     @property
     def percent_complete(self):
         """returns the percent_complete based on the total_logged_seconds and
@@ -2022,6 +2361,121 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
         # for effort based tasks use the time_logs
         return self.schedule_seconds - self.total_logged_seconds
 
+    @classmethod
+    def get_progress(cls, task_ids):
+        """returns the percent_complete, remaining_seconds, schedule_seconds
+        and total_logged_seconds values of the tasks with the given ids with a
+        single query, instead of calculating them task by task.
+
+        The returned value is a dictionary of task ids to dictionaries with
+        ``percent_complete``, ``remaining_seconds``, ``schedule_seconds`` and
+        ``total_logged_seconds`` keys. The values are the same with the
+        attributes of the tasks, except the ``percent_complete`` and
+        ``remaining_seconds`` values are None for the tasks that don't have a
+        schedule_seconds value. The percent_complete values of the duration
+        tasks are calculated against the same current time. The pending
+        changes in the session are flushed first.
+
+        :param task_ids: A list of :class:`.Task` ids.
+        """
+        import pytz
+        from sqlalchemy import text
+
+        if not task_ids:
+            return {}
+
+        task_ids = list(task_ids)
+
+        sql_query = """select
+    "Tasks".id,
+    "Tasks".project_id,
+    exists (
+        select 1
+        from "Tasks" as "Child_Tasks"
+        where "Child_Tasks".parent_id = "Tasks".id
+    ) as is_container,
+    "Tasks".schedule_model,
+    "Tasks".schedule_timing,
+    "Tasks".schedule_unit,
+    "Tasks".start,
+    "Tasks"."end",
+    "Tasks".schedule_seconds,
+    "Tasks".total_logged_seconds,
+    cast(coalesce(time_logs.seconds, 0) as bigint) as time_log_seconds
+from "Tasks"
+left outer join (
+    select
+        task_id,
+        sum(floor(extract(epoch from "end" - start))) as seconds
+    from "TimeLogs"
+    where task_id = any(:ids)
+    group by task_id
+) as time_logs on "Tasks".id = time_logs.task_id
+where "Tasks".id = any(:ids)"""
+
+        DBSession.flush()
+        rows = DBSession.connection().execute(
+            text(sql_query), ids=task_ids
+        ).fetchall()
+
+        # fill the missing cached values of the container tasks
+        project_ids = set(
+            r[1] for r in rows
+            if r[2] and (r[8] is None or r[8] < 0 or r[9] is None)
+        )
+        if project_ids:
+            from stalker.models.project import Project
+            for project in Project.query\
+                    .filter(Project.id.in_(project_ids)).all():
+                cls.recompute_rollups(project)
+            rows = DBSession.connection().execute(
+                text(sql_query), ids=task_ids
+            ).fetchall()
+
+        now = datetime.datetime.now(pytz.utc)
+        progress = {}
+        for task_id, project_id, is_container, schedule_model, \
+                schedule_timing, schedule_unit, start, end, \
+                cached_schedule_seconds, cached_total_logged_seconds, \
+                time_log_seconds in rows:
+            if is_container:
+                schedule_seconds = cached_schedule_seconds
+                total_logged_seconds = cached_total_logged_seconds
+            else:
+                schedule_seconds = cls.to_seconds(
+                    schedule_timing, schedule_unit, schedule_model
+                )
+                total_logged_seconds = time_log_seconds
+
+            percent_complete = None
+            remaining_seconds = None
+            if not is_container and schedule_model == 'duration':
+                if end <= now:
+                    percent_complete = 100.0
+                elif start >= now:
+                    percent_complete = 0.0
+                else:
+                    past = now - start
+                    total = end - start
+                    percent_complete = \
+                        (past.days * 86400.0 + past.seconds) / \
+                        float(total.days * 86400.0 + total.seconds) * 100.0
+            elif schedule_seconds:
+                percent_complete = \
+                    total_logged_seconds / float(schedule_seconds) * 100.0
+
+            if schedule_seconds is not None:
+                remaining_seconds = schedule_seconds - total_logged_seconds
+
+            progress[task_id] = {
+                'percent_complete': percent_complete,
+                'remaining_seconds': remaining_seconds,
+                'schedule_seconds': schedule_seconds,
+                'total_logged_seconds': total_logged_seconds,
+            }
+
+        return progress
+
     def _responsible_getter(self):
         """returns the current responsible of this task
         """
@@ -2030,8 +2484,8 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
         else:
             # traverse parents
             for parent in reversed(self.parents):
-                if parent.responsible:
-                    return parent.responsible
+                if parent._responsible:
+                    return parent._responsible
 
         # so parents do not have a responsible
         return []
@@ -2133,8 +2587,8 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
         """
         # check task status
         with DBSession.no_autoflush:
-            wip = Status.query.filter_by(code='WIP').first()
-            prev = Status.query.filter_by(code='PREV').first()
+            wip = Status.get_by_code('WIP')
+            prev = Status.get_by_code('PREV')
 
         if self.status != wip:
             raise StatusError(
@@ -2187,8 +2641,8 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
         """
         # check status
         with DBSession.no_autoflush:
-            prev = Status.query.filter_by(code='PREV').first()
-            cmpl = Status.query.filter_by(code='CMPL').first()
+            prev = Status.get_by_code('PREV')
+            cmpl = Status.get_by_code('CMPL')
 
         if self.status not in [prev, cmpl]:
             raise StatusError(
@@ -2240,9 +2694,9 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
         """
         # check if status is WIP
         with DBSession.no_autoflush:
-            wip = Status.query.filter_by(code='WIP').first()
-            drev = Status.query.filter_by(code='DREV').first()
-            oh = Status.query.filter_by(code='OH').first()
+            wip = Status.get_by_code('WIP')
+            drev = Status.get_by_code('DREV')
+            oh = Status.get_by_code('OH')
 
         if self.status not in [wip, drev, oh]:
             raise StatusError(
@@ -2282,9 +2736,9 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
 
         # check the status
         with DBSession.no_autoflush:
-            wip = Status.query.filter_by(code='WIP').first()
-            drev = Status.query.filter_by(code='DREV').first()
-            stop = Status.query.filter_by(code='STOP').first()
+            wip = Status.get_by_code('WIP')
+            drev = Status.get_by_code('DREV')
+            stop = Status.get_by_code('STOP')
 
         if self.status not in [wip, drev, stop]:
             raise StatusError(
@@ -2318,9 +2772,9 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
         """
         # check status
         with DBSession.no_autoflush:
-            wip = Status.query.filter_by(code='WIP').first()
-            oh = Status.query.filter_by(code='OH').first()
-            stop = Status.query.filter_by(code='STOP').first()
+            wip = Status.get_by_code('WIP')
+            oh = Status.get_by_code('OH')
+            stop = Status.get_by_code('STOP')
 
         if self.status not in [oh, stop]:
             raise StatusError(
@@ -2380,26 +2834,29 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
 
         return review_set
 
-    def update_status_with_dependent_statuses(self, removing=None):
+    def update_status_with_dependent_statuses(self, removing=None,
+                                              update_parents=True):
         """updates the status by looking at the dependent tasks
 
         :param removing: The item that is been removing right now, used for the
           remove event to overcome the update issue.
+        :param bool update_parents: If False the statuses of the parents are
+          not updated. The default is True.
         """
         if self.is_container:
             # do nothing, its status will be decided by its children
             return
 
         with DBSession.no_autoflush:
-            wfd = Status.query.filter_by(code='WFD').first()
-            rts = Status.query.filter_by(code='RTS').first()
-            wip = Status.query.filter_by(code='WIP').first()
-            # prev = Status.query.filter_by(code='PREV').first()
-            hrev = Status.query.filter_by(code='HREV').first()
-            drev = Status.query.filter_by(code='DREV').first()
-            # oh = Status.query.filter_by(code='OH').first()
-            # stop = Status.query.filter_by(code='STOP').first()
-            cmpl = Status.query.filter_by(code='CMPL').first()
+            wfd = Status.get_by_code('WFD')
+            rts = Status.get_by_code('RTS')
+            wip = Status.get_by_code('WIP')
+            # prev = Status.get_by_code('PREV')
+            hrev = Status.get_by_code('HREV')
+            drev = Status.get_by_code('DREV')
+            # oh = Status.get_by_code('OH')
+            # stop = Status.get_by_code('STOP')
+            cmpl = Status.get_by_code('CMPL')
 
         if removing:
             self._previously_removed_dependent_tasks.append(removing)
@@ -2532,7 +2989,8 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
         self.status = status
 
         # also update parent statuses
-        self.update_parent_statuses()
+        if update_parents:
+            self.update_parent_statuses()
 
         # # also update dependent tasks
         # for dep in dep_list:
@@ -2547,8 +3005,11 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
             if self.parent:
                 self.parent.update_status_with_children_statuses()
 
-    def update_status_with_children_statuses(self):
+    def update_status_with_children_statuses(self, update_parents=True):
         """updates the task status according to its children statuses
+
+        :param bool update_parents: If False the statuses of the parents are
+          not updated. The default is True.
         """
         logger.debug(
             'setting statuses with child statuses for: %s' % self.name
@@ -2560,10 +3021,10 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
             return
 
         with DBSession.no_autoflush:
-            wfd = Status.query.filter(Status.code == 'WFD').first()
-            rts = Status.query.filter(Status.code == 'RTS').first()
-            wip = Status.query.filter(Status.code == 'WIP').first()
-            cmpl = Status.query.filter(Status.code == 'CMPL').first()
+            wfd = Status.get_by_code('WFD')
+            rts = Status.get_by_code('RTS')
+            wip = Status.get_by_code('WIP')
+            cmpl = Status.get_by_code('CMPL')
 
         parent_statuses_lut = [wfd, rts, wip, cmpl]
 
@@ -2657,7 +3118,154 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin, D
         #     dep.update_status_with_dependent_statuses()
 
         # go to parents
-        self.update_parent_statuses()
+        if update_parents:
+            self.update_parent_statuses()
+
+    @classmethod
+    def propagate_statuses(cls, tasks):
+        """updates the statuses of the given tasks and all the tasks that are
+        depending to them (directly or indirectly) by looking at their
+        dependencies, and then updates the statuses of the parents of all
+        these tasks.
+
+        The tasks, their dependencies and parents are retrieved with a couple
+        of queries up front, the statuses are calculated in topological order
+        (so a task is updated after all the tasks that it depends on) and the
+        parents are updated from the deepest one to the top, so every task is
+        updated only once. The changes are flushed together with the next
+        flush of the session. Returns the updated tasks (without the parents)
+        in the order that they are updated.
+
+        :param tasks: A list of :class:`.Task` instances whose statuses are
+          changed.
+        """
+        with DBSession.no_autoflush:
+            cls._load_status_propagation_graph(tasks)
+
+            # collect the tasks depending to the given tasks
+            affected_tasks = []
+            visited = set()
+            tasks_to_visit = list(tasks)
+            while tasks_to_visit:
+                task = tasks_to_visit.pop(0)
+                if id(task) in visited:
+                    continue
+                visited.add(id(task))
+                affected_tasks.append(task)
+                tasks_to_visit.extend(task.dependent_of)
+
+            # sort them topologically
+            dependency_counts = dict(
+                (id(task), len([dep for dep in task.depends
+                                if id(dep) in visited]))
+                for task in affected_tasks
+            )
+            sorted_tasks = []
+            ready_tasks = [task for task in affected_tasks
+                           if not dependency_counts[id(task)]]
+            while ready_tasks:
+                task = ready_tasks.pop(0)
+                sorted_tasks.append(task)
+                for dependent_task in task.dependent_of:
+                    dependent_task_id = id(dependent_task)
+                    if dependent_task_id in dependency_counts:
+                        dependency_counts[dependent_task_id] -= 1
+                        if not dependency_counts[dependent_task_id]:
+                            ready_tasks.append(dependent_task)
+
+            # there shouldn't be any circular dependency, but do not skip
+            # any task
+            sorted_task_ids = set(id(task) for task in sorted_tasks)
+            sorted_tasks.extend(
+                task for task in affected_tasks
+                if id(task) not in sorted_task_ids
+            )
+
+            for task in sorted_tasks:
+                task.update_status_with_dependent_statuses(
+                    update_parents=False
+                )
+
+            # update the parents from the deepest one to the top
+            parents = []
+            parent_ids = set()
+            for task in sorted_tasks:
+                parent = task.parent
+                while parent is not None and id(parent) not in parent_ids:
+                    parent_ids.add(id(parent))
+                    parents.append(parent)
+                    parent = parent.parent
+
+            parents.sort(key=lambda x: x.level, reverse=True)
+            for parent in parents:
+                parent.update_status_with_children_statuses(
+                    update_parents=False
+                )
+
+        return sorted_tasks
+
+    @classmethod
+    def _load_status_propagation_graph(cls, tasks):
+        """loads the tasks depending to the given tasks (directly or
+        indirectly) along with their dependencies, children and parents with
+        a couple of queries, so walking over them doesn't query the database
+        task by task
+
+        :param tasks: A list of :class:`.Task` instances.
+        """
+        from sqlalchemy import text
+        from sqlalchemy.orm import selectinload
+
+        # fill the status registry
+        Status.get_by_code('WFD')
+
+        task_ids = [task.id for task in tasks if task.id is not None]
+        if not task_ids:
+            return
+
+        connection = DBSession.connection()
+        dependent_task_ids = [
+            r[0] for r in connection.execute(
+                text(
+                    'with recursive dependent_tasks(id) as ('
+                    '    select unnest(cast(:ids as integer[])) '
+                    '    union '
+                    '    select "Task_Dependencies".task_id '
+                    '    from "Task_Dependencies" '
+                    '    join dependent_tasks '
+                    '        on "Task_Dependencies".depends_to_id = '
+                    '            dependent_tasks.id'
+                    ') select id from dependent_tasks'
+                ),
+                ids=task_ids
+            )
+        ]
+
+        parent_ids = [
+            r[0] for r in connection.execute(
+                text(
+                    'select distinct unnest(ancestor_ids) from "Tasks" '
+                    'where id = any(:ids)'
+                ),
+                ids=dependent_task_ids
+            )
+        ]
+
+        cls.query\
+            .filter(cls.id.in_(dependent_task_ids))\
+            .options(
+                selectinload(cls.task_depends_to)
+                .joinedload(TaskDependency.depends_to),
+                selectinload(cls.task_dependent_of)
+                .joinedload(TaskDependency.task),
+                selectinload(cls.children)
+            ).all()
+
+        if parent_ids:
+            cls.query\
+                .filter(cls.id.in_(parent_ids))\
+                .options(selectinload(cls.children))\
+                .all()
 
     def _review_number_getter(self):
         """returns the revision number value
@@ -2959,6 +3567,109 @@ Task_Responsible = Table(
 # *****************************************************************************
 
 
+# *****************************************************************************
+# Deferred schedule_seconds and total_logged_seconds updates
+# *****************************************************************************
+_bulk_update_state = threading.local()
+
+
+@contextlib.contextmanager
+def bulk_updates():
+    """A context manager which defers updating the cached schedule_seconds and
+    total_logged_seconds values of the parent tasks until the end of the
+    block.
+
+    Normally every change in the schedule values of a task or in the time logs
+    of a task is passed to all of the parents of the task immediately. Inside
+    the block the changes are collected per container task and every parent
+    is updated only once when the block exits, which speeds up importing lots
+    of time logs or changing the schedule values of lots of tasks::
+
+      from stalker import bulk_updates
+
+      with bulk_updates():
+          for shot in sequence.shots:
+              shot.schedule_timing = 10
+
+    The blocks can be nested, the values are updated when the outermost block
+    exits.
+    """
+    if getattr(_bulk_update_state, 'deltas', None) is not None:
+        # the outer block will apply the deltas
+        yield
+        return
+
+    _bulk_update_state.deltas = {}
+    try:
+        yield
+    finally:
+        deltas = _bulk_update_state.deltas
+        _bulk_update_state.deltas = None
+        with DBSession.no_autoflush:
+            _apply_rollup_deltas(deltas.values())
+
+
+def _update_parent_rollups(task, schedule_seconds=0, total_logged_seconds=0):
+    """Adds the given changes to the cached schedule_seconds and
+    total_logged_seconds values of the parent of the given task, the changes
+    are collected to be applied later inside a :func:`.bulk_updates` block.
+
+    :param task: A :class:`.Task` instance which its parent should be updated.
+    :param schedule_seconds: The change in the schedule_seconds.
+    :param total_logged_seconds: The change in the total_logged_seconds.
+    """
+    parent = task.parent
+    if not parent:
+        return
+
+    deltas = getattr(_bulk_update_state, 'deltas', None)
+    if deltas is not None:
+        delta = deltas.get(id(parent))
+        if delta is None:
+            deltas[id(parent)] = \
+                [parent, schedule_seconds, total_logged_seconds]
+        else:
+            delta[1] += schedule_seconds
+            delta[2] += total_logged_seconds
+        return
+
+    if schedule_seconds:
+        parent.schedule_seconds = \
+            (parent.schedule_seconds or 0) + schedule_seconds
+
+    if total_logged_seconds:
+        parent.total_logged_seconds = \
+            parent.total_logged_seconds + total_logged_seconds
+
+
+def _apply_rollup_deltas(deltas):
+    """Applies the changes collected in a :func:`.bulk_updates` block to the
+    given container tasks and their parents, every task is updated only once.
+
+    :param deltas: A list of ``[task, schedule_seconds, total_logged_seconds]``
+      lists.
+    """
+    # sum the changes for every parent first
+    totals = {}
+    for task, schedule_seconds, total_logged_seconds in deltas:
+        while task is not None:
+            total = totals.get(id(task))
+            if total is None:
+                totals[id(task)] = \
+                    [task, schedule_seconds, total_logged_seconds]
+            else:
+                total[1] += schedule_seconds
+                total[2] += total_logged_seconds
+            task = task.parent
+
+    # the tasks without a cached value will calculate it from their children
+    for task, schedule_seconds, total_logged_seconds in totals.values():
+        if schedule_seconds and task._schedule_seconds is not None:
+            task._schedule_seconds += schedule_seconds
+        if total_logged_seconds and task._total_logged_seconds is not None:
+            task._total_logged_seconds += total_logged_seconds
+
+
 # *****************************************************************************
 # TimeLog updates the owner tasks parents total_logged_seconds attribute
 # with new duration
@@ -3000,6 +3711,17 @@ def update_time_log_task_parents_for_end(tlog, new_end, old_end, initiator):
         __update_total_logged_seconds__(tlog, new_duration, old_duration)
 
 
+def _forget_time_log_seconds(task):
+    """Removes the sum of the time logs of the given task which is loaded by
+    :meth:`.Task.load_subtree` as it is not valid anymore
+
+    :param task: A :class:`.Task` instance.
+    """
+    from sqlalchemy.orm.attributes import set_committed_value
+    if task.__dict__.get('_time_log_seconds') is not None:
+        set_committed_value(task, '_time_log_seconds', None)
+
+
 def __update_total_logged_seconds__(tlog, new_duration, old_duration):
     """Updates the given parent tasks total_logged_seconds attribute with the
     new duration
@@ -3011,6 +3733,7 @@ def __update_total_logged_seconds__(tlog, new_duration, old_duration):
     """
     if tlog.task:
         logger.debug('TimeLog has a task: %s' % tlog.task)
+        _forget_time_log_seconds(tlog.task)
         parent = tlog.task.parent
         if parent:
             logger.debug('TImeLog.task has a parent: %s' % parent)
@@ -3023,9 +3746,10 @@ def __update_total_logged_seconds__(tlog, new_duration, old_duration):
             new_total_seconds = new_duration.days * 86400 + \
                 new_duration.seconds
 
-            parent.total_logged_seconds = \
-                parent.total_logged_seconds - old_total_seconds + \
-                new_total_seconds
+            _update_parent_rollups(
+                tlog.task,
+                total_logged_seconds=new_total_seconds - old_total_seconds
+            )
         else:
             logger.debug("TimeLog.task doesn't have a parent:")
     else:
@@ -3057,9 +3781,9 @@ def update_parents_schedule_seconds_with_schedule_timing(
             new_schedule_timing, task.schedule_unit, task.schedule_model
         )
         # remove the old and add the new one
-        task.parent.schedule_seconds = \
-            task.parent.schedule_seconds - old_schedule_seconds + \
-            new_schedule_seconds
+        _update_parent_rollups(
+            task, schedule_seconds=new_schedule_seconds - old_schedule_seconds
+        )
 
 
 # *****************************************************************************
@@ -3090,12 +3814,9 @@ def update_parents_schedule_seconds_with_schedule_unit(
             schedule_timing, new_schedule_unit, task.schedule_model
         )
         # remove the old and add the new one
-        parent_schedule_seconds = 0
-        if task.parent.schedule_seconds:
-            parent_schedule_seconds = task.parent.schedule_seconds
-        task.parent.schedule_seconds = \
-            parent_schedule_seconds - old_schedule_seconds + \
-            new_schedule_seconds
+        _update_parent_rollups(
+            task, schedule_seconds=new_schedule_seconds - old_schedule_seconds
+        )
 
 
 # *****************************************************************************
@@ -3151,6 +3872,119 @@ def removed_a_dependency(task, task_dependent, initiator):
     )
 
 
+# *****************************************************************************
+# Task date_updated
+# *****************************************************************************
+@event.listens_for(Session, 'before_flush')
+def update_related_date_updated(session, flush_context, instances):
+    """Sets the date_updated of the Tasks with changed dependency relations
+    and the Tasks (or the Projects for deleted Tasks) that a deleted TimeLog
+    or Task is related to, as these changes are not changing the Task itself,
+    so the changes can be found by looking at the date_updated values (like
+    the incremental schedules do).
+
+    :param session: The session that is going to be flushed.
+    :param flush_context: not used
+    :param instances: not used
+    """
+    import pytz
+    now = datetime.datetime.now(pytz.utc)
+
+    changed_entities = [
+        item.task for item in list(session.new) + list(session.dirty)
+        if isinstance(item, TaskDependency) and
+        (item in session.new or session.is_modified(item))
+    ]
+
+    for item in session.deleted:
+        if isinstance(item, TaskDependency):
+            changed_entities.append(item.task)
+        elif isinstance(item, TimeLog):
+            changed_entities.append(item.task)
+        elif isinstance(item, Task):
+            changed_entities.append(item.project)
+
+    for entity in changed_entities:
+        if entity is not None and entity not in session.deleted:
+            entity.date_updated = now
+
+
+# *****************************************************************************
+# Task materialized path
+# *****************************************************************************
+@event.listens_for(Session, 'after_flush')
+def update_task_materialized_paths(session, flush_context):
+    """Updates the materialized paths (the ``ancestor_ids`` and ``depth``
+    values) of the reparented tasks and their descendants in the database
+    after they are flushed, as the ids of the new parents are not known before
+    the flush.
+
+    :param session: The flushed session.
+    :param flush_context: not used
+    """
+    from sqlalchemy import text
+    from sqlalchemy.orm.attributes import set_committed_value
+    from sqlalchemy.orm.util import identity_key
+
+    changed_tasks = [
+        task for task in list(session.new) + list(session.dirty)
+        if isinstance(task, Task) and task._hierarchy_changed
+    ]
+    if not changed_tasks:
+        return
+
+    # the descendants are reached from every changed ancestor, use the path
+    # coming from the top most one
+    result = session.connection().execute(
+        text(
+            'with recursive task_paths(id, ancestor_ids, steps) as ('
+            '    select '
+            '        "Tasks".id, '
+            '        case when "Parent_Tasks".id is null '
+            '            then cast(\'{}\' as integer[]) '
+            '            else "Parent_Tasks".ancestor_ids || "Parent_Tasks".id '
+            '        end, '
+            '        0 '
+            '    from "Tasks" '
+            '    left outer join "Tasks" as "Parent_Tasks" '
+            '        on "Tasks".parent_id = "Parent_Tasks".id '
+            '    where "Tasks".id = any(:ids) '
+            'union all '
+            '    select '
+            '        "Tasks".id, '
+            '        task_paths.ancestor_ids || task_paths.id, '
+            '        task_paths.steps + 1 '
+            '    from "Tasks" '
+            '    join task_paths on "Tasks".parent_id = task_paths.id'
+            ') '
+            'update "Tasks" '
+            'set ancestor_ids = new_paths.ancestor_ids, '
+            '    depth = cardinality(new_paths.ancestor_ids) '
+            'from ('
+            '    select distinct on (id) id, ancestor_ids '
+            '    from task_paths '
+            '    order by id, steps desc'
+            ') as new_paths '
+            'where "Tasks".id = new_paths.id '
+            '    and "Tasks".ancestor_ids is distinct from '
+            '        new_paths.ancestor_ids '
+            'returning "Tasks".id, "Tasks".ancestor_ids, "Tasks".depth'
+        ),
+        ids=[task.id for task in changed_tasks]
+    )
+
+    # update the tasks in the session without marking them dirty
+    identity_map = session.identity_map
+    for task_id, ancestor_ids, depth in result:
+        task = identity_map.get(identity_key(Task, task_id))
+        if task is not None:
+            set_committed_value(task, 'ancestor_ids', ancestor_ids)
+            set_committed_value(task, 'depth', depth)
+
+    for task in changed_tasks:
+        task._hierarchy_changed = False
+
+
 @event.listens_for(TimeLog.__table__, 'after_create')
 def add_exclude_constraint(table, connection, **kwargs):
     """adds the PostgreSQL specific ExcludeConstraint
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# Stalker a Production Asset Management System
+# Copyright (C) 2009-2016 Erkan Ozgur Yilmaz
+#
+# This file is part of Stalker.
+#
+# Stalker is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License.
+#
+# Stalker is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# Lesser GNU General Public License for more details.
+#
+# You should have received a copy of the Lesser GNU General Public License
+# along with Stalker.  If not, see <http://www.gnu.org/licenses/>
+
+import json
+import os
+import shutil
+import tempfile
+
+from stalker.testing import UnitTestBase
+
+from benchmarks.run_benchmarks import Timer, main
+
+
+class TimerTester(UnitTestBase):
+    """tests the benchmarks.run_benchmarks.Timer class
+    """
+
+    def test_summary_returns_min_mean_and_max_of_each_phase(self):
+        """testing if the summary() method will return the min, mean and max
+        durations and the run count of each phase
+        """
+        timer = Timer()
+        timer.add('phase1', 1.0)
+        timer.add('phase1', 3.0)
+        timer.add('phase2', 2.0)
+        self.assertEqual(
+            timer.summary(),
+            {
+                'phase1': {'min': 1.0, 'mean': 2.0, 'max': 3.0, 'runs': 2},
+                'phase2': {'min': 2.0, 'mean': 2.0, 'max': 2.0, 'runs': 1}
+            }
+        )
+
+    def test_measure_returns_the_result_of_the_callable(self):
+        """testing if the measure() method will return the result of the
+        callable and record its duration
+        """
+        timer = Timer()
+        self.assertEqual(timer.measure('phase1', max, 1, 2), 2)
+        self.assertEqual(len(timer.durations['phase1']), 1)
+
+
+class RunBenchmarksTester(UnitTestBase):
+    """tests the benchmarks.run_benchmarks.main() function
+    """
+
+    def setUp(self):
+        """set up the test
+        """
+        super(RunBenchmarksTester, self).setUp()
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """clean up the test
+        """
+        shutil.rmtree(self.temp_dir)
+        super(RunBenchmarksTester, self).tearDown()
+
+    def test_main_writes_the_results_of_a_tiny_studio(self):
+        """testing if main() will run the benchmarks on a tiny studio and
+        write the results as JSON
+        """
+        output_path = os.path.join(self.temp_dir, 'results.json')
+        main([
+            '--url', self.config['sqlalchemy.url'],
+            '--projects', '1',
+            '--depth', '2',
+            '--children', '2',
+            '--users', '3',
+            '--repeat', '1',
+            '--skip-tj3',
+            '--output', output_path
+        ])
+
+        with open(output_path) as f:
+            result = json.load(f)
+
+        self.assertEqual(result['repeat'], 1)
+        self.assertEqual(result['parameters']['projects'], 1)
+        self.assertEqual(result['counts']['projects'], 1)
+        self.assertEqual(result['counts']['tasks'], 6)
+        self.assertEqual(
+            sorted(result['phases'].keys()),
+            ['create_studio', 'native_data_load', 'native_db_write_back',
+             'native_schedule', 'native_solve', 'percent_complete',
+             'status_propagation', 'update_schedule_info']
+        )
+        for phase in result['phases'].values():
+            self.assertEqual(phase['runs'], 1)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# Stalker a Production Asset Management System
+# Copyright (C) 2009-2016 Erkan Ozgur Yilmaz
+#
+# This file is part of Stalker.
+#
+# Stalker is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License.
+#
+# Stalker is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# Lesser GNU General Public License for more details.
+#
+# You should have received a copy of the Lesser GNU General Public License
+# along with Stalker.  If not, see <http://www.gnu.org/licenses/>
+
+import datetime
+
+import pytz
+from stalker.testing import UnitTestBase
+from stalker import Project, Task, TimeLog, User, Vacation
+
+from benchmarks.synthetic_studio import create_studio
+
+
+class SyntheticStudioTester(UnitTestBase):
+    """tests the benchmarks.synthetic_studio.create_studio() function
+    """
+
+    def test_create_studio_creates_a_tiny_studio(self):
+        """testing if create_studio() will create the requested number of
+        projects, tasks, users, vacations and time logs
+        """
+        studio = create_studio(
+            projects=1,
+            depth=2,
+            children=2,
+            users=3,
+            vacations=1,
+            dependency_density=1.0,
+            alternative_resources=2,
+            time_logs=1
+        )
+        self.assertIsNotNone(studio.id)
+        self.assertEqual(Project.query.count(), 1)
+        # 2 root tasks with 2 children each
+        self.assertEqual(Task.query.count(), 6)
+        # the admin and the synthetic users
+        self.assertEqual(User.query.count(), 4)
+        self.assertEqual(Vacation.query.count(), 3)
+        # all the leaves but the first one have a dependency
+        self.assertEqual(TimeLog.query.count(), 1)
+
+    def test_create_studio_start_is_fixed_by_default(self):
+        """testing if create_studio() will use the same start date when the
+        start argument is skipped
+        """
+        studio = create_studio(projects=1, depth=1, children=1, users=1)
+        self.assertEqual(
+            studio.start,
+            datetime.datetime(2016, 1, 4, tzinfo=pytz.utc)
+        )
+
+    def test_create_studio_start_argument_is_working_properly(self):
+        """testing if create_studio() will use the given start date
+        """
+        start = datetime.datetime(2013, 4, 15, tzinfo=pytz.utc)
+        studio = create_studio(
+            projects=1, depth=1, children=1, users=1, start=start
+        )
+        self.assertEqual(studio.start, start)
+
+    def test_alternative_resources_do_not_include_the_resource(self):
+        """testing if the resource of a leaf task will not be one of its
+        alternative resources
+        """
+        create_studio(
+            projects=1,
+            depth=1,
+            children=20,
+            users=3,
+            alternative_resources=3
+        )
+        leaves = Task.query.all()
+        self.assertEqual(len(leaves), 20)
+        for leaf in leaves:
+            self.assertEqual(len(leaf.resources), 1)
+            self.assertNotIn(leaf.resources[0], leaf.alternative_resources)
+            self.assertTrue(len(leaf.alternative_resources) <= 2)
@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+# Stalker a Production Asset Management System
+# Copyright (C) 2009-2016 Erkan Ozgur Yilmaz
+#
+# This file is part of Stalker.
+#
+# Stalker is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License.
+#
+# Stalker is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# Lesser GNU General Public License for more details.
+#
+# You should have received a copy of the Lesser GNU General Public License
+# along with Stalker.  If not, see <http://www.gnu.org/licenses/>
+
+import datetime
+
+import pytz
+from stalker.testing import UnitTestBase
+from stalker.db import DBSession
+from stalker import (db, User, Repository, Project, Task, TimeLog, Vacation,
+                     NativeScheduler, Studio)
+
+
+class NativeSchedulerTester(UnitTestBase):
+    """tests the stalker.models.scheduler.NativeScheduler class
+    """
+
+    def setUp(self):
+        """set up the test
+        """
+        super(NativeSchedulerTester, self).setUp()
+
+        # create resources
+        self.test_user1 = User(
+            login='user1',
+            name='User1',
+            email='user1@users.com',
+            password='1234',
+        )
+        DBSession.add(self.test_user1)
+
+        self.test_user2 = User(
+            login='user2',
+            name='User2',
+            email='user2@users.com',
+            password='1234',
+        )
+        DBSession.add(self.test_user2)
+
+        self.test_user3 = User(
+            login='user3',
+            name='User3',
+            email='user3@users.com',
+            password='1234',
+        )
+        DBSession.add(self.test_user3)
+
+        self.test_user4 = User(
+            login='user4',
+            name='User4',
+            email='user4@users.com',
+            password='1234',
+        )
+        DBSession.add(self.test_user4)
+
+        self.test_user5 = User(
+            login='user5',
+            name='User5',
+            email='user5@users.com',
+            password='1234',
+        )
+        DBSession.add(self.test_user5)
+
+        # repository
+        self.test_repo = Repository(
+            name='Test Repository',
+            linux_path='/mnt/T/',
+            windows_path='T:/',
+            osx_path='/Volumes/T/'
+        )
+        DBSession.add(self.test_repo)
+
+        # create one project
+        self.test_proj1 = Project(
+            name='Test Project 1',
+            code='TP1',
+            repository=self.test_repo,
+            start=datetime.datetime(2013, 4, 4, tzinfo=pytz.utc),
+            end=datetime.datetime(2013, 5, 4, tzinfo=pytz.utc)
+        )
+        DBSession.add(self.test_proj1)
+
+        # create two tasks with the same resources
+        self.test_task1 = Task(
+            name='Task1',
+            project=self.test_proj1,
+            resources=[self.test_user1, self.test_user2],
+            alternative_resources=[
+                self.test_user3, self.test_user4, self.test_user5
+            ],
+            schedule_model=0,
+            schedule_timing=50,
+            schedule_unit='h',
+        )
+        DBSession.add(self.test_task1)
+
+        self.test_task2 = Task(
+            name='Task2',
+            project=self.test_proj1,
+            resources=[self.test_user1, self.test_user2],
+            alternative_resources=[
+                self.test_user3, self.test_user4, self.test_user5
+            ],
+            depends=[self.test_task1],
+            schedule_model=0,
+            schedule_timing=60,
+            schedule_unit='h',
+            priority=800
+        )
+        DBSession.add(self.test_task2)
+        DBSession.commit()
+
+        self.test_studio = Studio(
+            name='Test Studio',
+            now=datetime.datetime(2013, 4, 16, 0, 0, tzinfo=pytz.utc)
+        )
+        self.test_studio.start = \
+            datetime.datetime(2013, 4, 16, 0, 0, tzinfo=pytz.utc)
+        self.test_studio.end = \
+            datetime.datetime(2013, 4, 30, 0, 0, tzinfo=pytz.utc)
+        self.test_studio.daily_working_hours = 9
+        DBSession.add(self.test_studio)
+        DBSession.commit()
+
+    def test_compute_resources_argument_is_skipped(self):
+        """testing if the compute_resources attribute will be False if the
+        compute_resources argument is skipped
+        """
+        native_sched = NativeScheduler()
+        self.assertFalse(native_sched.compute_resources)
+
+    def test_projects_argument_is_skipped(self):
+        """testing if the projects attribute will be an empty list if the
+        projects argument is skipped
+        """
+        native_sched = NativeScheduler()
+        self.assertEqual(native_sched.projects, [])
+
+    def test_projects_argument_is_not_a_list(self):
+        """testing if a TypeError will be raised when the projects argument
+        value is not a list
+        """
+        with self.assertRaises(TypeError) as cm:
+            NativeScheduler(projects='not a list of projects')
+
+        self.assertEqual(
+            str(cm.exception),
+            'NativeScheduler.projects should be a list of '
+            'stalker.models.project.Project instances, not str'
+        )
+
+    def test_schedule_will_not_work_when_the_studio_attribute_is_None(self):
+        """testing if a TypeError will be raised when the studio attribute is
+        None
+        """
+        native_sched = NativeScheduler()
+        native_sched.studio = None
+        with self.assertRaises(TypeError) as cm:
+            native_sched.schedule()
+
+        self.assertEqual(
+            str(cm.exception),
+            'NativeScheduler.studio should be an instance of '
+            'stalker.models.studio.Studio, not NoneType'
+        )
+
+    def test_tasks_are_correctly_scheduled(self):
+        """testing if the tasks are correctly scheduled
+        """
+        native_sched = NativeScheduler(compute_resources=True)
+        native_sched.studio = self.test_studio
+        native_sched.schedule()
+        db.DBSession.commit()
+
+        # check if the task and project timings are all adjusted
+        self.assertEqual(
+            datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc),
+            self.test_proj1.computed_start
+        )
+        self.assertEqual(
+            datetime.datetime(2013, 4, 24, 10, 0, tzinfo=pytz.utc),
+            self.test_proj1.computed_end
+        )
+
+        self.assertEqual(
+            datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc),
+            self.test_task1.computed_start
+        )
+        self.assertEqual(
+            datetime.datetime(2013, 4, 18, 16, 0, tzinfo=pytz.utc),
+            self.test_task1.computed_end
+        )
+        self.assertEqual(
+            sorted([self.test_user1, self.test_user2], key=lambda x: x.name),
+            sorted(self.test_task1.computed_resources, key=lambda x: x.name)
+        )
+
+        self.assertEqual(
+            datetime.datetime(2013, 4, 18, 16, 0, tzinfo=pytz.utc),
+            self.test_task2.computed_start
+        )
+        self.assertEqual(
+            datetime.datetime(2013, 4, 24, 10, 0, tzinfo=pytz.utc),
+            self.test_task2.computed_end
+        )
+
+        # the alternatives with the minimum allocation should be used
+        self.assertEqual(
+            sorted([self.test_user3, self.test_user4], key=lambda x: x.name),
+            sorted(self.test_task2.computed_resources, key=lambda x: x.name)
+        )
+
+    def test_tasks_are_correctly_scheduled_with_dependency_gaps(self):
+        """testing if the gap values of the dependencies are considered
+        """
+        self.test_task2.task_depends_to[0].gap_timing = 2
+        self.test_task2.task_depends_to[0].gap_unit = 'd'
+        self.test_task2.task_depends_to[0].gap_model = 'duration'
+        db.DBSession.commit()
+
+        native_sched = NativeScheduler()
+        native_sched.studio = self.test_studio
+        native_sched.schedule()
+        db.DBSession.commit()
+
+        self.assertEqual(
+            datetime.datetime(2013, 4, 18, 16, 0, tzinfo=pytz.utc),
+            self.test_task1.computed_end
+        )
+        # 2 calendar days later, which is a saturday, so it starts on monday
+        self.assertEqual(
+            datetime.datetime(2013, 4, 22, 9, 0, tzinfo=pytz.utc),
+            self.test_task2.computed_start
+        )
+
+    def test_vacations_are_considered(self):
+        """testing if the resources are not allocated in their vacations
+        """
+        vacation = Vacation(
+            user=self.test_user1,
+            start=datetime.datetime(2013, 4, 16, 0, 0, tzinfo=pytz.utc),
+            end=datetime.datetime(2013, 4, 17, 0, 0, tzinfo=pytz.utc)
+        )
+        self.test_task1.alternative_resources = []
+        db.DBSession.add(vacation)
+        db.DBSession.commit()
+
+        native_sched = NativeScheduler()
+        native_sched.studio = self.test_studio
+        native_sched.schedule()
+        db.DBSession.commit()
+
+        # User2 works alone on the first day and the remaining 41h is done
+        # by both of the users
+        self.assertEqual(
+            datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc),
+            self.test_task1.computed_start
+        )
+        self.assertEqual(
+            datetime.datetime(2013, 4, 19, 12, 0, tzinfo=pytz.utc),
+            self.test_task1.computed_end
+        )
+
+    def test_time_logs_are_considered(self):
+        """testing if the time logs are considered as booked effort
+        """
+        time_log = TimeLog(
+            task=self.test_task1,
+            resource=self.test_user1,
+            start=datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc),
+            end=datetime.datetime(2013, 4, 16, 18, 0, tzinfo=pytz.utc)
+        )
+        db.DBSession.add(time_log)
+        db.DBSession.commit()
+
+        native_sched = NativeScheduler()
+        native_sched.studio = self.test_studio
+        native_sched.schedule()
+        db.DBSession.commit()
+
+        # 41h of effort is left which is scheduled after the booking
+        self.assertEqual(
+            datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc),
+            self.test_task1.computed_start
+        )
+        self.assertEqual(
+            datetime.datetime(2013, 4, 19, 12, 0, tzinfo=pytz.utc),
+            self.test_task1.computed_end
+        )
+
+    def test_schedule_fills_the_metrics(self):
+        """testing if the schedule() method will fill the metrics attribute
+        """
+        native_sched = NativeScheduler(compute_resources=True)
+        native_sched.studio = self.test_studio
+        native_sched.schedule()
+        db.DBSession.commit()
+
+        metrics = native_sched.metrics
+        self.assertEqual(
+            sorted(metrics['timings'].keys()),
+            ['data_load', 'db_write_back', 'solve', 'total']
+        )
+        self.assertEqual(
+            metrics['counts'],
+            {'tasks': 2, 'bookings': 0, 'dependencies': 1, 'updated_rows': 7}
+        )
+        self.assertEqual(
+            metrics['updated_row_counts'],
+            {
+                'tasks': 2,
+                'projects': 1,
+                'computed_resources_inserted': 4,
+                'computed_resources_deleted': 0
+            }
+        )
+
+    def test_circular_dependencies_raises_a_runtime_error(self):
+        """testing if a RuntimeError will be raised when the tasks can not be
+        scheduled because of a circular dependency
+        """
+        from stalker import TaskDependency
+        # skip the validation of the relation
+        db.DBSession.connection().execute(
+            TaskDependency.__table__.insert().values(
+                task_id=self.test_task1.id,
+                depends_to_id=self.test_task2.id,
+                dependency_target='onend',
+                gap_timing=0,
+                gap_unit='h',
+                gap_model='length'
+            )
+        )
+
+        native_sched = NativeScheduler()
+        native_sched.studio = self.test_studio
+        with self.assertRaises(RuntimeError) as cm:
+            native_sched.schedule()
+
+        self.assertEqual(
+            str(cm.exception),
+            'Tasks can not be scheduled because of circular dependencies: '
+            'Task_%s, Task_%s' % (self.test_task1.id, self.test_task2.id)
+        )
+
+    def test_schedule_a_synthetic_studio(self):
+        """testing if the schedule() method will schedule all the tasks of a
+        synthetic studio with thousands of tasks in a few seconds
+        """
+        from benchmarks.synthetic_studio import create_studio
+        studio = create_studio(
+            projects=2,
+            depth=3,
+            children=10,
+            users=50,
+            start=datetime.datetime(2016, 1, 4, tzinfo=pytz.utc)
+        )
+        projects = Project.query\
+            .filter(Project.code.in_(['SP0_0', 'SP0_1'])).all()
+        self.assertEqual(len(projects), 2)
+
+        native_sched = NativeScheduler(
+            studio=studio,
+            compute_resources=True,
+            projects=projects
+        )
+        native_sched.schedule()
+        db.DBSession.commit()
+
+        metrics = native_sched.metrics
+        # 2 projects * (10 + 100 + 1000) tasks
+        self.assertEqual(metrics['counts']['tasks'], 2220)
+        # a loose upper limit, the solve phase takes a fraction of a second
+        self.assertLess(metrics['timings']['solve'], 10)
+
+        db.DBSession.expire_all()
+        leaves = Task.query\
+            .filter(Task.project_id.in_([p.id for p in projects]))\
+            .filter(~Task.children.any())\
+            .all()
+        self.assertEqual(len(leaves), 2000)
+        for leaf in leaves:
+            self.assertIsNotNone(leaf.computed_start)
+            self.assertIsNotNone(leaf.computed_end)
+            self.assertTrue(studio.start <= leaf.computed_start)
+            self.assertTrue(leaf.computed_end <= studio.end)
+            self.assertTrue(leaf.computed_resources)
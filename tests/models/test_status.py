@@ -116,3 +116,117 @@ class StatusTest(UnitTestBase):
         self.assertFalse(a_status != self.kwargs["code"])
         self.assertFalse(a_status != self.kwargs["code"].lower())
         self.assertFalse(a_status != self.kwargs["code"].upper())
+
+
+class StatusRegistryTester(UnitTestBase):
+    """tests the status registry of the stalker.models.status.Status class
+    """
+
+    def test_get_by_code_returns_the_status_with_the_given_code(self):
+        """testing if the get_by_code() method returns the Status with the
+        given code
+        """
+        self.assertEqual(
+            Status.get_by_code('WIP'),
+            Status.query.filter_by(code='WIP').first()
+        )
+        self.assertEqual(
+            Status.get_by_code('CMPL'),
+            Status.query.filter_by(code='CMPL').first()
+        )
+
+    def test_get_by_code_returns_None_for_an_unknown_code(self):
+        """testing if the get_by_code() method returns None when there is no
+        Status with the given code
+        """
+        self.assertIsNone(Status.get_by_code('UNKNOWN'))
+
+    def test_get_by_code_is_not_querying_the_database_again(self):
+        """testing if the get_by_code() method does not query the database
+        after the registry is filled
+        """
+        from sqlalchemy import event
+        from stalker import db
+
+        Status.get_by_code('WIP')
+
+        statements = []
+
+        def count_statements(*args):
+            statements.append(args[2])
+
+        engine = db.DBSession.connection().engine
+        event.listen(engine, 'before_cursor_execute', count_statements)
+        try:
+            for code in ['WFD', 'RTS', 'WIP', 'PREV', 'HREV', 'DREV', 'OH',
+                         'STOP', 'CMPL']:
+                Status.get_by_code(code)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count_statements)
+
+        self.assertEqual(statements, [])
+
+    def test_get_by_code_registry_is_updated_when_a_status_changes(self):
+        """testing if the status registry is updated when a Status is created
+        or changed
+        """
+        from stalker import db
+
+        self.assertIsNone(Status.get_by_code('TST'))
+
+        test_status = Status(name='Test Status', code='TST')
+        db.DBSession.add(test_status)
+        db.DBSession.commit()
+        self.assertEqual(Status.get_by_code('TST'), test_status)
+
+        test_status.code = 'TST2'
+        db.DBSession.commit()
+        self.assertIsNone(Status.get_by_code('TST'))
+        self.assertEqual(Status.get_by_code('TST2'), test_status)
+
+    def test_get_by_code_registry_is_cleared_when_the_session_is_closed(self):
+        """testing if the get_by_code() method is not returning the detached
+        statuses of a closed session
+        """
+        from stalker import db
+
+        wip = Status.get_by_code('WIP')
+        db.DBSession.close()
+
+        new_wip = Status.get_by_code('WIP')
+        self.assertIsNot(new_wip, wip)
+        self.assertIn(new_wip, db.DBSession)
+        self.assertEqual(new_wip.code, 'WIP')
+
+    def test_get_by_code_is_not_returning_expunged_statuses(self):
+        """testing if the get_by_code() method is not returning the statuses
+        that are expunged from the session
+        """
+        from stalker import db
+
+        wip = Status.get_by_code('WIP')
+        db.DBSession.expunge_all()
+
+        new_wip = Status.get_by_code('WIP')
+        self.assertIsNot(new_wip, wip)
+        self.assertIn(new_wip, db.DBSession)
+
+    def test_get_by_code_registry_is_cleared_when_the_transaction_ends(self):
+        """testing if the status registry is rebuilt in a new transaction, so
+        the statuses changed by other processes are retrieved
+        """
+        from sqlalchemy import text
+        from stalker import db
+
+        wip = Status.get_by_code('WIP')
+        db.DBSession.commit()
+
+        # change the status as another process would do
+        db.DBSession.connection().execute(
+            text('update "Statuses" set code = \'WIP2\' where id = :id'),
+            id=wip.id
+        )
+        db.DBSession.commit()
+
+        self.assertIsNone(Status.get_by_code('WIP'))
+        self.assertEqual(Status.get_by_code('WIP2'), wip)
@@ -201,6 +201,30 @@ class StatusListTest(UnitTestBase):
         self.assertEqual(a_status_list[0], a_status_list["complete"])
         self.assertEqual(a_status_list[1], a_status_list["wip"])
 
+    def test_indexing_get_string_indexes_after_the_statuses_are_changed(
+            self):
+        """testing if the string indexes are updated when the statuses of the
+        StatusList or the statuses themselves are changed
+        """
+        status1 = Status(name="Complete", code="CMPLT")
+        status2 = Status(name="Work in Progress", code="WIP")
+        status3 = Status(name="Pending Review", code="PRev")
+
+        a_status_list = StatusList(name="Asset Status List",
+                                   statuses=[status1, status2],
+                                   target_entity_type="Asset")
+        self.assertIsNone(a_status_list["prev"])
+
+        a_status_list.statuses.append(status3)
+        self.assertEqual(a_status_list["prev"], status3)
+
+        a_status_list[0] = status3
+        self.assertIsNone(a_status_list["complete"])
+
+        status2.code = "WRK"
+        self.assertIsNone(a_status_list["wip"])
+        self.assertEqual(a_status_list["wrk"], status2)
+
     def test_indexing_set(self):
         """testing indexing of statuses in the statusList, set
         """
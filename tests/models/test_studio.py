@@ -29,6 +29,13 @@ class DummyScheduler(SchedulerBase):
         SchedulerBase.__init__(self, studio)
         self.callback = callback
 
+    def _get_init_kwargs(self):
+        """keep the callback in the schedulers created with these settings
+        """
+        kwargs = SchedulerBase._get_init_kwargs(self)
+        kwargs['callback'] = self.callback
+        return kwargs
+
     def schedule(self):
         """call the callback function before finishing
         """
@@ -1988,10 +1995,12 @@ project Studio_{{studio.id}} "Studio_{{studio.id}}" 2013-04-15 - 2013-06-30 {
         self.assertEqual(self.test_studio.last_scheduled_by, self.test_user1)
 
         last_schedule_message = self.test_studio.last_schedule_message
+        last_schedule_metrics = self.test_studio.last_schedule_metrics
         last_scheduled_at = self.test_studio.last_scheduled_at
         last_scheduled_by = self.test_studio.last_scheduled_by
 
         self.assertTrue(last_schedule_message is not None)
+        self.assertEqual(last_schedule_metrics, tj_scheduler.metrics)
         self.assertTrue(last_scheduled_at is not None)
         self.assertTrue(last_scheduled_by is not None)
 
@@ -2010,12 +2019,648 @@ project Studio_{{studio.id}} "Studio_{{studio.id}}" 2013-04-15 - 2013-06-30 {
             datetime.timedelta(minutes=1)
         )
         self.assertEqual(last_schedule_message, studio.last_schedule_message)
+        self.assertEqual(last_schedule_metrics, studio.last_schedule_metrics)
         self.assertEqual(last_scheduled_at, studio.last_scheduled_at)
         self.assertEqual(last_scheduled_by, studio.last_scheduled_by)
 
         self.assertEqual(studio.last_scheduled_by_id, self.test_user1.id)
         self.assertEqual(studio.last_scheduled_by, self.test_user1)
 
+    def test_schedule_changes_while_scheduling_are_in_the_next_increment(
+            self):
+        """testing if the tasks that are changed after the data is exported
+        and before the results are written back are exported in the next
+        incremental schedule
+        """
+        import datetime
+        import pytz
+        from stalker import db, TaskJugglerScheduler
+
+        db.DBSession.add(self.test_studio)
+        db.DBSession.commit()
+
+        def edit_task():
+            # the task is edited while the scheduler is running
+            self.test_task1.date_updated = datetime.datetime.now(pytz.utc)
+
+        self.test_studio.scheduler = DummyScheduler(callback=edit_task)
+        self.test_studio.schedule()
+        db.DBSession.commit()
+
+        self.assertEqual(
+            self.test_studio.last_scheduled_at,
+            self.test_studio.scheduling_started_at
+        )
+        self.assertTrue(
+            self.test_task1.date_updated > self.test_studio.last_scheduled_at
+        )
+
+        tjp_sched = TaskJugglerScheduler(incremental=True)
+        tjp_sched.studio = self.test_studio
+        self.assertIn(self.test_project1.id, tjp_sched._get_project_ids())
+
+    def test_schedule_will_not_update_last_scheduled_at_if_tj3_fails(self):
+        """testing if the last_scheduled_at attribute is not updated when
+        tj3 fails, so the changes are still exported in the next incremental
+        schedule
+        """
+        import datetime
+        import pytz
+        from stalker import db, defaults, TaskJugglerScheduler
+
+        db.DBSession.add(self.test_studio)
+        db.DBSession.commit()
+
+        self.test_studio.scheduler = DummyScheduler()
+        self.test_studio.schedule()
+        db.DBSession.commit()
+        last_scheduled_at = self.test_studio.last_scheduled_at
+        self.assertIsNotNone(last_scheduled_at)
+
+        self.test_task1.date_updated = datetime.datetime.now(pytz.utc)
+        db.DBSession.commit()
+
+        tj_command = defaults.tj_command
+        defaults.tj_command = '/bin/false'
+        try:
+            self.test_studio.scheduler = TaskJugglerScheduler()
+            with self.assertRaises(RuntimeError):
+                self.test_studio.schedule()
+        finally:
+            defaults.tj_command = tj_command
+
+        # the caller stores the schedule info even if the schedule fails
+        db.DBSession.commit()
+        self.assertFalse(self.test_studio.is_scheduling)
+        self.assertEqual(self.test_studio.last_scheduled_at, last_scheduled_at)
+
+        tjp_sched = TaskJugglerScheduler(incremental=True)
+        tjp_sched.studio = self.test_studio
+        self.assertIn(self.test_project1.id, tjp_sched._get_project_ids())
+
+    def test_schedule_partial_schedule_will_not_update_last_scheduled_at(
+            self):
+        """testing if the last_scheduled_at attribute is not updated after a
+        schedule that doesn't schedule all the active projects, so the changes
+        in the other projects are exported in the next incremental schedule
+        """
+        import datetime
+        import pytz
+        from stalker import db, TaskJugglerScheduler
+
+        db.DBSession.add(self.test_studio)
+        db.DBSession.commit()
+
+        dummy_scheduler = DummyScheduler()
+        self.test_studio.scheduler = dummy_scheduler
+        self.test_studio.schedule()
+        db.DBSession.commit()
+        last_scheduled_at = self.test_studio.last_scheduled_at
+
+        self.test_task2.date_updated = datetime.datetime.now(pytz.utc)
+        db.DBSession.commit()
+
+        # schedule the first project only
+        dummy_scheduler.projects = [self.test_project1]
+        self.assertTrue(dummy_scheduler.is_partial)
+        self.test_studio.schedule()
+        db.DBSession.commit()
+        self.assertEqual(self.test_studio.last_scheduled_at, last_scheduled_at)
+
+        tjp_sched = TaskJugglerScheduler(incremental=True)
+        tjp_sched.studio = self.test_studio
+        self.assertIn(self.test_project2.id, tjp_sched._get_project_ids())
+
+        # scheduling all the active projects is a full schedule
+        dummy_scheduler.projects = [self.test_project1, self.test_project2]
+        self.assertFalse(dummy_scheduler.is_partial)
+        self.test_studio.schedule()
+        db.DBSession.commit()
+        self.assertEqual(
+            self.test_studio.last_scheduled_at,
+            self.test_studio.scheduling_started_at
+        )
+        self.assertEqual(tjp_sched._get_project_ids(), [])
+
+    def test_schedule_records_the_shifts_of_the_moved_tasks(self):
+        """testing if the shifts of the computed dates of the tasks are
+        recorded in the schedule history and can be queried with
+        get_task_slips() and get_moved_tasks()
+        """
+        import datetime
+        import pytz
+        from stalker import db
+
+        start = datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc)
+        end = datetime.datetime(2013, 4, 18, 16, 0, tzinfo=pytz.utc)
+        day = datetime.timedelta(days=1)
+        zero = datetime.timedelta(0)
+
+        dummy_scheduler = DummyScheduler()
+        self.test_studio.scheduler = dummy_scheduler
+        db.DBSession.add(self.test_studio)
+        db.DBSession.commit()
+
+        for s, e in [(start, end),
+                     (start, end + 3 * day),
+                     (start + day, end + 3 * day)]:
+            dummy_scheduler.callback = \
+                lambda s=s, e=e: dummy_scheduler._write_schedule_data([{
+                    'b_id': self.test_task1.id,
+                    'start': s,
+                    'end': e,
+                    'computed_start': s,
+                    'computed_end': e
+                }])
+            self.test_studio.schedule()
+            db.DBSession.commit()
+
+        # the first schedule has nothing to compare with, so it has no shifts
+        slips = self.test_studio.get_task_slips(self.test_task1)
+        self.assertEqual(len(slips), 3)
+        self.assertEqual([slip[1:] for slip in slips],
+                         [(zero, zero), (zero, 3 * day), (day, zero)])
+
+        slips = self.test_studio.get_task_slips(self.test_task1, runs=1)
+        self.assertEqual([slip[1:] for slip in slips], [(day, zero)])
+        self.assertEqual(slips[-1][0], dummy_scheduler.scheduled_at)
+        self.assertEqual(slips[-1][0], self.test_studio.last_scheduled_at)
+
+        # the last schedule is used by default
+        self.assertEqual(self.test_studio.get_moved_tasks(2), [])
+        self.assertEqual(
+            self.test_studio.get_moved_tasks(0.5),
+            [(self.test_task1, day, zero)]
+        )
+        slips = self.test_studio.get_task_slips(self.test_task1)
+        self.assertEqual(
+            self.test_studio.get_moved_tasks(2, scheduled_at=slips[1][0]),
+            [(self.test_task1, zero, 3 * day)]
+        )
+
+    def test_schedule_history_is_kept_per_studio(self):
+        """testing if the schedule history is recorded for the scheduled
+        studio only and every schedule is recorded even if it doesn't move any
+        task
+        """
+        import datetime
+        import pytz
+        from sqlalchemy import text
+        from stalker import db, Studio
+
+        start = datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc)
+        end = datetime.datetime(2013, 4, 18, 16, 0, tzinfo=pytz.utc)
+        day = datetime.timedelta(days=1)
+        zero = datetime.timedelta(0)
+
+        other_studio = Studio(name='Other Studio')
+        dummy_scheduler = DummyScheduler()
+        self.test_studio.scheduler = dummy_scheduler
+        db.DBSession.add_all([self.test_studio, other_studio])
+        db.DBSession.commit()
+
+        for s, e in [(start, end), (start, end + day), (start, end + day)]:
+            dummy_scheduler.callback = \
+                lambda s=s, e=e: dummy_scheduler._write_schedule_data([{
+                    'b_id': self.test_task1.id,
+                    'start': s,
+                    'end': e,
+                    'computed_start': s,
+                    'computed_end': e
+                }])
+            self.test_studio.schedule()
+            db.DBSession.commit()
+
+        # only the second schedule has moved the task
+        run_studio_ids = [
+            r[0] for r in db.DBSession.connection().execute(
+                text('select studio_id from "Schedule_Runs"')
+            )
+        ]
+        self.assertEqual(run_studio_ids, [self.test_studio.id] * 3)
+
+        slips = self.test_studio.get_task_slips(self.test_task1)
+        self.assertEqual(
+            [slip[1:] for slip in slips],
+            [(zero, zero), (zero, day), (zero, zero)]
+        )
+        self.assertEqual(self.test_studio.get_moved_tasks(0.5), [])
+        self.assertEqual(
+            self.test_studio.get_moved_tasks(0.5, scheduled_at=slips[1][0]),
+            [(self.test_task1, zero, day)]
+        )
+
+        # a schedule that doesn't write anything back is also recorded
+        dummy_scheduler.callback = None
+        self.test_studio.schedule()
+        db.DBSession.commit()
+        slips = self.test_studio.get_task_slips(self.test_task1)
+        self.assertEqual(len(slips), 4)
+        self.assertEqual(slips[-1][0], self.test_studio.scheduling_started_at)
+        self.assertEqual(other_studio.get_task_slips(self.test_task1), [])
+        self.assertEqual(other_studio.get_moved_tasks(0.5), [])
+
+    def _hold_schedule_lock(self, release, message=None, partial=False):
+        """starts a thread that holds the scheduling lock of the test studio
+        in another session until the release event is set, and optionally
+        records a schedule with the given message as its result before
+        committing, which doesn't update the last_scheduled_at if partial is
+        True, returns the thread after the lock is acquired
+        """
+        import datetime
+        import threading
+        import pytz
+        from sqlalchemy import text
+        from stalker import db, defaults, Studio
+        from stalker.models.studio import Schedule_Runs
+
+        studio_id = self.test_studio.id
+        locked = threading.Event()
+
+        def hold_lock():
+            try:
+                db.DBSession.connection().execute(
+                    text('select pg_advisory_xact_lock(:key, :id)'),
+                    key=defaults.schedule_lock_key,
+                    id=studio_id
+                )
+                locked.set()
+                release.wait(10)
+                if message is not None:
+                    now = datetime.datetime.now(pytz.utc)
+                    studio = Studio.query.get(studio_id)
+                    studio.last_schedule_message = message
+                    if not partial:
+                        studio.last_scheduled_at = now
+                    db.DBSession.connection().execute(
+                        Schedule_Runs.insert().values(
+                            studio_id=studio_id,
+                            scheduled_at=now
+                        )
+                    )
+                db.DBSession.commit()
+            finally:
+                db.DBSession.remove()
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        locked.wait(10)
+        return thread
+
+    def test_schedule_lock_policy_argument_is_not_valid(self):
+        """testing if a ValueError will be raised when the lock_policy
+        argument of the schedule() method is not "wait" or "skip"
+        """
+        self.test_studio.scheduler = DummyScheduler()
+        with self.assertRaises(ValueError) as cm:
+            self.test_studio.schedule(lock_policy='steal')
+
+        self.assertEqual(
+            str(cm.exception),
+            'Studio.schedule() lock_policy should be one of "wait" or "skip", '
+            'not steal'
+        )
+
+    def test_schedule_is_skipped_if_the_studio_is_locked(self):
+        """testing if the schedule() method returns None without scheduling
+        when the studio is being scheduled by another session and the
+        lock_policy is "skip"
+        """
+        import threading
+        calls = []
+        self.test_studio.scheduler = \
+            DummyScheduler(callback=lambda: calls.append(1))
+
+        release = threading.Event()
+        thread = self._hold_schedule_lock(release)
+        try:
+            result = self.test_studio.schedule(lock_policy='skip')
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertIsNone(result)
+        self.assertEqual(calls, [])
+
+    def test_schedule_raises_SchedulingLockError_after_the_lock_timeout(self):
+        """testing if a SchedulingLockError will be raised when the lock can
+        not be acquired in lock_timeout seconds
+        """
+        import threading
+        from stalker.exceptions import SchedulingLockError
+        self.test_studio.scheduler = DummyScheduler()
+
+        release = threading.Event()
+        thread = self._hold_schedule_lock(release)
+        try:
+            with self.assertRaises(SchedulingLockError) as cm:
+                self.test_studio.schedule(lock_policy='wait',
+                                          lock_timeout=0.2)
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(
+            str(cm.exception),
+            'Could not acquire the scheduling lock of %s in 0.2 seconds' %
+            self.test_studio.name
+        )
+
+        # the transaction is still usable
+        from stalker import db
+        self.assertEqual(
+            db.DBSession.connection().execute('select 1').scalar(), 1
+        )
+
+    def test_schedule_returns_the_result_of_the_concurrent_schedule(self):
+        """testing if the schedule() method waits the concurrent schedule and
+        returns its result instead of scheduling again
+        """
+        import threading
+        calls = []
+        self.test_studio.scheduler = \
+            DummyScheduler(callback=lambda: calls.append(1))
+
+        release = threading.Event()
+        thread = self._hold_schedule_lock(release, message='other schedule')
+        timer = threading.Timer(0.3, release.set)
+        timer.start()
+        # a pending change that should not be discarded while waiting
+        self.test_studio.daily_working_hours = 7
+        try:
+            result = self.test_studio.schedule(lock_policy='wait')
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(result, 'other schedule')
+        self.assertEqual(self.test_studio.daily_working_hours, 7)
+        self.assertEqual(calls, [])
+
+    def test_schedule_returns_the_result_of_a_concurrent_partial_schedule(
+            self):
+        """testing if the schedule() method waits the concurrent schedule and
+        returns its result even if it is a partial schedule which doesn't
+        update the last_scheduled_at
+        """
+        import threading
+        calls = []
+        self.test_studio.scheduler = \
+            DummyScheduler(callback=lambda: calls.append(1))
+
+        release = threading.Event()
+        thread = self._hold_schedule_lock(
+            release, message='partial schedule', partial=True
+        )
+        timer = threading.Timer(0.3, release.set)
+        timer.start()
+        try:
+            result = self.test_studio.schedule(lock_policy='wait')
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(result, 'partial schedule')
+        self.assertEqual(calls, [])
+
+    def test_schedule_runs_again_if_the_concurrent_schedule_is_not_committed(
+            self):
+        """testing if the schedule() method schedules again after waiting a
+        concurrent session which hasn't recorded any schedule
+        """
+        import threading
+        calls = []
+        self.test_studio.scheduler = \
+            DummyScheduler(callback=lambda: calls.append(1))
+
+        release = threading.Event()
+        thread = self._hold_schedule_lock(release)
+        timer = threading.Timer(0.3, release.set)
+        timer.start()
+        try:
+            self.test_studio.schedule(lock_policy='wait')
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(calls, [1])
+
+    def test_get_task_slips_task_argument_is_not_a_task(self):
+        """testing if a TypeError will be raised when the task argument of
+        get_task_slips() is not a Task instance
+        """
+        with self.assertRaises(TypeError) as cm:
+            self.test_studio.get_task_slips('not a task')
+
+        self.assertEqual(
+            str(cm.exception),
+            'Studio.get_task_slips() task should be an instance of '
+            'stalker.models.task.Task, not str'
+        )
+
+    def test_get_task_slips_runs_argument_is_not_positive(self):
+        """testing if a ValueError will be raised when the runs argument of
+        get_task_slips() is not a positive integer
+        """
+        with self.assertRaises(ValueError) as cm:
+            self.test_studio.get_task_slips(self.test_task1, runs=0)
+
+        self.assertEqual(
+            str(cm.exception),
+            'Studio.get_task_slips() runs should be a positive integer, not 0'
+        )
+
+    def test_get_moved_tasks_days_argument_is_not_a_number(self):
+        """testing if a TypeError will be raised when the days argument of
+        get_moved_tasks() is not an int or float
+        """
+        with self.assertRaises(TypeError) as cm:
+            self.test_studio.get_moved_tasks('2')
+
+        self.assertEqual(
+            str(cm.exception),
+            'Studio.get_moved_tasks() days should be an int or float, not str'
+        )
+
+    def test_schedule_async_will_not_work_without_a_scheduler(self):
+        """testing if a RuntimeError will be raised when the scheduler
+        attribute is not set to a Scheduler instance and schedule_async is
+        called
+        """
+        self.test_studio.scheduler = None
+        with self.assertRaises(RuntimeError) as cm:
+            self.test_studio.schedule_async()
+
+        self.assertEqual(
+            str(cm.exception),
+            'There is no scheduler for this Studio, please assign a scheduler '
+            'to the Studio.scheduler attribute, before calling '
+            'Studio.schedule_async()'
+        )
+
+    def test_schedule_async_will_not_work_for_a_new_studio(self):
+        """testing if a RuntimeError will be raised when the studio is not
+        stored in the database and schedule_async is called
+        """
+        from stalker import Studio
+        new_studio = Studio(name='New Studio')
+        new_studio.scheduler = DummyScheduler()
+        with self.assertRaises(RuntimeError) as cm:
+            new_studio.schedule_async()
+
+        self.assertEqual(
+            str(cm.exception),
+            'The Studio should be stored in the database before calling '
+            'Studio.schedule_async()'
+        )
+
+    def test_schedule_async_is_working_properly(self):
+        """testing if the schedule_async method will schedule the tasks in a
+        background thread, report the progress and store the schedule info
+        in the database
+        """
+        import datetime
+        import pytz
+        from stalker import db, Studio, TaskJugglerScheduler
+        tj_scheduler = TaskJugglerScheduler(compute_resources=True)
+        self.test_studio.now = \
+            datetime.datetime(2013, 4, 15, 22, 56, tzinfo=pytz.utc)
+        self.test_studio.start = \
+            datetime.datetime(2013, 4, 15, 22, 56, tzinfo=pytz.utc)
+        self.test_studio.end = \
+            datetime.datetime(2013, 7, 30, 0, 0, tzinfo=pytz.utc)
+        self.test_studio.scheduler = tj_scheduler
+        db.DBSession.commit()
+
+        phases = []
+
+        def callback(phase, message):
+            phases.append(phase)
+
+        job = self.test_studio.schedule_async(
+            scheduled_by=self.test_user1,
+            callback=callback
+        )
+        result = job.wait()
+        self.assertTrue(job.done())
+        self.assertFalse(job.cancelled)
+        self.assertEqual(result, job.result)
+
+        self.assertIn('export', phases)
+        self.assertIn('solve', phases)
+        self.assertIn('write_back', phases)
+        self.assertEqual(phases[-1], 'done')
+
+        # the data is committed in another session
+        db.DBSession.expire_all()
+        studio = Studio.query.get(self.test_studio.id)
+        self.assertFalse(studio.is_scheduling)
+        self.assertIsNone(studio.is_scheduling_by)
+        self.assertEqual(studio.last_scheduled_by, self.test_user1)
+        self.assertIsNotNone(self.test_task1.computed_start)
+
+    def test_schedule_async_queries_the_scheduler_entities_again(self):
+        """testing if the projects, departments and frozen statuses of the
+        scheduler are queried again in the session of the worker thread
+        """
+        import datetime
+        import pytz
+        from stalker import db, Status, TaskJugglerScheduler
+        status_cmpl = Status.query.filter_by(code='CMPL').first()
+        tj_scheduler = TaskJugglerScheduler(
+            compute_resources=True,
+            projects=[self.test_project1],
+            departments=[self.test_department1],
+            frozen_statuses=[status_cmpl]
+        )
+        self.test_studio.now = \
+            datetime.datetime(2013, 4, 15, 22, 56, tzinfo=pytz.utc)
+        self.test_studio.start = \
+            datetime.datetime(2013, 4, 15, 22, 56, tzinfo=pytz.utc)
+        self.test_studio.end = \
+            datetime.datetime(2013, 7, 30, 0, 0, tzinfo=pytz.utc)
+        self.test_studio.scheduler = tj_scheduler
+        db.DBSession.commit()
+
+        job = self.test_studio.schedule_async(scheduled_by=self.test_user1)
+        self.assertEqual(
+            job.entity_ids,
+            {
+                'projects': [self.test_project1.id],
+                'departments': [self.test_department1.id],
+                'frozen_statuses': [status_cmpl.id]
+            }
+        )
+        job.wait()
+
+        worker_scheduler = job.scheduler
+        self.assertIsNot(worker_scheduler, tj_scheduler)
+        self.assertTrue(worker_scheduler.compute_resources)
+        self.assertEqual(
+            [project.id for project in worker_scheduler.projects],
+            [self.test_project1.id]
+        )
+        self.assertIsNot(worker_scheduler.projects[0], self.test_project1)
+        self.assertIsNot(
+            worker_scheduler.departments[0], self.test_department1
+        )
+        self.assertIsNot(worker_scheduler.frozen_statuses[0], status_cmpl)
+
+        # the scheduler of the studio is left untouched and can be used again
+        self.assertIs(self.test_studio.scheduler, tj_scheduler)
+        self.assertEqual(tj_scheduler.projects, [self.test_project1])
+        self.assertEqual(tj_scheduler.departments, [self.test_department1])
+        self.assertEqual(tj_scheduler.frozen_statuses, [status_cmpl])
+        self.test_studio.schedule(scheduled_by=self.test_user1)
+        self.assertIs(tj_scheduler.studio, self.test_studio)
+
+    def test_schedule_async_can_be_cancelled(self):
+        """testing if the schedule started with schedule_async can be
+        cancelled and the changes are rolled back
+        """
+        import threading
+        from stalker import db, Studio
+        from stalker.exceptions import SchedulingCancelledError
+
+        started = threading.Event()
+        can_finish = threading.Event()
+
+        def callback():
+            started.set()
+            can_finish.wait(10)
+
+        self.test_studio.scheduler = DummyScheduler(callback=callback)
+        db.DBSession.commit()
+
+        phases = []
+        job = self.test_studio.schedule_async(
+            scheduled_by=self.test_user1,
+            callback=lambda phase, message: phases.append(phase)
+        )
+        self.assertTrue(started.wait(10))
+
+        # the studio is marked as being scheduled
+        db.DBSession.expire_all()
+        studio = Studio.query.get(self.test_studio.id)
+        self.assertTrue(studio.is_scheduling)
+        self.assertEqual(studio.is_scheduling_by, self.test_user1)
+        db.DBSession.rollback()
+
+        job.cancel()
+        can_finish.set()
+
+        with self.assertRaises(SchedulingCancelledError):
+            job.wait()
+
+        self.assertTrue(job.cancelled)
+        self.assertEqual(phases, ['cancelled'])
+
+        db.DBSession.expire_all()
+        studio = Studio.query.get(self.test_studio.id)
+        self.assertFalse(studio.is_scheduling)
+        self.assertIsNone(studio.is_scheduling_by)
+        self.assertIsNone(studio.last_scheduled_at)
+
     def test_vacation_attribute_is_read_only(self):
         """testing if the vacation attribute is a read-only attribute
         """
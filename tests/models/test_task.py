@@ -1240,6 +1240,88 @@ class TaskTestCase(UnitTestBase):
         self.assertEqual(new_task.percent_complete, 0)
         DBSession.commit()
 
+    def test_get_progress_returns_an_empty_dict_for_no_task_ids(self):
+        """testing if the get_progress() method returns an empty dictionary
+        when no task ids are given
+        """
+        self.assertEqual(Task.get_progress([]), {})
+
+    def test_get_progress_is_working_properly(self):
+        """testing if the get_progress() method returns the same values with
+        the percent_complete, remaining_seconds, schedule_seconds and
+        total_logged_seconds attributes of the tasks
+        """
+        from sqlalchemy import text
+
+        kwargs = copy.copy(self.kwargs)
+        kwargs['depends'] = []
+        kwargs['parent'] = None
+
+        dt = datetime.datetime
+        td = datetime.timedelta
+        now = dt.now(pytz.utc)
+
+        parent = Task(**kwargs)
+        child1 = Task(**kwargs)
+        child2 = Task(**kwargs)
+        child1.parent = parent
+        child2.parent = parent
+
+        kwargs['schedule_model'] = 'duration'
+        duration_task = Task(**kwargs)
+        duration_task.computed_start = now - td(days=2)
+        duration_task.computed_end = now - td(days=1)
+
+        DBSession.add_all([parent, child1, child2, duration_task])
+        DBSession.commit()
+
+        TimeLog(
+            task=child1,
+            resource=child1.resources[0],
+            start=now - td(hours=10),
+            end=now - td(hours=2)
+        )
+        TimeLog(
+            task=child2,
+            resource=child2.resources[1],
+            start=now - td(hours=2),
+            end=now
+        )
+        DBSession.commit()
+
+        # clear the cached values of the container
+        DBSession.connection().execute(
+            text(
+                'update "Tasks" '
+                'set schedule_seconds = NULL, total_logged_seconds = NULL '
+                'where id = :id'
+            ),
+            id=parent.id
+        )
+        DBSession.expire_all()
+
+        tasks = [parent, child1, child2, duration_task]
+        progress = Task.get_progress([task.id for task in tasks])
+
+        self.assertEqual(
+            sorted(progress.keys()),
+            sorted(task.id for task in tasks)
+        )
+        for task in tasks:
+            self.assertEqual(
+                progress[task.id],
+                {
+                    'percent_complete': task.percent_complete,
+                    'remaining_seconds': task.remaining_seconds,
+                    'schedule_seconds': task.schedule_seconds,
+                    'total_logged_seconds': task.total_logged_seconds,
+                }
+            )
+        self.assertEqual(progress[duration_task.id]['percent_complete'], 100)
+        self.assertEqual(
+            progress[parent.id]['total_logged_seconds'], 10 * 3600
+        )
+
     def test_percent_complete_attribute_is_not_using_any_time_logs_for_a_duration_task(self):
         """testing if the percent_complete attribute does not use any time log
         information if the task is a duration based task
@@ -1695,6 +1777,217 @@ class TaskTestCase(UnitTestBase):
         self.assertEqual(parent_task1.total_logged_seconds, 20 * 3600)
         self.assertEqual(parent_task2.total_logged_seconds, 30 * 3600)
 
+    def test_recompute_rollups_project_argument_is_not_a_project(self):
+        """testing if a TypeError will be raised when the project argument of
+        the recompute_rollups() method is not a Project instance
+        """
+        with self.assertRaises(TypeError) as cm:
+            Task.recompute_rollups('not a project')
+
+        self.assertEqual(
+            str(cm.exception),
+            'Task.recompute_rollups() project should be an instance of '
+            'stalker.models.project.Project, not str'
+        )
+
+    def test_recompute_rollups_is_working_properly(self):
+        """testing if the recompute_rollups() method fills the cached
+        schedule_seconds and total_logged_seconds values of the tasks of the
+        given project
+        """
+        from sqlalchemy import text
+
+        kwargs = copy.copy(self.kwargs)
+        kwargs['depends'] = []
+        kwargs['parent'] = None
+
+        parent1 = Task(**kwargs)
+        parent2 = Task(**kwargs)
+        child1 = Task(**kwargs)
+        child2 = Task(**kwargs)
+        child3 = Task(**kwargs)
+
+        parent2.parent = parent1
+        child1.parent = parent1
+        child2.parent = parent2
+        child3.parent = parent2
+        DBSession.add_all([parent1, parent2, child1, child2, child3])
+        DBSession.commit()
+
+        dt = datetime.datetime
+        td = datetime.timedelta
+        now = dt.now(pytz.utc)
+
+        tlog1 = TimeLog(
+            task=child1,
+            resource=child1.resources[0],
+            start=now,
+            end=now + td(hours=8)
+        )
+        tlog2 = TimeLog(
+            task=child2,
+            resource=child2.resources[1],
+            start=now,
+            end=now + td(hours=2)
+        )
+        DBSession.add_all([tlog1, tlog2])
+        DBSession.commit()
+
+        # clear the cached values
+        DBSession.connection().execute(
+            text(
+                'update "Tasks" '
+                'set schedule_seconds = NULL, total_logged_seconds = NULL'
+            )
+        )
+        DBSession.expire_all()
+
+        Task.recompute_rollups(self.test_project1)
+
+        day = Task.to_seconds(1, 'd', 'effort')
+        self.assertEqual(child1._schedule_seconds, day)
+        self.assertEqual(child1._total_logged_seconds, 8 * 3600)
+        self.assertEqual(parent2._schedule_seconds, 2 * day)
+        self.assertEqual(parent2._total_logged_seconds, 2 * 3600)
+        self.assertEqual(parent1._schedule_seconds, 3 * day)
+        self.assertEqual(parent1._total_logged_seconds, 10 * 3600)
+
+        # the values are stored in the database
+        DBSession.expire_all()
+        self.assertEqual(parent1._total_logged_seconds, 10 * 3600)
+        self.assertEqual(parent1.total_logged_seconds, 10 * 3600)
+
+    def test_recompute_rollups_truncates_the_time_log_durations(self):
+        """testing if the recompute_rollups() method truncates the duration of
+        each TimeLog to seconds in the same way with the
+        TimeLog.total_seconds attribute
+        """
+        from sqlalchemy import text
+
+        kwargs = copy.copy(self.kwargs)
+        kwargs['depends'] = []
+        kwargs['parent'] = None
+
+        parent1 = Task(**kwargs)
+        child1 = Task(**kwargs)
+        child1.parent = parent1
+        DBSession.add_all([parent1, child1])
+        DBSession.commit()
+
+        dt = datetime.datetime
+        td = datetime.timedelta
+        now = dt.now(pytz.utc)
+
+        tlog1 = TimeLog(
+            task=child1,
+            resource=child1.resources[0],
+            start=now,
+            end=now + td(hours=1)
+        )
+        tlog2 = TimeLog(
+            task=child1,
+            resource=child1.resources[1],
+            start=now,
+            end=now + td(hours=1)
+        )
+        DBSession.add_all([tlog1, tlog2])
+        DBSession.commit()
+
+        # add sub-second precision to the end of the time logs
+        DBSession.connection().execute(
+            text(
+                'update "TimeLogs" '
+                'set "end" = "end" + interval \'0.6 seconds\''
+            )
+        )
+        DBSession.expire_all()
+        self.assertEqual(tlog1.total_seconds, 3600)
+        self.assertEqual(tlog2.total_seconds, 3600)
+
+        Task.recompute_rollups(self.test_project1)
+
+        self.assertEqual(child1._total_logged_seconds, 2 * 3600)
+        self.assertEqual(parent1._total_logged_seconds, 2 * 3600)
+
+    def test_bulk_updates_defers_the_schedule_seconds_updates(self):
+        """testing if the schedule_seconds of the parents are updated when the
+        bulk_updates() block exits
+        """
+        from stalker import bulk_updates
+
+        kwargs = copy.copy(self.kwargs)
+        kwargs['depends'] = []
+        kwargs['parent'] = None
+
+        parent1 = Task(**kwargs)
+        parent2 = Task(**kwargs)
+        child1 = Task(**kwargs)
+        child2 = Task(**kwargs)
+
+        parent2.parent = parent1
+        child1.parent = parent2
+        child2.parent = parent2
+        DBSession.add_all([parent1, parent2, child1, child2])
+        DBSession.commit()
+
+        day = Task.to_seconds(1, 'd', 'effort')
+        self.assertEqual(parent1.schedule_seconds, 2 * day)
+
+        with bulk_updates():
+            child1.schedule_timing = 2
+            with bulk_updates():
+                child2.schedule_timing = 3
+            # the values are not updated yet
+            self.assertEqual(parent2._schedule_seconds, 2 * day)
+            self.assertEqual(parent1._schedule_seconds, 2 * day)
+
+        self.assertEqual(parent2.schedule_seconds, 5 * day)
+        self.assertEqual(parent1.schedule_seconds, 5 * day)
+
+    def test_bulk_updates_defers_the_total_logged_seconds_updates(self):
+        """testing if the total_logged_seconds of the parents are updated
+        when the bulk_updates() block exits
+        """
+        from stalker import bulk_updates
+
+        kwargs = copy.copy(self.kwargs)
+        kwargs['depends'] = []
+        kwargs['parent'] = None
+
+        parent1 = Task(**kwargs)
+        parent2 = Task(**kwargs)
+        child1 = Task(**kwargs)
+
+        parent2.parent = parent1
+        child1.parent = parent2
+        DBSession.add_all([parent1, parent2, child1])
+        DBSession.commit()
+        self.assertEqual(parent1.total_logged_seconds, 0)
+
+        dt = datetime.datetime
+        td = datetime.timedelta
+        now = dt.now(pytz.utc)
+
+        with bulk_updates():
+            tlog1 = TimeLog(
+                task=child1,
+                resource=child1.resources[0],
+                start=now,
+                end=now + td(hours=8)
+            )
+            TimeLog(
+                task=child1,
+                resource=child1.resources[1],
+                start=now,
+                end=now + td(hours=2)
+            )
+            tlog1.end = now + td(hours=4)
+            self.assertEqual(parent2._total_logged_seconds, 0)
+
+        self.assertEqual(child1.total_logged_seconds, 6 * 3600)
+        self.assertEqual(parent2.total_logged_seconds, 6 * 3600)
+        self.assertEqual(parent1.total_logged_seconds, 6 * 3600)
+
     def test_total_logged_seconds_attribute_is_working_properly_for_a_container_task_when_the_time_log_of_child_is_changed(self):
         """testing if the total_logged_seconds attribute is working properly
         for a container task when one of the time logs of one of the children
@@ -4294,6 +4587,332 @@ task Task_%(t2_id)s "Task_%(t2_id)s" {
             [t1, t2]
         )
 
+    def test_parents_attribute_is_working_properly_for_committed_tasks(self):
+        """testing if the parents attribute is working properly for tasks
+        that are committed to the database
+        """
+        kwargs = copy.copy(self.kwargs)
+        kwargs['parent'] = None
+
+        t1 = Task(**kwargs)
+        t2 = Task(**kwargs)
+        t3 = Task(**kwargs)
+
+        t2.parent = t1
+        t3.parent = t2
+        DBSession.add_all([t1, t2, t3])
+        DBSession.commit()
+
+        self.assertEqual(t1.parents, [])
+        self.assertEqual(t3.parents, [t1, t2])
+        self.assertEqual(t3.level, 3)
+
+    def test_parents_attribute_with_a_reparented_ancestor_not_flushed(self):
+        """testing if the parents, level and tjp_abs_id attributes are using
+        the new hierarchy when an ancestor is reparented but not flushed yet
+        """
+        kwargs = copy.copy(self.kwargs)
+        kwargs['parent'] = None
+
+        t1 = Task(**kwargs)
+        t2 = Task(**kwargs)
+        t3 = Task(**kwargs)
+        t4 = Task(**kwargs)
+
+        t2.parent = t1
+        t3.parent = t2
+        DBSession.add_all([t1, t2, t3, t4])
+        DBSession.commit()
+
+        with DBSession.no_autoflush:
+            t1.parent = t4
+            self.assertEqual(t3.parents, [t4, t1, t2])
+            self.assertEqual(t3.level, 4)
+            self.assertEqual(
+                t3.tjp_abs_id,
+                '.'.join([t3.project.tjp_id, t4.tjp_id, t1.tjp_id, t2.tjp_id,
+                          t3.tjp_id])
+            )
+
+    def test_parents_attribute_uses_the_loaded_parents(self):
+        """testing if the parents and tjp_abs_id attributes are not querying
+        the database when the parents are already loaded
+        """
+        from sqlalchemy import event
+
+        kwargs = copy.copy(self.kwargs)
+        kwargs['parent'] = None
+
+        t1 = Task(**kwargs)
+        t2 = Task(**kwargs)
+        t3 = Task(**kwargs)
+
+        t2.parent = t1
+        t3.parent = t2
+        DBSession.add_all([t1, t2, t3])
+        DBSession.commit()
+
+        tjp_abs_id = t3.tjp_abs_id
+
+        statements = []
+
+        def count_statements(*args):
+            statements.append(args[2])
+
+        engine = DBSession.connection().engine
+        event.listen(engine, 'before_cursor_execute', count_statements)
+        try:
+            self.assertEqual(t3.parents, [t1, t2])
+            self.assertEqual(t3.tjp_abs_id, tjp_abs_id)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count_statements)
+
+        self.assertEqual(statements, [])
+
+    def test_ancestor_ids_and_depth_attributes_are_filled_on_flush(self):
+        """testing if the ancestor_ids and depth attributes are filled when
+        the tasks are flushed
+        """
+        kwargs = copy.copy(self.kwargs)
+        kwargs['parent'] = None
+
+        t1 = Task(**kwargs)
+        t2 = Task(**kwargs)
+        t3 = Task(**kwargs)
+
+        t2.parent = t1
+        t3.parent = t2
+        DBSession.add_all([t1, t2, t3])
+        DBSession.commit()
+
+        self.assertEqual(t1.ancestor_ids, [])
+        self.assertEqual(t1.depth, 0)
+        self.assertEqual(t2.ancestor_ids, [t1.id])
+        self.assertEqual(t2.depth, 1)
+        self.assertEqual(t3.ancestor_ids, [t1.id, t2.id])
+        self.assertEqual(t3.depth, 2)
+
+    def test_ancestor_ids_attribute_is_updated_for_descendants(self):
+        """testing if the ancestor_ids and depth attributes of the
+        descendants are updated when a task is reparented
+        """
+        kwargs = copy.copy(self.kwargs)
+        kwargs['parent'] = None
+
+        t1 = Task(**kwargs)
+        t2 = Task(**kwargs)
+        t3 = Task(**kwargs)
+        t4 = Task(**kwargs)
+
+        t2.parent = t1
+        t3.parent = t2
+        DBSession.add_all([t1, t2, t3, t4])
+        DBSession.commit()
+
+        t1.parent = t4
+        DBSession.commit()
+
+        self.assertEqual(t2.ancestor_ids, [t4.id, t1.id])
+        self.assertEqual(t3.ancestor_ids, [t4.id, t1.id, t2.id])
+        self.assertEqual(t3.depth, 3)
+        self.assertEqual(t3.parents, [t4, t1, t2])
+
+        # descendants can be queried with the ancestor_ids
+        self.assertEqual(
+            sorted(
+                Task.query.filter(Task.ancestor_ids.contains([t4.id])).all(),
+                key=lambda x: x.depth
+            ),
+            [t1, t2, t3]
+        )
+
+        # make it a root task again
+        t1.parent = None
+        DBSession.commit()
+
+        self.assertEqual(t1.ancestor_ids, [])
+        self.assertEqual(t1.depth, 0)
+        self.assertEqual(t3.ancestor_ids, [t1.id, t2.id])
+        self.assertEqual(t3.depth, 2)
+
+    def test_load_subtree_root_argument_is_not_a_task_instance(self):
+        """testing if a TypeError will be raised when the root argument of
+        the load_subtree() method is not a Task instance
+        """
+        with self.assertRaises(TypeError) as cm:
+            Task.load_subtree('not a task')
+
+        self.assertEqual(
+            str(cm.exception),
+            'Task.load_subtree() root should be an instance of '
+            'stalker.models.task.Task, not str'
+        )
+
+    def test_load_subtree_is_working_properly(self):
+        """testing if the load_subtree() method returns the descendants of
+        the given task and walking over the hierarchy doesn't query the
+        database again
+        """
+        from sqlalchemy import event
+
+        kwargs = copy.copy(self.kwargs)
+        kwargs['parent'] = None
+
+        t1 = Task(**kwargs)
+        t2 = Task(**kwargs)
+        t3 = Task(**kwargs)
+        t4 = Task(**kwargs)
+        t5 = Task(**kwargs)
+
+        t2.parent = t1
+        t3.parent = t2
+        t4.parent = t2
+        t5.parent = t1
+        DBSession.add_all([t1, t2, t3, t4, t5])
+        DBSession.commit()
+
+        self.assertEqual(
+            Task.load_subtree(t1, eager=['resources', 'status']),
+            [t2, t5, t3, t4]
+        )
+
+        statements = []
+
+        def count_statements(*args):
+            statements.append(args[2])
+
+        engine = DBSession.connection().engine
+        event.listen(engine, 'before_cursor_execute', count_statements)
+        try:
+            walked_tasks = list(t1.walk_hierarchy())
+            for task in walked_tasks[1:]:
+                task.resources
+                task.status
+        finally:
+            event.remove(engine, 'before_cursor_execute', count_statements)
+
+        self.assertEqual(walked_tasks, [t1, t2, t3, t4, t5])
+        self.assertEqual(statements, [])
+
+    def test_load_subtree_is_working_properly_for_an_unflushed_root(self):
+        """testing if the load_subtree() method flushes the given root task
+        and returns its descendants when the root is not flushed yet
+        """
+        kwargs = copy.copy(self.kwargs)
+        kwargs['parent'] = None
+
+        t1 = Task(**kwargs)
+        t2 = Task(**kwargs)
+        t3 = Task(**kwargs)
+        t2.parent = t1
+        t3.parent = t2
+        self.assertIsNone(t1.id)
+
+        self.assertEqual(Task.load_subtree(t1), [t2, t3])
+        self.assertIsNotNone(t1.id)
+        self.assertEqual(t1.children, [t2])
+        self.assertEqual(t2.children, [t3])
+
+    def test_load_subtree_does_not_flush_for_a_stored_root(self):
+        """testing if the load_subtree() method doesn't flush the session
+        when the given root task is already stored in the database
+        """
+        kwargs = copy.copy(self.kwargs)
+        kwargs['parent'] = None
+
+        t1 = Task(**kwargs)
+        t2 = Task(**kwargs)
+        t2.parent = t1
+        DBSession.add_all([t1, t2])
+        DBSession.commit()
+
+        t3 = Task(**kwargs)
+        DBSession.add(t3)
+        with DBSession.no_autoflush:
+            self.assertEqual(Task.load_subtree(t1), [t2])
+        self.assertIsNone(t3.id)
+
+    def test_load_subtree_loads_the_total_logged_seconds(self):
+        """testing if the load_subtree() method loads the sum of the time
+        logs of the leaf tasks when total_logged_seconds is in the eager list
+        and the total_logged_seconds of the leaf tasks doesn't query the
+        database
+        """
+        from sqlalchemy import event
+
+        kwargs = copy.copy(self.kwargs)
+        kwargs['depends'] = []
+        kwargs['parent'] = None
+
+        dt = datetime.datetime
+        td = datetime.timedelta
+        now = dt.now(pytz.utc)
+
+        t1 = Task(**kwargs)
+        t2 = Task(**kwargs)
+        t3 = Task(**kwargs)
+        t2.parent = t1
+        t3.parent = t1
+        DBSession.add_all([t1, t2, t3])
+        DBSession.commit()
+
+        TimeLog(
+            task=t2,
+            resource=t2.resources[0],
+            start=now - td(hours=10),
+            end=now - td(hours=2)
+        )
+        TimeLog(
+            task=t2,
+            resource=t2.resources[1],
+            start=now - td(hours=2),
+            end=now
+        )
+        DBSession.commit()
+
+        self.assertEqual(
+            Task.load_subtree(t1, eager=['total_logged_seconds']),
+            [t2, t3]
+        )
+
+        statements = []
+
+        def count_statements(*args):
+            statements.append(args[2])
+
+        engine = DBSession.connection().engine
+        event.listen(engine, 'before_cursor_execute', count_statements)
+        try:
+            self.assertEqual(t2.total_logged_seconds, 10 * 3600)
+            self.assertEqual(t3.total_logged_seconds, 0)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count_statements)
+
+        self.assertEqual(statements, [])
+
+        # a new time log invalidates the loaded value
+        TimeLog(
+            task=t3,
+            resource=t3.resources[0],
+            start=now - td(hours=14),
+            end=now - td(hours=12)
+        )
+        self.assertEqual(t3.total_logged_seconds, 2 * 3600)
+
+    def test_load_subtree_returns_an_empty_list_for_leaf_tasks(self):
+        """testing if the load_subtree() method returns an empty list for a
+        leaf task
+        """
+        kwargs = copy.copy(self.kwargs)
+        kwargs['parent'] = None
+
+        t1 = Task(**kwargs)
+        DBSession.add(t1)
+        DBSession.commit()
+
+        self.assertEqual(Task.load_subtree(t1), [])
+        self.assertEqual(t1.children, [])
+
     def test_responsible_argument_is_skipped_for_a_root_task(self):
         """testing if the responsible list will be an empty list if a root task
         have no responsible set
@@ -812,3 +812,1657 @@ taskreport breakdown "{{csv_path}}"{
         # print tjp_content
         tjp_sched._clean_up()
         self.assertEqual(tjp_content, expected_tjp_content)
+
+    def test_incremental_argument_is_skipped(self):
+        """testing if the incremental attribute will be False if the
+        incremental argument is skipped
+        """
+        tjp_sched = TaskJugglerScheduler()
+        self.assertFalse(tjp_sched.incremental)
+
+    def test_incremental_argument_is_working_properly(self):
+        """testing if the incremental argument value is correctly passed to
+        the incremental attribute
+        """
+        tjp_sched = TaskJugglerScheduler(incremental=True)
+        self.assertTrue(tjp_sched.incremental)
+
+    def test_incremental_scheduling_exports_all_projects_if_never_scheduled(
+            self):
+        """testing if all the projects will be exported when the studio has
+        not been scheduled yet
+        """
+        dummy_project = Project(
+            name='Dummy Project',
+            code='DP',
+            repository=self.test_repo
+        )
+        db.DBSession.add(dummy_project)
+        db.DBSession.commit()
+
+        test_studio = Studio(name='Test Studio')
+        tjp_sched = TaskJugglerScheduler(incremental=True)
+        tjp_sched.studio = test_studio
+
+        self.assertEqual(
+            sorted(tjp_sched._get_project_ids()),
+            sorted([self.test_proj1.id, dummy_project.id])
+        )
+
+    def test_incremental_scheduling_exports_only_changed_projects(self):
+        """testing if only the changed projects and the projects connected to
+        them will be exported when incremental is True
+        """
+        # a project sharing no resources with test_proj1
+        dummy_project1 = Project(
+            name='Dummy Project 1',
+            code='DP1',
+            repository=self.test_repo
+        )
+        dt1 = Task(
+            name='Dummy Task 1',
+            project=dummy_project1,
+            resources=[self.test_user6]
+        )
+
+        # a project sharing a resource with test_proj1
+        dummy_project2 = Project(
+            name='Dummy Project 2',
+            code='DP2',
+            repository=self.test_repo
+        )
+        dt2 = Task(
+            name='Dummy Task 2',
+            project=dummy_project2,
+            resources=[self.test_user1]
+        )
+        db.DBSession.add_all([dummy_project1, dt1, dummy_project2, dt2])
+        db.DBSession.commit()
+
+        test_studio = Studio(name='Test Studio')
+        test_studio.last_scheduled_at = \
+            datetime.datetime.now(pytz.utc) + datetime.timedelta(seconds=1)
+
+        # update a task in the first project
+        self.test_task1.date_updated = \
+            test_studio.last_scheduled_at + datetime.timedelta(seconds=1)
+        db.DBSession.commit()
+
+        tjp_sched = TaskJugglerScheduler(incremental=True)
+        tjp_sched.studio = test_studio
+
+        self.assertEqual(
+            sorted(tjp_sched._get_project_ids()),
+            sorted([self.test_proj1.id, dummy_project2.id])
+        )
+
+    def test_incremental_scheduling_detects_the_changes_done_with_the_orm(
+            self):
+        """testing if the changes that are flushed with the ORM are detected
+        without setting the date_updated attributes explicitly
+        """
+        from stalker import TimeLog
+        dummy_project = Project(
+            name='Dummy Project',
+            code='DP',
+            repository=self.test_repo
+        )
+        dt1 = Task(
+            name='Dummy Task 1',
+            project=dummy_project,
+            resources=[self.test_user6]
+        )
+        dt2 = Task(
+            name='Dummy Task 2',
+            project=dummy_project,
+            resources=[self.test_user6]
+        )
+        test_studio = Studio(name='Test Studio')
+        db.DBSession.add_all([dummy_project, dt1, dt2, test_studio])
+        db.DBSession.commit()
+
+        tjp_sched = TaskJugglerScheduler(incremental=True)
+
+        # a task is edited
+        since = datetime.datetime.now(pytz.utc)
+        self.assertEqual(tjp_sched._get_changed_project_ids(since), set())
+        self.test_task1.schedule_timing = 5
+        db.DBSession.commit()
+        self.assertEqual(
+            tjp_sched._get_changed_project_ids(since),
+            set([self.test_proj1.id])
+        )
+
+        # a dependency is added
+        since = datetime.datetime.now(pytz.utc)
+        dt2.depends = [dt1]
+        db.DBSession.commit()
+        self.assertEqual(
+            tjp_sched._get_changed_project_ids(since),
+            set([dummy_project.id])
+        )
+
+        # a time log is entered and then deleted
+        since = datetime.datetime.now(pytz.utc)
+        tlog = TimeLog(
+            resource=self.test_user6,
+            task=dt1,
+            start=datetime.datetime(2013, 4, 16, 6, 0, tzinfo=pytz.utc),
+            end=datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc)
+        )
+        db.DBSession.add(tlog)
+        db.DBSession.commit()
+        self.assertEqual(
+            tjp_sched._get_changed_project_ids(since),
+            set([dummy_project.id])
+        )
+
+        since = datetime.datetime.now(pytz.utc)
+        db.DBSession.delete(tlog)
+        db.DBSession.commit()
+        self.assertEqual(
+            tjp_sched._get_changed_project_ids(since),
+            set([dummy_project.id])
+        )
+
+        # the schedule info of the studio is not a change
+        since = datetime.datetime.now(pytz.utc)
+        test_studio.is_scheduling = True
+        test_studio.scheduling_started_at = datetime.datetime.now(pytz.utc)
+        db.DBSession.commit()
+        self.assertEqual(tjp_sched._get_changed_project_ids(since), set())
+
+    def test_incremental_scheduling_will_not_schedule_if_nothing_changed(
+            self):
+        """testing if the schedule method will return without calling tj3 if
+        nothing has changed since the last schedule
+        """
+        test_studio = Studio(name='Test Studio')
+        test_studio.last_scheduled_at = \
+            datetime.datetime.now(pytz.utc) + datetime.timedelta(hours=1)
+
+        tjp_sched = TaskJugglerScheduler(incremental=True)
+        tjp_sched.studio = test_studio
+        self.assertEqual(tjp_sched.schedule(), '')
+        self.assertIsNone(tjp_sched.tjp_file_full_path)
+
+    def test_write_tjp_file_writes_the_same_content_with_tjp_content(self):
+        """testing if the _write_tjp_file() method will write the same content
+        with the _create_tjp_file_content() method generates
+        """
+        tjp_sched = TaskJugglerScheduler()
+        test_studio = Studio(name='Test Studio')
+        tjp_sched.studio = test_studio
+
+        tjp_sched._create_tjp_file()
+        tjp_sched._create_tjp_file_content()
+        tjp_sched._write_tjp_file()
+
+        with open(tjp_sched.tjp_file_full_path) as f:
+            written_content = f.read()
+
+        tjp_sched._clean_up()
+        self.maxDiff = None
+        self.assertEqual(written_content, tjp_sched.tjp_content)
+
+    def test_tjp_task_lines_with_multiple_dependencies_and_time_logs(self):
+        """testing if the dependencies and time logs are correctly exported
+        when a task has more than one of them
+        """
+        from stalker import TimeLog
+        test_task3 = Task(
+            name='Task3, (with comma and parens)',
+            project=self.test_proj1,
+            resources=[self.test_user1, self.test_user2],
+            depends=[self.test_task1, self.test_task2],
+            schedule_model=0,
+            schedule_timing=10,
+            schedule_unit='h'
+        )
+        db.DBSession.add(test_task3)
+        db.DBSession.commit()
+
+        tlog1 = TimeLog(
+            resource=self.test_user1,
+            task=self.test_task1,
+            start=datetime.datetime(2013, 4, 16, 6, 0, tzinfo=pytz.utc),
+            end=datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc)
+        )
+        tlog2 = TimeLog(
+            resource=self.test_user2,
+            task=self.test_task1,
+            start=datetime.datetime(2013, 4, 16, 10, 0, tzinfo=pytz.utc),
+            end=datetime.datetime(2013, 4, 16, 12, 0, tzinfo=pytz.utc)
+        )
+        db.DBSession.add_all([tlog1, tlog2])
+        db.DBSession.commit()
+
+        tjp_sched = TaskJugglerScheduler()
+        lines = list(
+            tjp_sched._generate_tjp_task_lines([self.test_proj1.id])
+        )
+
+        self.assertIn(
+            '    depends Project_%(p)s.Task_%(t1)s {onend}, '
+            'Project_%(p)s.Task_%(t2)s {onend}' % {
+                'p': self.test_proj1.id,
+                't1': self.test_task1.id,
+                't2': self.test_task2.id
+            },
+            lines
+        )
+        self.assertIn(
+            '    booking User_%s 2013-04-16-09:00:00 - 2013-04-16-12:00:00 '
+            '{ overtime 2 }' % self.test_user1.id,
+            lines
+        )
+        self.assertIn(
+            '    booking User_%s 2013-04-16-13:00:00 - 2013-04-16-15:00:00 '
+            '{ overtime 2 }' % self.test_user2.id,
+            lines
+        )
+
+    def test_write_tjp_file_fills_the_export_metrics(self):
+        """testing if the _write_tjp_file() method will fill the export
+        timings, the number of exported tasks, bookings, dependencies and the
+        tjp file size in the metrics attribute
+        """
+        from stalker import TimeLog
+        tlog1 = TimeLog(
+            resource=self.test_user1,
+            task=self.test_task1,
+            start=datetime.datetime(2013, 4, 16, 6, 0, tzinfo=pytz.utc),
+            end=datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc)
+        )
+        db.DBSession.add(tlog1)
+        db.DBSession.commit()
+
+        tjp_sched = TaskJugglerScheduler()
+        test_studio = Studio(name='Test Studio')
+        tjp_sched.studio = test_studio
+
+        tjp_sched._create_tjp_file()
+        tjp_sched._write_tjp_file([self.test_proj1.id])
+        tjp_file_size = os.path.getsize(tjp_sched.tjp_file_full_path)
+        tjp_sched._clean_up()
+
+        self.assertEqual(
+            tjp_sched.metrics['counts'],
+            {'tasks': 2, 'bookings': 1, 'dependencies': 1, 'updated_rows': 0}
+        )
+        self.assertEqual(tjp_sched.metrics['tjp_file_size'], tjp_file_size)
+        timings = tjp_sched.metrics['timings']
+        self.assertTrue(timings['sql_export'] > 0)
+        self.assertTrue(timings['template_render'] > 0)
+        self.assertTrue(timings['file_write'] >= 0)
+
+    def test_schedule_fills_the_metrics(self):
+        """testing if the schedule() method will fill the metrics attribute
+        """
+        tjp_sched = TaskJugglerScheduler(compute_resources=True)
+        test_studio = Studio(
+            name='Test Studio',
+            now=datetime.datetime(2013, 4, 16, 0, 0, tzinfo=pytz.utc)
+        )
+        test_studio.start = \
+            datetime.datetime(2013, 4, 16, 0, 0, tzinfo=pytz.utc)
+        test_studio.end = datetime.datetime(2013, 4, 30, 0, 0, tzinfo=pytz.utc)
+        test_studio.daily_working_hours = 9
+        DBSession.add(test_studio)
+        db.DBSession.commit()
+
+        tjp_sched.studio = test_studio
+        tjp_sched.schedule()
+        db.DBSession.commit()
+
+        metrics = tjp_sched.metrics
+        self.assertEqual(
+            sorted(metrics['timings'].keys()),
+            ['csv_parse', 'db_write_back', 'file_write', 'sql_export',
+             'template_render', 'tj3_solve', 'total']
+        )
+        self.assertTrue(metrics['timings']['tj3_solve'] > 0)
+        self.assertTrue(
+            metrics['timings']['total'] >= metrics['timings']['tj3_solve']
+        )
+        self.assertEqual(metrics['counts']['tasks'], 2)
+        self.assertEqual(metrics['counts']['dependencies'], 1)
+        self.assertEqual(
+            metrics['updated_row_counts'], tjp_sched.updated_row_counts
+        )
+        self.assertEqual(
+            metrics['counts']['updated_rows'],
+            sum(tjp_sched.updated_row_counts.values())
+        )
+        self.assertTrue(metrics['tjp_file_size'] > 0)
+        if os.name != 'nt':
+            self.assertTrue(metrics['peak_memory'] > 0)
+
+    def test_tjp_task_lines_of_multiple_projects_are_in_the_given_order(self):
+        """testing if the tasks of multiple projects are exported in the
+        given project order and the projects without any tasks are also
+        exported
+        """
+        dummy_project1 = Project(
+            name='Dummy Project 1',
+            code='DP1',
+            repository=self.test_repo
+        )
+        dt1 = Task(
+            name='Dummy Task 1',
+            project=dummy_project1,
+            resources=[self.test_user6],
+            schedule_model=0,
+            schedule_timing=10,
+            schedule_unit='h'
+        )
+        dummy_project2 = Project(
+            name='Dummy Project 2',
+            code='DP2',
+            repository=self.test_repo
+        )
+        db.DBSession.add_all([dummy_project1, dt1, dummy_project2])
+        db.DBSession.commit()
+
+        tjp_sched = TaskJugglerScheduler()
+        lines = list(
+            tjp_sched._generate_tjp_task_lines([
+                dummy_project1.id, dummy_project2.id, self.test_proj1.id
+            ])
+        )
+
+        self.assertEqual(
+            lines[:6],
+            [
+                'task Project_%s "Project_%s" {' % (
+                    dummy_project1.id, dummy_project1.id
+                ),
+                '  task Task_%s "Task_%s" {' % (dt1.id, dt1.id),
+                '    effort 10.0h',
+                '    allocate User_%s' % self.test_user6.id,
+                '  }',
+                '}',
+            ]
+        )
+        self.assertEqual(
+            lines[6:9],
+            [
+                'task Project_%s "Project_%s" {' % (
+                    dummy_project2.id, dummy_project2.id
+                ),
+                '}',
+                'task Project_%s "Project_%s" {' % (
+                    self.test_proj1.id, self.test_proj1.id
+                ),
+            ]
+        )
+        self.assertEqual(lines[-1], '}')
+        self.assertEqual(tjp_sched.num_of_records, 3)
+
+    def test_max_workers_argument_is_skipped(self):
+        """testing if the max_workers attribute will be 1 if the max_workers
+        argument is skipped
+        """
+        tjp_sched = TaskJugglerScheduler()
+        self.assertEqual(tjp_sched.max_workers, 1)
+
+    def test_max_workers_argument_is_working_properly(self):
+        """testing if the max_workers argument value is correctly passed to
+        the max_workers attribute
+        """
+        tjp_sched = TaskJugglerScheduler(max_workers=4)
+        self.assertEqual(tjp_sched.max_workers, 4)
+
+    def test_max_workers_attribute_is_not_an_integer(self):
+        """testing if a TypeError will be raised when the max_workers
+        attribute is set to a value other than an integer
+        """
+        tjp_sched = TaskJugglerScheduler()
+        with self.assertRaises(TypeError) as cm:
+            tjp_sched.max_workers = '4'
+
+        self.assertEqual(
+            str(cm.exception),
+            'TaskJugglerScheduler.max_workers should be an integer, not str'
+        )
+
+    def test_max_workers_attribute_is_not_positive(self):
+        """testing if a ValueError will be raised when the max_workers
+        attribute is set to zero or a negative value
+        """
+        tjp_sched = TaskJugglerScheduler()
+        with self.assertRaises(ValueError) as cm:
+            tjp_sched.max_workers = 0
+
+        self.assertEqual(
+            str(cm.exception),
+            'TaskJugglerScheduler.max_workers should be a positive integer, '
+            'not 0'
+        )
+
+    def test_get_project_components_is_working_properly(self):
+        """testing if the projects are correctly grouped in to independent
+        sets of projects
+        """
+        # a project sharing no resources with test_proj1
+        dummy_project1 = Project(
+            name='Dummy Project 1',
+            code='DP1',
+            repository=self.test_repo
+        )
+        dt1 = Task(
+            name='Dummy Task 1',
+            project=dummy_project1,
+            resources=[self.test_user6]
+        )
+
+        # a project sharing a resource with test_proj1
+        dummy_project2 = Project(
+            name='Dummy Project 2',
+            code='DP2',
+            repository=self.test_repo
+        )
+        dt2 = Task(
+            name='Dummy Task 2',
+            project=dummy_project2,
+            resources=[self.test_user1]
+        )
+        db.DBSession.add_all([dummy_project1, dt1, dummy_project2, dt2])
+        db.DBSession.commit()
+
+        tjp_sched = TaskJugglerScheduler(max_workers=2)
+        self.assertEqual(
+            tjp_sched._get_project_components([
+                self.test_proj1.id, dummy_project1.id, dummy_project2.id
+            ]),
+            [[self.test_proj1.id, dummy_project2.id], [dummy_project1.id]]
+        )
+
+    def test_get_project_components_considers_the_overrides(self):
+        """testing if the projects linked by the resources or dependencies in
+        the overrides are grouped together
+        """
+        dummy_project1 = Project(
+            name='Dummy Project 1',
+            code='DP1',
+            repository=self.test_repo
+        )
+        dt1 = Task(
+            name='Dummy Task 1',
+            project=dummy_project1,
+            resources=[self.test_user6]
+        )
+
+        dummy_project2 = Project(
+            name='Dummy Project 2',
+            code='DP2',
+            repository=self.test_repo
+        )
+        dt2 = Task(
+            name='Dummy Task 2',
+            project=dummy_project2,
+            resources=[self.test_user6]
+        )
+        db.DBSession.add_all([dummy_project1, dt1, dummy_project2, dt2])
+        db.DBSession.commit()
+
+        project_ids = [
+            self.test_proj1.id, dummy_project1.id, dummy_project2.id
+        ]
+        tjp_sched = TaskJugglerScheduler(max_workers=2)
+        self.assertEqual(
+            tjp_sched._get_project_components(project_ids),
+            [[self.test_proj1.id], [dummy_project1.id, dummy_project2.id]]
+        )
+
+        # an overridden resource
+        tjp_sched.overrides = {
+            dt1: {'alternative_resources': [self.test_user1]}
+        }
+        self.assertEqual(
+            tjp_sched._get_project_components(project_ids),
+            [project_ids]
+        )
+
+        # an overridden dependency
+        tjp_sched.overrides = {dt2: {'depends': [self.test_task2]}}
+        self.assertEqual(
+            tjp_sched._get_project_components(project_ids),
+            [project_ids]
+        )
+
+    def test_overrides_with_cross_project_dependency_and_multiple_workers(
+            self):
+        """testing if a dependency to a task of another project in the
+        overrides is correctly scheduled when max_workers is bigger than 1
+        """
+        dummy_project = Project(
+            name='Dummy Project',
+            code='DP',
+            repository=self.test_repo
+        )
+        dt1 = Task(
+            name='Dummy Task 1',
+            project=dummy_project,
+            schedule_timing=4,
+            schedule_unit='h',
+            resources=[self.test_user6]
+        )
+        db.DBSession.add_all([dummy_project, dt1])
+        db.DBSession.commit()
+
+        test_studio = Studio(
+            name='Test Studio',
+            now=datetime.datetime(2013, 4, 16, 0, 0, tzinfo=pytz.utc)
+        )
+        test_studio.start = \
+            datetime.datetime(2013, 4, 16, 0, 0, tzinfo=pytz.utc)
+        test_studio.end = datetime.datetime(2013, 4, 30, 0, 0, tzinfo=pytz.utc)
+        test_studio.daily_working_hours = 9
+        DBSession.add(test_studio)
+        db.DBSession.commit()
+
+        tjp_sched = TaskJugglerScheduler(
+            dry_run=True,
+            max_workers=2,
+            overrides={dt1: {'depends': [self.test_task2]}}
+        )
+        tjp_sched.studio = test_studio
+        result = tjp_sched.schedule()
+
+        # dt1 starts after task2, which is in another project
+        self.assertTrue(result[dt1.id][0] >= result[self.test_task2.id][1])
+
+    def test_tasks_are_correctly_scheduled_with_multiple_workers(self):
+        """testing if the tasks of independent projects are correctly
+        scheduled when max_workers is bigger than 1
+        """
+        dummy_project = Project(
+            name='Dummy Project',
+            code='DP',
+            repository=self.test_repo
+        )
+        dt1 = Task(
+            name='Dummy Task 1',
+            project=dummy_project,
+            schedule_timing=4,
+            schedule_unit='h',
+            resources=[self.test_user6]
+        )
+        db.DBSession.add_all([dummy_project, dt1])
+        db.DBSession.commit()
+
+        tjp_sched = TaskJugglerScheduler(compute_resources=True,
+                                         max_workers=2)
+        test_studio = Studio(
+            name='Test Studio',
+            now=datetime.datetime(2013, 4, 16, 0, 0, tzinfo=pytz.utc)
+        )
+        test_studio.start = \
+            datetime.datetime(2013, 4, 16, 0, 0, tzinfo=pytz.utc)
+        test_studio.end = datetime.datetime(2013, 4, 30, 0, 0, tzinfo=pytz.utc)
+        test_studio.daily_working_hours = 9
+        DBSession.add(test_studio)
+        db.DBSession.commit()
+
+        tjp_sched.studio = test_studio
+        tjp_sched.schedule()
+        db.DBSession.commit()
+
+        # both projects should be scheduled
+        self.assertEqual(
+            dt1.computed_start,
+            datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc)
+        )
+        self.assertEqual(
+            dt1.computed_end,
+            datetime.datetime(2013, 4, 16, 13, 0, tzinfo=pytz.utc)
+        )
+        self.assertEqual(dt1.computed_resources, [self.test_user6])
+
+        self.assertEqual(
+            self.test_task1.computed_start,
+            datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc)
+        )
+        self.assertIsNotNone(self.test_task2.computed_end)
+
+    def test_use_cache_argument_is_skipped(self):
+        """testing if the use_cache attribute will be False if the use_cache
+        argument is skipped
+        """
+        tjp_sched = TaskJugglerScheduler()
+        self.assertFalse(tjp_sched.use_cache)
+
+    def test_use_cache_argument_is_working_properly(self):
+        """testing if the use_cache argument value is correctly passed to the
+        use_cache attribute
+        """
+        tjp_sched = TaskJugglerScheduler(use_cache=True)
+        self.assertTrue(tjp_sched.use_cache)
+
+    def test_tjp_content_hash_is_not_changing_for_the_same_content(self):
+        """testing if the tjp_content_hash is the same for two tjp files with
+        the same content, although the csv file names are different
+        """
+        test_studio = Studio(name='Test Studio')
+
+        tjp_sched1 = TaskJugglerScheduler()
+        tjp_sched1.studio = test_studio
+        tjp_sched1._create_tjp_file()
+        tjp_sched1._write_tjp_file()
+        tjp_sched1._clean_up()
+
+        tjp_sched2 = TaskJugglerScheduler()
+        tjp_sched2.studio = test_studio
+        tjp_sched2._create_tjp_file()
+        tjp_sched2._write_tjp_file()
+        tjp_sched2._clean_up()
+
+        self.assertNotEqual(tjp_sched1.temp_file_name,
+                            tjp_sched2.temp_file_name)
+        self.assertIsNotNone(tjp_sched1.tjp_content_hash)
+        self.assertEqual(tjp_sched1.tjp_content_hash,
+                         tjp_sched2.tjp_content_hash)
+
+        # change the content
+        self.test_task1.schedule_timing = 10
+        db.DBSession.commit()
+
+        tjp_sched2._create_tjp_file()
+        tjp_sched2._write_tjp_file()
+        tjp_sched2._clean_up()
+        self.assertNotEqual(tjp_sched1.tjp_content_hash,
+                            tjp_sched2.tjp_content_hash)
+
+    def test_csv_files_are_restored_from_the_cache(self):
+        """testing if the csv file of a tjp content is restored from the cache
+        """
+        import shutil
+        import tempfile
+        from stalker import defaults
+
+        tj_cache_path = defaults.tj_cache_path
+        defaults.tj_cache_path = tempfile.mkdtemp()
+        try:
+            test_studio = Studio(name='Test Studio')
+            csv_content = 'Id;Start;End\n'
+
+            tjp_sched1 = TaskJugglerScheduler(use_cache=True)
+            tjp_sched1.studio = test_studio
+            tjp_sched1._create_tjp_file()
+            tjp_sched1._write_tjp_file()
+            with open(tjp_sched1.csv_file_full_path, 'w') as f:
+                f.write(csv_content)
+
+            tjp_sched2 = TaskJugglerScheduler(use_cache=True)
+            tjp_sched2.studio = test_studio
+            tjp_sched2._create_tjp_file()
+            tjp_sched2._write_tjp_file()
+
+            # nothing in the cache yet
+            self.assertFalse(tjp_sched2._restore_from_cache(tjp_sched2))
+
+            tjp_sched1._store_in_cache(tjp_sched1)
+            self.assertTrue(tjp_sched2._restore_from_cache(tjp_sched2))
+            with open(tjp_sched2.csv_file_full_path) as f:
+                self.assertEqual(f.read(), csv_content)
+
+            tjp_sched1._clean_up()
+            tjp_sched2._clean_up()
+        finally:
+            shutil.rmtree(defaults.tj_cache_path)
+            defaults.tj_cache_path = tj_cache_path
+
+    def test_least_recently_used_csv_files_are_removed_from_the_cache(self):
+        """testing if the least recently used csv files are removed from the
+        cache when there are more than defaults.tj_cache_size files
+        """
+        import shutil
+        import tempfile
+        from stalker import defaults
+
+        tj_cache_path = defaults.tj_cache_path
+        tj_cache_size = defaults.tj_cache_size
+        defaults.tj_cache_path = tempfile.mkdtemp()
+        defaults.tj_cache_size = 2
+        try:
+            tjp_sched = TaskJugglerScheduler(use_cache=True)
+            tjp_sched.studio = Studio(name='Test Studio')
+            tjp_sched._create_tjp_file()
+            with open(tjp_sched.csv_file_full_path, 'w') as f:
+                f.write('Id;Start;End\n')
+
+            for i, content_hash in enumerate(['hash1', 'hash2', 'hash3']):
+                tjp_sched.tjp_content_hash = content_hash
+                tjp_sched._store_in_cache(tjp_sched)
+                # make sure the modification times are different
+                os.utime(
+                    tjp_sched._get_cached_csv_file_path(content_hash),
+                    (1000 + i, 1000 + i)
+                )
+
+            self.assertEqual(
+                sorted(os.listdir(defaults.tj_cache_path)),
+                ['hash2.csv', 'hash3.csv']
+            )
+            tjp_sched._clean_up()
+        finally:
+            shutil.rmtree(defaults.tj_cache_path)
+            defaults.tj_cache_path = tj_cache_path
+            defaults.tj_cache_size = tj_cache_size
+
+    def test_write_schedule_data_updates_only_the_changed_rows(self):
+        """testing if the _write_schedule_data() method will only update the
+        rows that are changed
+        """
+        start = datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc)
+        end = datetime.datetime(2013, 4, 18, 16, 0, tzinfo=pytz.utc)
+        update_data = [
+            {
+                'b_id': self.test_task1.id,
+                'start': start,
+                'end': end,
+                'computed_start': start,
+                'computed_end': end
+            },
+            {
+                'b_id': self.test_proj1.id,
+                'start': start,
+                'end': end,
+                'computed_start': start,
+                'computed_end': end
+            }
+        ]
+        update_user_data = [
+            {'task_id': self.test_task1.id, 'resource_id': self.test_user1.id},
+            {'task_id': self.test_task1.id, 'resource_id': self.test_user2.id}
+        ]
+
+        tjp_sched = TaskJugglerScheduler(compute_resources=True)
+        self.assertEqual(
+            tjp_sched._write_schedule_data(update_data, update_user_data),
+            {
+                'tasks': 1,
+                'projects': 1,
+                'computed_resources_inserted': 2,
+                'computed_resources_deleted': 0
+            }
+        )
+
+        # nothing has changed
+        self.assertEqual(
+            tjp_sched._write_schedule_data(update_data, update_user_data),
+            {
+                'tasks': 0,
+                'projects': 0,
+                'computed_resources_inserted': 0,
+                'computed_resources_deleted': 0
+            }
+        )
+
+        # change only the computed resources
+        update_user_data = [
+            {'task_id': self.test_task1.id, 'resource_id': self.test_user3.id},
+            {'task_id': self.test_task1.id, 'resource_id': self.test_user2.id}
+        ]
+        self.assertEqual(
+            tjp_sched._write_schedule_data(update_data, update_user_data),
+            {
+                'tasks': 0,
+                'projects': 0,
+                'computed_resources_inserted': 1,
+                'computed_resources_deleted': 1
+            }
+        )
+        self.assertEqual(tjp_sched.updated_row_counts['tasks'], 0)
+        db.DBSession.commit()
+
+        self.assertEqual(self.test_task1.computed_start, start)
+        self.assertEqual(self.test_task1.computed_end, end)
+        self.assertEqual(
+            sorted(self.test_task1.computed_resources, key=lambda x: x.id),
+            sorted([self.test_user2, self.test_user3], key=lambda x: x.id)
+        )
+
+    def test_write_schedule_data_keeps_the_other_computed_resources(self):
+        """testing if the _write_schedule_data() method will not change the
+        computed resources of the tasks that are not in the given data
+        """
+        from stalker.models.task import Task_Computed_Resources
+        db.DBSession.connection().execute(
+            Task_Computed_Resources.insert().values(
+                task_id=self.test_task2.id,
+                resource_id=self.test_user4.id
+            )
+        )
+
+        start = datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc)
+        end = datetime.datetime(2013, 4, 18, 16, 0, tzinfo=pytz.utc)
+        tjp_sched = TaskJugglerScheduler(compute_resources=True)
+        tjp_sched._write_schedule_data(
+            [{
+                'b_id': self.test_task1.id,
+                'start': start,
+                'end': end,
+                'computed_start': start,
+                'computed_end': end
+            }],
+            [{'task_id': self.test_task1.id,
+              'resource_id': self.test_user1.id}]
+        )
+
+        self.assertEqual(
+            db.DBSession.connection().execute(
+                'select resource_id from "Task_Computed_Resources" '
+                'where task_id = %s' % self.test_task2.id
+            ).fetchall(),
+            [(self.test_user4.id,)]
+        )
+
+    def test_parse_csv_file_with_copy_parsing_method(self):
+        """testing if the csv file is correctly parsed when the
+        parsing_method is 2 (COPY)
+        """
+        tjp_sched = TaskJugglerScheduler(compute_resources=True,
+                                         parsing_method=2)
+        tjp_sched._create_tjp_file()
+        tjp_sched.alternative_task_ids = \
+            set([self.test_task1.id, self.test_task2.id])
+        ids = {
+            'p': self.test_proj1.id,
+            't1': self.test_task1.id,
+            't2': self.test_task2.id,
+            'u1': self.test_user1.id,
+            'u2': self.test_user2.id,
+        }
+        with open(tjp_sched.csv_file_full_path, 'w') as f:
+            f.write(
+                '"Id";"Start";"End"\n'
+                '"Project_%(p)s";"2013-04-16-09:00";"2013-04-24-10:00"\n'
+                '"Project_%(p)s.Task_%(t1)s";"2013-04-16-09:00";'
+                '"2013-04-18-16:00"\n'
+                '"Project_%(p)s.Task_%(t2)s";"2013-04-18-16:00";'
+                '"2013-04-24-10:00"\n' % ids
+            )
+        with open(tjp_sched.resources_csv_file_full_path, 'w') as f:
+            f.write(
+                '"Id";"Resources"\n'
+                '"Project_%(p)s.Task_%(t1)s";'
+                '"User_%(u1)s (User_%(u1)s), User_%(u2)s (User_%(u2)s)"\n'
+                '"Project_%(p)s.Task_%(t2)s";"User_%(u2)s (User_%(u2)s)"\n'
+                % ids
+            )
+
+        tjp_sched._parse_csv_file()
+        tjp_sched._clean_up()
+        self.assertEqual(
+            tjp_sched.updated_row_counts,
+            {
+                'tasks': 2,
+                'projects': 1,
+                'computed_resources_inserted': 3,
+                'computed_resources_deleted': 0
+            }
+        )
+        db.DBSession.commit()
+
+        self.assertEqual(
+            self.test_proj1.computed_start,
+            datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc)
+        )
+        self.assertEqual(
+            self.test_proj1.computed_end,
+            datetime.datetime(2013, 4, 24, 10, 0, tzinfo=pytz.utc)
+        )
+        self.assertEqual(
+            self.test_task1.computed_start,
+            datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc)
+        )
+        self.assertEqual(
+            self.test_task1.computed_end,
+            datetime.datetime(2013, 4, 18, 16, 0, tzinfo=pytz.utc)
+        )
+        self.assertEqual(
+            self.test_task2.computed_start,
+            datetime.datetime(2013, 4, 18, 16, 0, tzinfo=pytz.utc)
+        )
+        self.assertEqual(
+            sorted(self.test_task1.computed_resources, key=lambda x: x.id),
+            sorted([self.test_user1, self.test_user2], key=lambda x: x.id)
+        )
+        self.assertEqual(self.test_task2.computed_resources,
+                         [self.test_user2])
+
+    def test_parse_csv_file_with_copy_is_independent_of_the_time_zone(self):
+        """testing if the dates in the csv file are parsed as UTC dates with
+        the COPY parsing method whatever the time zone of the db session is
+        """
+        tjp_sched = TaskJugglerScheduler(parsing_method=2)
+        tjp_sched._create_tjp_file()
+        ids = {
+            'p': self.test_proj1.id,
+            't1': self.test_task1.id,
+        }
+        # 02:30 does not exist in New York on 2013-03-10
+        with open(tjp_sched.csv_file_full_path, 'w') as f:
+            f.write(
+                '"Id";"Start";"End"\n'
+                '"Project_%(p)s.Task_%(t1)s";"2013-03-10-02:30";'
+                '"2013-03-10-18:00"\n' % ids
+            )
+
+        connection = db.DBSession.connection()
+        connection.execute(
+            "select set_config('TimeZone', 'America/New_York', true)"
+        )
+        tjp_sched._parse_csv_file()
+        tjp_sched._clean_up()
+
+        # the time zone of the session is restored
+        self.assertEqual(
+            connection.execute("select current_setting('TimeZone')").scalar(),
+            'America/New_York'
+        )
+        db.DBSession.commit()
+
+        self.assertEqual(
+            self.test_task1.computed_start,
+            datetime.datetime(2013, 3, 10, 2, 30, tzinfo=pytz.utc)
+        )
+        self.assertEqual(
+            self.test_task1.computed_end,
+            datetime.datetime(2013, 3, 10, 18, 0, tzinfo=pytz.utc)
+        )
+
+    def test_only_the_tasks_with_alternative_resources_are_flagged(self):
+        """testing if only the leaf tasks with alternative resources are
+        flagged in the tjp file when the compute_resources is True
+        """
+        test_task3 = Task(
+            name='Task3',
+            project=self.test_proj1,
+            resources=[self.test_user1],
+            schedule_timing=10,
+            schedule_unit='h'
+        )
+        db.DBSession.add(test_task3)
+        db.DBSession.commit()
+
+        tjp_sched = TaskJugglerScheduler(compute_resources=True)
+        lines = list(
+            tjp_sched._generate_tjp_task_lines([self.test_proj1.id])
+        )
+        self.assertEqual(lines.count('    flags alternatives'), 2)
+        self.assertEqual(
+            tjp_sched.alternative_task_ids,
+            set([self.test_task1.id, self.test_task2.id])
+        )
+        self.assertEqual(
+            tjp_sched.task_resource_ids,
+            {test_task3.id: [self.test_user1.id]}
+        )
+
+        # and nothing is flagged when the resources are not computed
+        tjp_sched = TaskJugglerScheduler(compute_resources=False)
+        lines = list(
+            tjp_sched._generate_tjp_task_lines([self.test_proj1.id])
+        )
+        self.assertNotIn('    flags alternatives', lines)
+        self.assertEqual(tjp_sched.alternative_task_ids, set())
+
+    def test_resources_report_is_rendered_when_compute_resources_is_True(
+            self):
+        """testing if the resources report of the tasks with alternative
+        resources is only rendered when the compute_resources is True
+        """
+        test_studio = Studio(name='Test Studio')
+        tjp_sched = TaskJugglerScheduler(compute_resources=True)
+        tjp_sched.studio = test_studio
+        tjp_sched._create_tjp_file()
+        header, footer = tjp_sched._render_tjp_header_and_footer()
+        self.assertIn('flags alternatives', header)
+        self.assertIn(
+            'taskreport alternative_resources "%s_resources"' %
+            tjp_sched.temp_file_name,
+            footer
+        )
+        self.assertIn('hidetask ~alternatives', footer)
+
+        tjp_sched = TaskJugglerScheduler(compute_resources=False)
+        tjp_sched.studio = test_studio
+        tjp_sched._create_tjp_file()
+        header, footer = tjp_sched._render_tjp_header_and_footer()
+        self.assertNotIn('flags alternatives', header)
+        self.assertNotIn('taskreport alternative_resources', footer)
+
+    def test_parse_csv_file_uses_the_resources_of_tasks_without_alternatives(
+            self):
+        """testing if the computed resources of the tasks without alternative
+        resources are their resources and the others are read from the
+        resources csv file
+        """
+        tjp_sched = TaskJugglerScheduler(compute_resources=True)
+        tjp_sched._create_tjp_file()
+        tjp_sched.alternative_task_ids = set([self.test_task1.id])
+        tjp_sched.task_resource_ids = {
+            self.test_task2.id: [self.test_user3.id]
+        }
+        ids = {
+            'p': self.test_proj1.id,
+            't1': self.test_task1.id,
+            't2': self.test_task2.id,
+            'u4': self.test_user4.id,
+        }
+        with open(tjp_sched.csv_file_full_path, 'w') as f:
+            f.write(
+                '"Id";"Start";"End"\n'
+                '"Project_%(p)s.Task_%(t1)s";"2013-04-16-09:00";'
+                '"2013-04-18-16:00"\n'
+                '"Project_%(p)s.Task_%(t2)s";"2013-04-18-16:00";'
+                '"2013-04-24-10:00"\n' % ids
+            )
+        with open(tjp_sched.resources_csv_file_full_path, 'w') as f:
+            f.write(
+                '"Id";"Resources"\n'
+                '"Project_%(p)s.Task_%(t1)s";"User_%(u4)s (User_%(u4)s)"\n'
+                % ids
+            )
+
+        tjp_sched._parse_csv_file()
+        tjp_sched._clean_up()
+        self.assertFalse(
+            os.path.exists(tjp_sched.resources_csv_file_full_path)
+        )
+        db.DBSession.commit()
+
+        self.assertEqual(self.test_task1.computed_resources,
+                         [self.test_user4])
+        self.assertEqual(self.test_task2.computed_resources,
+                         [self.test_user3])
+
+    def test_dry_run_argument_is_skipped(self):
+        """testing if the default value will be used when the dry_run
+        argument is skipped
+        """
+        tjp_sched = TaskJugglerScheduler()
+        self.assertFalse(tjp_sched.dry_run)
+
+    def test_overrides_argument_is_skipped(self):
+        """testing if the overrides attribute will be an empty dictionary when
+        the overrides argument is skipped
+        """
+        tjp_sched = TaskJugglerScheduler()
+        self.assertEqual(tjp_sched.overrides, {})
+
+    def test_overrides_attribute_is_not_a_dictionary(self):
+        """testing if a TypeError will be raised when the overrides attribute
+        is not a dictionary
+        """
+        tjp_sched = TaskJugglerScheduler()
+        with self.assertRaises(TypeError) as cm:
+            tjp_sched.overrides = [self.test_task1]
+
+        self.assertEqual(
+            str(cm.exception),
+            'TaskJugglerScheduler.overrides should be a dictionary, not list'
+        )
+
+    def test_overrides_attribute_has_an_unknown_key(self):
+        """testing if a ValueError will be raised when the overrides attribute
+        has an unsupported key
+        """
+        tjp_sched = TaskJugglerScheduler()
+        with self.assertRaises(ValueError) as cm:
+            tjp_sched.overrides = {self.test_task1: {'name': 'Task3'}}
+
+        self.assertEqual(
+            str(cm.exception),
+            "TaskJugglerScheduler.overrides keys should be one of "
+            "['resources', 'alternative_resources', 'depends', "
+            "'schedule_timing', 'schedule_unit', 'schedule_model', "
+            "'priority'], not name"
+        )
+
+    def test_overrides_attribute_converts_instances_to_ids(self):
+        """testing if the Task and User instances in the overrides attribute
+        are converted to ids
+        """
+        tjp_sched = TaskJugglerScheduler(
+            overrides={
+                self.test_task2: {
+                    'resources': [self.test_user3],
+                    'depends': []
+                }
+            }
+        )
+        self.assertEqual(
+            tjp_sched.overrides,
+            {
+                self.test_task2.id: {
+                    'resources': [self.test_user3.id],
+                    'depends': []
+                }
+            }
+        )
+
+    def test_tjp_task_lines_with_overrides(self):
+        """testing if the overridden values are used in the tjp task lines
+        """
+        tjp_sched = TaskJugglerScheduler(
+            overrides={
+                self.test_task1: {
+                    'resources': [self.test_user3],
+                    'alternative_resources': [],
+                    'schedule_timing': 5,
+                    'schedule_unit': 'd'
+                },
+                self.test_task2: {
+                    'depends': [],
+                    'priority': 500
+                }
+            }
+        )
+        lines = list(
+            tjp_sched._generate_tjp_task_lines([self.test_proj1.id])
+        )
+        self.assertEqual(
+            lines,
+            [
+                'task Project_%s "Project_%s" {' % (self.test_proj1.id,
+                                                    self.test_proj1.id),
+                '  task Task_%s "Task_%s" {' % (self.test_task1.id,
+                                                self.test_task1.id),
+                '    effort 5d',
+                '    allocate User_%s' % self.test_user3.id,
+                '  }',
+                '  task Task_%s "Task_%s" {' % (self.test_task2.id,
+                                                self.test_task2.id),
+                '    effort 60.0h',
+                '    allocate User_%(u1)s { alternative User_%(u3)s, '
+                'User_%(u4)s, User_%(u5)s select minallocated persistent }, '
+                'User_%(u2)s { alternative User_%(u3)s, User_%(u4)s, '
+                'User_%(u5)s select minallocated persistent }' % {
+                    'u1': self.test_user1.id,
+                    'u2': self.test_user2.id,
+                    'u3': self.test_user3.id,
+                    'u4': self.test_user4.id,
+                    'u5': self.test_user5.id,
+                },
+                '  }',
+                '}'
+            ]
+        )
+
+    def test_overrides_attribute_schedule_timing_is_not_a_number(self):
+        """testing if a TypeError will be raised when the schedule_timing in
+        the overrides attribute is not an integer or float
+        """
+        tjp_sched = TaskJugglerScheduler()
+        with self.assertRaises(TypeError) as cm:
+            tjp_sched.overrides = {
+                self.test_task1: {'schedule_timing': '5d\n  end 2013-01-01'}
+            }
+
+        self.assertEqual(
+            str(cm.exception),
+            'TaskJugglerScheduler.overrides schedule_timing should be an '
+            'integer or float number, not str'
+        )
+
+    def test_overrides_attribute_schedule_unit_is_not_a_datetime_unit(self):
+        """testing if a ValueError will be raised when the schedule_unit in
+        the overrides attribute is not one of the datetime units
+        """
+        from stalker import defaults
+        tjp_sched = TaskJugglerScheduler()
+        with self.assertRaises(ValueError) as cm:
+            tjp_sched.overrides = {self.test_task1: {'schedule_unit': 'x'}}
+
+        self.assertEqual(
+            str(cm.exception),
+            "TaskJugglerScheduler.overrides schedule_unit should be one of "
+            "%s, not x" % defaults.datetime_units
+        )
+
+    def test_overrides_attribute_schedule_model_is_not_a_schedule_model(self):
+        """testing if a ValueError will be raised when the schedule_model in
+        the overrides attribute is not one of effort, length or duration
+        """
+        tjp_sched = TaskJugglerScheduler()
+        with self.assertRaises(ValueError) as cm:
+            tjp_sched.overrides = {
+                self.test_task1: {'schedule_model': 'milestone'}
+            }
+
+        self.assertEqual(
+            str(cm.exception),
+            "TaskJugglerScheduler.overrides schedule_model should be one of "
+            "['effort', 'length', 'duration'], not milestone"
+        )
+
+    def test_overrides_attribute_priority_is_not_an_integer(self):
+        """testing if a TypeError will be raised when the priority in the
+        overrides attribute is not an integer
+        """
+        tjp_sched = TaskJugglerScheduler()
+        with self.assertRaises(TypeError) as cm:
+            tjp_sched.overrides = {self.test_task1: {'priority': '500'}}
+
+        self.assertEqual(
+            str(cm.exception),
+            'TaskJugglerScheduler.overrides priority should be an integer, '
+            'not str'
+        )
+
+    def test_tjp_task_lines_with_overrides_depends_to_an_unknown_task(self):
+        """testing if a ValueError will be raised when the depends in the
+        overrides has a Task id that is not in the exported projects
+        """
+        tjp_sched = TaskJugglerScheduler(
+            overrides={self.test_task2: {'depends': [-1]}}
+        )
+        with self.assertRaises(ValueError) as cm:
+            list(tjp_sched._generate_tjp_task_lines([self.test_proj1.id]))
+
+        self.assertEqual(
+            str(cm.exception),
+            'TaskJugglerScheduler.overrides depends of Task %s should be '
+            'Tasks of the scheduled projects, not [-1]' % self.test_task2.id
+        )
+
+    def test_dry_run_returns_the_computed_values_without_updating_db(self):
+        """testing if the schedule() method will return the computed values
+        and will not update the database when dry_run is True
+        """
+        tjp_sched = TaskJugglerScheduler(dry_run=True)
+        test_studio = Studio(
+            name='Test Studio',
+            now=datetime.datetime(2013, 4, 16, 0, 0, tzinfo=pytz.utc)
+        )
+        test_studio.start = \
+            datetime.datetime(2013, 4, 16, 0, 0, tzinfo=pytz.utc)
+        test_studio.end = datetime.datetime(2013, 4, 30, 0, 0, tzinfo=pytz.utc)
+        test_studio.daily_working_hours = 9
+        DBSession.add(test_studio)
+        db.DBSession.commit()
+
+        tjp_sched.studio = test_studio
+        result = tjp_sched.schedule()
+        self.assertEqual(result, tjp_sched.dry_run_result)
+
+        self.assertEqual(
+            result[self.test_task1.id],
+            (
+                datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc),
+                datetime.datetime(2013, 4, 18, 16, 0, tzinfo=pytz.utc),
+                sorted([self.test_user1.id, self.test_user2.id])
+            )
+        )
+        self.assertEqual(
+            result[self.test_proj1.id][:2],
+            (
+                datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc),
+                datetime.datetime(2013, 4, 24, 10, 0, tzinfo=pytz.utc)
+            )
+        )
+
+        # nothing is written to the database
+        db.DBSession.commit()
+        self.assertIsNone(self.test_task1.computed_start)
+        self.assertIsNone(self.test_task1.computed_end)
+        self.assertEqual(self.test_task1.computed_resources, [])
+
+    def test_dry_run_with_overrides(self):
+        """testing if the overrides are considered in a dry run
+        """
+        test_studio = Studio(
+            name='Test Studio',
+            now=datetime.datetime(2013, 4, 16, 0, 0, tzinfo=pytz.utc)
+        )
+        test_studio.start = \
+            datetime.datetime(2013, 4, 16, 0, 0, tzinfo=pytz.utc)
+        test_studio.end = datetime.datetime(2013, 4, 30, 0, 0, tzinfo=pytz.utc)
+        test_studio.daily_working_hours = 9
+        DBSession.add(test_studio)
+        db.DBSession.commit()
+
+        # what if task2 doesn't depend to task1
+        tjp_sched = TaskJugglerScheduler(
+            dry_run=True,
+            overrides={self.test_task2: {'depends': []}}
+        )
+        test_studio.scheduler = tjp_sched
+        result = test_studio.schedule()
+
+        # task2 has a higher priority and it is not waiting task1 anymore
+        self.assertEqual(
+            result[self.test_task2.id][0],
+            datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc)
+        )
+
+        # the schedule info of the studio is not changed
+        self.assertIsNone(test_studio.last_scheduled_at)
+        self.assertIsNone(test_studio.last_schedule_message)
+        self.assertIsNone(self.test_task2.computed_start)
+
+    def test_dry_runs_can_run_concurrently(self):
+        """testing if more than one dry run can run concurrently
+        """
+        from multiprocessing.pool import ThreadPool
+        test_studio = Studio(
+            name='Test Studio',
+            now=datetime.datetime(2013, 4, 16, 0, 0, tzinfo=pytz.utc)
+        )
+        test_studio.start = \
+            datetime.datetime(2013, 4, 16, 0, 0, tzinfo=pytz.utc)
+        test_studio.end = datetime.datetime(2013, 4, 30, 0, 0, tzinfo=pytz.utc)
+        test_studio.daily_working_hours = 9
+        DBSession.add(test_studio)
+        db.DBSession.commit()
+
+        studio_id = test_studio.id
+        task2_id = self.test_task2.id
+
+        def run_scenario(overrides):
+            try:
+                tjp_sched = TaskJugglerScheduler(
+                    studio=Studio.query.get(studio_id),
+                    dry_run=True,
+                    overrides=overrides
+                )
+                return tjp_sched.schedule()
+            finally:
+                db.DBSession.remove()
+
+        pool = ThreadPool(2)
+        try:
+            results = pool.map(
+                run_scenario,
+                [{}, {task2_id: {'depends': []}}]
+            )
+        finally:
+            pool.close()
+            pool.join()
+
+        self.assertEqual(
+            results[0][task2_id][0],
+            datetime.datetime(2013, 4, 18, 16, 0, tzinfo=pytz.utc)
+        )
+        self.assertEqual(
+            results[1][task2_id][0],
+            datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc)
+        )
+
+    def test_freeze_other_projects_argument_is_skipped(self):
+        """testing if the default value will be used when the
+        freeze_other_projects argument is skipped
+        """
+        tjp_sched = TaskJugglerScheduler()
+        self.assertFalse(tjp_sched.freeze_other_projects)
+
+    def test_departments_argument_is_skipped(self):
+        """testing if the departments attribute will be an empty list when
+        the departments argument is skipped
+        """
+        tjp_sched = TaskJugglerScheduler()
+        self.assertEqual(tjp_sched.departments, [])
+
+    def test_departments_argument_is_not_a_list_of_departments(self):
+        """testing if a TypeError will be raised when the departments
+        argument is not a list of Department instances
+        """
+        with self.assertRaises(TypeError) as cm:
+            TaskJugglerScheduler(departments=[self.test_dep1, 'Dep2'])
+
+        self.assertEqual(
+            str(cm.exception),
+            'TaskJugglerScheduler.departments should be a list of '
+            'stalker.models.department.Department instances, not str'
+        )
+
+    def test_frozen_statuses_argument_is_skipped(self):
+        """testing if the frozen_statuses attribute will be an empty list
+        when the frozen_statuses argument is skipped
+        """
+        tjp_sched = TaskJugglerScheduler()
+        self.assertEqual(tjp_sched.frozen_statuses, [])
+
+    def test_frozen_statuses_argument_is_not_a_list(self):
+        """testing if a TypeError will be raised when the frozen_statuses
+        argument is not a list
+        """
+        with self.assertRaises(TypeError) as cm:
+            TaskJugglerScheduler(frozen_statuses=self.test_status1)
+
+        self.assertEqual(
+            str(cm.exception),
+            'TaskJugglerScheduler.frozen_statuses should be a list of '
+            'stalker.models.status.Status instances, not Status'
+        )
+
+    def test_is_partial_is_working_properly(self):
+        """testing if the is_partial attribute is True only when some of the
+        active projects or tasks are not scheduled
+        """
+        test_studio = Studio(name='Test Studio')
+        tjp_sched = TaskJugglerScheduler(studio=test_studio)
+        self.assertFalse(tjp_sched.is_partial)
+
+        # all the active projects are scheduled
+        tjp_sched = TaskJugglerScheduler(
+            studio=test_studio,
+            projects=[self.test_proj1]
+        )
+        self.assertFalse(tjp_sched.is_partial)
+
+        tjp_sched = TaskJugglerScheduler(
+            studio=test_studio,
+            departments=[self.test_dep1]
+        )
+        self.assertTrue(tjp_sched.is_partial)
+
+        tjp_sched = TaskJugglerScheduler(
+            studio=test_studio,
+            frozen_statuses=[self.test_status1]
+        )
+        self.assertTrue(tjp_sched.is_partial)
+
+    def _freeze_test_task(self, task, resources):
+        """sets the computed values of the given task
+        """
+        task.computed_start = \
+            datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc)
+        task.computed_end = \
+            datetime.datetime(2013, 4, 18, 16, 0, tzinfo=pytz.utc)
+        task.computed_resources = resources
+        db.DBSession.commit()
+
+    def test_tjp_task_lines_of_tasks_with_frozen_statuses(self):
+        """testing if the leaf tasks with one of the frozen statuses are
+        exported with fixed dates
+        """
+        status_wip = Status.query.filter_by(code='WIP').first()
+        self.test_task1.status = status_wip
+        self._freeze_test_task(self.test_task1, [self.test_user1])
+
+        tjp_sched = TaskJugglerScheduler(frozen_statuses=[status_wip])
+        lines = list(
+            tjp_sched._generate_tjp_task_lines([self.test_proj1.id])
+        )
+
+        self.assertEqual(
+            lines[1:6],
+            [
+                '  task Task_%s "Task_%s" {' % (self.test_task1.id,
+                                                self.test_task1.id),
+                '    priority 1000',
+                '    start 2013-04-16-09:00',
+                '    end 2013-04-18-16:00',
+                '    allocate User_%s' % self.test_user1.id,
+            ]
+        )
+        self.assertEqual(tjp_sched.frozen_task_ids, set([self.test_task1.id]))
+
+        # task2 is still depending to task1
+        self.assertIn(
+            '    depends Project_%s.Task_%s {onend}' % (self.test_proj1.id,
+                                                       self.test_task1.id),
+            lines
+        )
+
+    def test_tasks_without_computed_dates_are_not_frozen(self):
+        """testing if the tasks that are not scheduled before are not frozen
+        """
+        status_wip = Status.query.filter_by(code='WIP').first()
+        self.test_task1.status = status_wip
+        db.DBSession.commit()
+
+        tjp_sched = TaskJugglerScheduler(frozen_statuses=[status_wip])
+        list(tjp_sched._generate_tjp_task_lines([self.test_proj1.id]))
+        self.assertEqual(tjp_sched.frozen_task_ids, set())
+
+    def test_tasks_of_other_departments_are_frozen(self):
+        """testing if the leaf tasks without any resources from the given
+        departments are frozen
+        """
+        self.test_task2.resources = [self.test_user3]
+        self.test_task2.alternative_resources = []
+        self._freeze_test_task(self.test_task2, [])
+
+        tjp_sched = TaskJugglerScheduler(departments=[self.test_dep1])
+        lines = list(
+            tjp_sched._generate_tjp_task_lines([self.test_proj1.id])
+        )
+        self.assertEqual(tjp_sched.frozen_task_ids, set([self.test_task2.id]))
+        # the resources are used if there are no computed resources
+        self.assertIn('    allocate User_%s' % self.test_user3.id, lines)
+
+    def test_tasks_of_other_projects_are_frozen(self):
+        """testing if the tasks of the other projects are exported as frozen
+        when freeze_other_projects is True
+        """
+        test_proj2 = Project(
+            name='Test Project 2',
+            code='TP2',
+            repository=self.test_repo
+        )
+        test_task3 = Task(
+            name='Task3',
+            project=test_proj2,
+            resources=[self.test_user1],
+            schedule_timing=10,
+            schedule_unit='h'
+        )
+        db.DBSession.add_all([test_proj2, test_task3])
+        db.DBSession.commit()
+        self._freeze_test_task(test_task3, [self.test_user1])
+
+        tjp_sched = TaskJugglerScheduler(
+            projects=[self.test_proj1],
+            freeze_other_projects=True
+        )
+        project_ids = tjp_sched._get_project_ids()
+        self.assertEqual(
+            sorted(project_ids),
+            sorted([self.test_proj1.id, test_proj2.id])
+        )
+        list(tjp_sched._generate_tjp_task_lines(project_ids))
+        self.assertEqual(tjp_sched.frozen_task_ids, set([test_task3.id]))
+
+    def test_frozen_tasks_are_not_rescheduled(self):
+        """testing if the frozen tasks keep their computed values and the
+        other tasks are scheduled around them
+        """
+        status_wip = Status.query.filter_by(code='WIP').first()
+        self.test_task1.status = status_wip
+        self._freeze_test_task(
+            self.test_task1, [self.test_user1, self.test_user2]
+        )
+
+        tjp_sched = TaskJugglerScheduler(
+            compute_resources=True,
+            frozen_statuses=[status_wip]
+        )
+        test_studio = Studio(
+            name='Test Studio',
+            now=datetime.datetime(2013, 4, 16, 0, 0, tzinfo=pytz.utc)
+        )
+        test_studio.start = \
+            datetime.datetime(2013, 4, 16, 0, 0, tzinfo=pytz.utc)
+        test_studio.end = datetime.datetime(2013, 4, 30, 0, 0, tzinfo=pytz.utc)
+        test_studio.daily_working_hours = 9
+        DBSession.add(test_studio)
+        db.DBSession.commit()
+
+        tjp_sched.studio = test_studio
+        tjp_sched.schedule()
+        db.DBSession.commit()
+
+        self.assertEqual(
+            self.test_task1.computed_start,
+            datetime.datetime(2013, 4, 16, 9, 0, tzinfo=pytz.utc)
+        )
+        self.assertEqual(
+            self.test_task1.computed_end,
+            datetime.datetime(2013, 4, 18, 16, 0, tzinfo=pytz.utc)
+        )
+        self.assertEqual(
+            self.test_task2.computed_start,
+            datetime.datetime(2013, 4, 18, 16, 0, tzinfo=pytz.utc)
+        )
+
+    def test_tjp_task_lines_with_contiguous_time_logs(self):
+        """testing if the contiguous time logs of the same resource are merged
+        and exported in one booking line
+        """
+        from stalker import TimeLog
+        tlog1 = TimeLog(
+            resource=self.test_user1,
+            task=self.test_task1,
+            start=datetime.datetime(2013, 4, 16, 6, 0, tzinfo=pytz.utc),
+            end=datetime.datetime(2013, 4, 16, 7, 0, tzinfo=pytz.utc)
+        )
+        tlog2 = TimeLog(
+            resource=self.test_user1,
+            task=self.test_task1,
+            start=datetime.datetime(2013, 4, 16, 7, 0, tzinfo=pytz.utc),
+            end=datetime.datetime(2013, 4, 16, 7, 30, tzinfo=pytz.utc)
+        )
+        tlog3 = TimeLog(
+            resource=self.test_user1,
+            task=self.test_task1,
+            start=datetime.datetime(2013, 4, 16, 7, 30, tzinfo=pytz.utc),
+            end=datetime.datetime(2013, 4, 16, 8, 0, tzinfo=pytz.utc)
+        )
+        tlog4 = TimeLog(
+            resource=self.test_user1,
+            task=self.test_task1,
+            start=datetime.datetime(2013, 4, 16, 10, 0, tzinfo=pytz.utc),
+            end=datetime.datetime(2013, 4, 16, 11, 0, tzinfo=pytz.utc)
+        )
+        tlog5 = TimeLog(
+            resource=self.test_user2,
+            task=self.test_task1,
+            start=datetime.datetime(2013, 4, 16, 7, 0, tzinfo=pytz.utc),
+            end=datetime.datetime(2013, 4, 16, 8, 0, tzinfo=pytz.utc)
+        )
+        db.DBSession.add_all([tlog1, tlog2, tlog3, tlog4, tlog5])
+        db.DBSession.commit()
+
+        tjp_sched = TaskJugglerScheduler()
+        lines = list(
+            tjp_sched._generate_tjp_task_lines([self.test_proj1.id])
+        )
+        booking_lines = [line for line in lines if 'booking' in line]
+
+        self.assertEqual(
+            booking_lines,
+            [
+                '    booking User_%s 2013-04-16-09:00:00 - '
+                '2013-04-16-11:00:00, 2013-04-16-13:00:00 - '
+                '2013-04-16-14:00:00 { overtime 2 }' % self.test_user1.id,
+                '    booking User_%s 2013-04-16-10:00:00 - '
+                '2013-04-16-11:00:00 { overtime 2 }' % self.test_user2.id,
+            ]
+        )
+        self.assertEqual(tjp_sched.metrics['counts']['bookings'], 3)
@@ -324,6 +324,49 @@ class TaskStatusWorkflowTestCase(UnitTestBase):
 
     # Leaf Tasks - dependency relation changes
     # WFD
+    def test_propagate_statuses_updates_dependent_tasks_in_order(self):
+        """testing if the propagate_statuses() method updates the statuses of
+        the dependent tasks in topological order and the parent statuses
+        """
+        from stalker import Task
+        self.test_task3.status = self.status_cmpl
+        self.test_task4.status = self.status_wfd
+        self.test_task5.status = self.status_wfd
+
+        updated_tasks = Task.propagate_statuses([self.test_task3])
+        self.assertEqual(
+            updated_tasks,
+            [self.test_task3, self.test_task4, self.test_task5]
+        )
+
+        self.assertEqual(self.test_task3.status, self.status_cmpl)
+        self.assertEqual(self.test_task4.status, self.status_rts)
+        self.assertEqual(self.test_task5.status, self.status_wfd)
+        self.assertEqual(self.test_task1.status, self.status_rts)
+
+        # and the changes can be committed
+        DBSession.commit()
+        self.assertEqual(self.test_task4.status, self.status_rts)
+
+    def test_propagate_statuses_with_a_task_depending_on_more_tasks(self):
+        """testing if the propagate_statuses() method updates a task only
+        after all the tasks that it depends on are updated
+        """
+        from stalker import Task
+        self.test_task5.depends.append(self.test_task3)
+        DBSession.commit()
+
+        self.test_task3.status = self.status_cmpl
+        self.test_task4.status = self.status_cmpl
+        self.test_task5.status = self.status_wfd
+
+        updated_tasks = Task.propagate_statuses([self.test_task3])
+        self.assertEqual(
+            updated_tasks,
+            [self.test_task3, self.test_task4, self.test_task5]
+        )
+        self.assertEqual(self.test_task5.status, self.status_rts)
+
     def test_leaf_WFD_task_updated_to_have_a_dependency_of_WFD_task_task(self):
         """testing if it is possible to set a dependency between a task with
         WFD status to a task with WFD status and the status of the task will